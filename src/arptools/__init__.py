@@ -19,12 +19,25 @@
 from colorama import just_fix_windows_console
 
 from .arp import (
+    ArpResult,
+    ArpSession,
+    AsyncArpSocket,
+    aiter_arp_probe,
+    aiter_arp_request,
+    aiter_arp_scan,
     arp_announcement,
+    arp_batch_scan,
+    arp_history,
+    arp_load,
     arp_probe,
     arp_pscan,
+    arp_replay,
     arp_reply,
     arp_request,
     arp_scan,
+    iter_arp_probe,
+    iter_arp_request,
+    iter_arp_scan,
 )
 from .modules.metadata import authors, summary, version
 
@@ -32,12 +45,25 @@ from .modules.metadata import authors, summary, version
 __all__ = [
     '__author__',
     '__version__',
+    'ArpResult',
+    'ArpSession',
+    'AsyncArpSocket',
+    'aiter_arp_probe',
+    'aiter_arp_request',
+    'aiter_arp_scan',
     'arp_announcement',
+    'arp_batch_scan',
+    'arp_history',
+    'arp_load',
     'arp_probe',
     'arp_pscan',
+    'arp_replay',
     'arp_reply',
     'arp_request',
     'arp_scan',
+    'iter_arp_probe',
+    'iter_arp_request',
+    'iter_arp_scan',
 ]
 
 
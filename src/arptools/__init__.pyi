@@ -18,13 +18,21 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable, Collection, Iterator
+import os
 from typing import Optional
 
 from scapy.packet import Packet
-from scapy.plist import PacketList, QueryAnswer, SndRcvList
+from scapy.plist import QueryAnswer
 
-from .arp.packets.request import _prn, _prn_qofr, _prnfail
+from .arp.aio import AsyncArpSocket
+from .arp.frame import ArpKind
+from .arp.load import LoadKind
+from .arp.packets.formatters import OutputFormat
+from .arp.packets.session import ArpSession
+from .arp.replay import ReplayReport
+from .arp.result import ArpResult
+from .modules.pcap import RotatingPcapWriter
 
 
 __author__: str
@@ -32,28 +40,76 @@ __version__: str
 
 
 def arp_announcement(
-        mapping: tuple[str, str],
+        mapping: tuple[str, str] | Collection[tuple[str, str]],
         ethernet_src: Optional[str] = None,
         ethernet_dst: Optional[str] = None,
         count: int = 0,
         interval: float = 1.0,
+        rate: Optional[float] = None,
+        verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+) -> None: ...
+
+def arp_batch_scan(target_range: str, capture: str) -> None: ...
+
+def arp_history(
+        database: str,
+        ip: Optional[str] = None,
+        mac: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+) -> None: ...
+
+def arp_load(
+        kind: LoadKind,
+        target_range: str,
+        source_range: Optional[str] = None,
+        source_macs: int = 0,
+        ethernet_dst: Optional[str] = None,
+        pps: float = 1000.0,
+        count: int = 0,
+        duration: Optional[float] = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+        iface: Optional[str] = None,
         verbose: Optional[int] = None,
 ) -> None: ...
 
 def arp_pscan(
         target_range: str,
         ttl: int = 60 * 5,
+        output: Optional[str] = None,
+        database: Optional[str] = None,
+        learn_from: Collection[ArpKind] = ('request',),
+        storm_threshold: Optional[float] = None,
+        capture: Optional[str] = None,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
 ) -> None: ...
 
 def arp_probe(
-        target_ip: str,
+        target_ip: str | Collection[str],
         count: int = 0,
         interval: float = 1.0,
         quit_on_first_reply: bool = False,
         timeout: Optional[int] = None,
         verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
 ) -> None: ...
 
+def arp_replay(
+        capture: str | os.PathLike,
+        speed: Optional[float] = 1.0,
+        arp_only: bool = True,
+        iface: Optional[str] = None,
+        verbose: Optional[int] = None,
+) -> ReplayReport: ...
+
 def arp_reply(
         target_ip: str,
         ethernet_src: Optional[str] = None,
@@ -63,12 +119,15 @@ def arp_reply(
         count: int = 0,
         interval: float = 1.0,
         verbose: Optional[int] = None,
-        prn: Callable[[QueryAnswer], str | None] = _prn,
-        prnfail: Callable[[Packet | PacketList | SndRcvList], str | None] = _prnfail,
+        prn: Optional[Callable[[QueryAnswer], str | None]] = None,
+        prnfail: Optional[Callable[[Packet], str | None]] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
 ) -> None: ...
 
 def arp_request(
-        target_ip: str,
+        target_ip: str | Collection[str],
         ethernet_src: Optional[str] = None,
         ethernet_dst: Optional[str] = None,
         arp_hwsrc: Optional[str] = None,
@@ -79,9 +138,16 @@ def arp_request(
         timeout: Optional[int] = None,
         ignore_unanswered: bool = False,
         verbose: Optional[int] = None,
-        prn: Callable[[QueryAnswer], str | None] = _prn,
-        prn_qofr: Callable[[QueryAnswer], None] = _prn_qofr,
-        prnfail: Callable[[Packet | PacketList | SndRcvList], str | None] = _prnfail,
+        prn: Optional[Callable[[QueryAnswer], str | None]] = None,
+        prn_qofr: Optional[Callable[[QueryAnswer], None]] = None,
+        prnfail: Optional[Callable[[Packet], str | None]] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
+        randomize: bool = False,
+        seed: Optional[int] = None,
 ) -> None: ...
 
 def arp_scan(
@@ -89,4 +155,81 @@ def arp_scan(
         use_arp_probes: bool = False,
         timeout: int = 2,
         verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+        retries: int = 0,
 ) -> None: ...
+
+def aiter_arp_probe(
+        target_ip: str,
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        iface: Optional[str] = None,
+        socket: Optional[AsyncArpSocket] = None,
+) -> AsyncIterator[ArpResult]: ...
+
+def aiter_arp_request(
+        target_ip: str,
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        arp_hwsrc: Optional[str] = None,
+        arp_psrc: Optional[str] = None,
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        iface: Optional[str] = None,
+        socket: Optional[AsyncArpSocket] = None,
+) -> AsyncIterator[ArpResult]: ...
+
+def aiter_arp_scan(
+        target_range: str,
+        use_arp_probes: bool = False,
+        timeout: float = 2,
+        iface: Optional[str] = None,
+        socket: Optional[AsyncArpSocket] = None,
+) -> AsyncIterator[ArpResult]: ...
+
+def iter_arp_probe(
+        target_ip: str | Collection[str],
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+) -> Iterator[ArpResult]: ...
+
+def iter_arp_request(
+        target_ip: str | Collection[str],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        arp_hwsrc: Optional[str] = None,
+        arp_psrc: Optional[str] = None,
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+) -> Iterator[ArpResult]: ...
+
+def iter_arp_scan(
+        target_range: str,
+        use_arp_probes: bool = False,
+        timeout: float = 2,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+        retries: int = 0,
+) -> Iterator[ArpResult]: ...
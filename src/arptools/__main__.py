@@ -29,7 +29,7 @@ from typing import Type
 
 from . import cli
 from .modules import log
-from .parsers import Arpa, Arprobe, Arpr, Arpscan, Garp
+from .parsers import Arpa, Arpload, Arprobe, Arpr, Arpreplay, Arpscan, Garp
 
 
 logger = logging.getLogger(__name__)
@@ -66,6 +66,13 @@ def arpa() -> None:
     cli.arpa(arguments)
 
 
+def arpload() -> None:
+    """Arpload CLI entry point."""
+
+    arguments: Namespace = init_cli_with_argument_parser(Arpload)
+    cli.arpload(arguments)
+
+
 def arprobe() -> None:
     """Arprobe CLI entry point."""
 
@@ -73,6 +80,13 @@ def arprobe() -> None:
     cli.arprobe(arguments)
 
 
+def arpreplay() -> None:
+    """Arpreplay CLI entry point."""
+
+    arguments: Namespace = init_cli_with_argument_parser(Arpreplay)
+    cli.arpreplay(arguments)
+
+
 def arpscan() -> None:
     """Arpscan CLI entry point."""
 
@@ -16,21 +16,45 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+from .aio import AsyncArpSocket, aiter_arp_probe, aiter_arp_request, aiter_arp_scan
 from .announcement import arp_announcement
-from .garp import garp_reply
+from .batch import arp_batch_scan
+from .garp import Keepalive, garp_keepalive, garp_reply, iter_garp_reply
+from .history import arp_history
+from .load import arp_load
 from .packets.reply import arp_reply
-from .packets.request import arp_request
-from .probe import arp_probe
+from .packets.session import ArpSession
+from .packets.request import arp_request, iter_arp_request
+from .probe import arp_probe, iter_arp_probe
 from .pscan import arp_pscan
-from .scan import arp_scan
+from .replay import ReplayReport, arp_replay
+from .result import ArpResult
+from .scan import arp_scan, iter_arp_scan
 
 
 __all__ = [
+    'ArpResult',
+    'ArpSession',
+    'AsyncArpSocket',
+    'Keepalive',
+    'ReplayReport',
+    'aiter_arp_probe',
+    'aiter_arp_request',
+    'aiter_arp_scan',
     'arp_announcement',
+    'arp_batch_scan',
+    'arp_history',
+    'arp_load',
     'arp_probe',
     'arp_pscan',
+    'arp_replay',
     'arp_reply',
     'arp_request',
     'arp_scan',
+    'garp_keepalive',
     'garp_reply',
+    'iter_arp_probe',
+    'iter_arp_request',
+    'iter_arp_scan',
+    'iter_garp_reply',
 ]
@@ -0,0 +1,438 @@
+"""Provides asyncio counterparts of the ARP scanning and probing functions.
+
+Every operation of an event loop shares a single non-blocking ARP socket per
+interface, registered with the loop, so any number of scans and probes can run
+concurrently without threads.
+"""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Collection, Iterator
+from contextlib import nullcontext
+from ipaddress import ip_network
+from itertools import count as counter
+import socket
+import time
+from typing import Optional
+
+from scapy.arch import get_if_addr, get_if_hwaddr
+from scapy.config import conf
+from scapy.interfaces import network_name
+
+from .frame import ArpFrame
+from .result import ArpResult
+
+
+_ETH_P_ARP: int = 0x0806
+
+# how many frames are sent before giving the event loop a chance to read the replies.
+_SEND_BATCH: int = 64
+
+
+class AsyncArpSocket:
+    """A non-blocking ARP socket registered with the running event loop.
+
+    Replies are dispatched to the oldest pending request for the IP address
+    they advertise, whichever operation sent it.
+
+    Typical usage:
+        async with AsyncArpSocket('eth0') as arp_socket:
+            async for result in aiter_arp_scan('192.168.1.0/24', socket=arp_socket):
+                ...
+    """
+
+    def __init__(self, iface: Optional[str] = None):
+        """Args:
+            iface:
+                the network interface (default: scapy's default interface).
+        """
+
+        self.iface: str = network_name(iface or conf.iface)
+        self.hwaddr: str = get_if_hwaddr(self.iface)
+        self.ipaddr: str = get_if_addr(self.iface)
+
+        self._socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(_ETH_P_ARP))
+        self._socket.bind((self.iface, _ETH_P_ARP))
+        self._socket.setblocking(False)
+
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._socket.fileno(), self._on_readable)
+
+        self._pending: dict[str, deque[asyncio.Future]] = {}
+        self._users: int = 0
+
+    def request(self, frame: bytes, target_ip: str) -> asyncio.Future:
+        """Sends a request and returns a future that resolves to the reply
+        (its ARP fields and its receive timestamp).
+
+        The future must be cancelled if the reply is not awaited anymore.
+        """
+
+        try:
+            self._socket.send(frame)
+        except BlockingIOError:
+            # the send buffer is full: the request counts as sent and lost.
+            pass
+
+        future = self._loop.create_future()
+        self._pending.setdefault(target_ip, deque()).append(future)
+        future.add_done_callback(lambda _: self._forget(target_ip, future))
+
+        return future
+
+    def send(self, frame: bytes) -> None:
+        """Sends a frame that expects no reply."""
+
+        try:
+            self._socket.send(frame)
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        """Unregisters and closes the socket, cancelling every pending request."""
+
+        if self._socket.fileno() < 0:
+            return
+
+        self._loop.remove_reader(self._socket.fileno())
+        self._socket.close()
+
+        for futures in list(self._pending.values()):
+            for future in list(futures):
+                future.cancel()
+
+    def _forget(self, target_ip: str, future: asyncio.Future) -> None:
+        if (futures := self._pending.get(target_ip)) is None:
+            return
+
+        try:
+            futures.remove(future)
+        except ValueError:
+            pass
+
+        if not futures:
+            del self._pending[target_ip]
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data = self._socket.recv(1514)
+            except (BlockingIOError, InterruptedError):
+                return
+
+            timestamp = time.time()
+            if (frame := ArpFrame.from_bytes(data)) is None or frame.op != 2:
+                continue
+
+            for future in self._pending.get(frame.psrc, ()):
+                if not future.done():
+                    future.set_result((frame, timestamp))
+                    break
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# the sockets shared by the operations of every event loop, by interface.
+_shared: dict[tuple[asyncio.AbstractEventLoop, str], AsyncArpSocket] = {}
+
+
+class _SharedSocket:
+    def __init__(self, iface: Optional[str]):
+        self._key = (asyncio.get_running_loop(), network_name(iface or conf.iface))
+
+    async def __aenter__(self) -> AsyncArpSocket:
+        if (arp_socket := _shared.get(self._key)) is None:
+            arp_socket = _shared[self._key] = AsyncArpSocket(self._key[1])
+
+        arp_socket._users += 1
+        return arp_socket
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        arp_socket = _shared[self._key]
+        arp_socket._users -= 1
+
+        if not arp_socket._users:
+            del _shared[self._key]
+            arp_socket.close()
+
+
+def _targets(target_ip: str) -> list[str]:
+    return [str(address) for address in ip_network(target_ip, strict=False)]
+
+
+def _requests(
+        arp_socket: AsyncArpSocket,
+        targets: list[str],
+        ethernet_src: Optional[str],
+        ethernet_dst: Optional[str],
+        arp_hwsrc: Optional[str],
+        arp_psrc: Optional[str],
+        count: int,
+        answered: Collection[str] = (),
+) -> Iterator[tuple[str, bytes]]:
+    # the frames of every target are encoded once, and sent `count` times
+    # (skipping the targets that have already answered).
+    frames = [
+        (target, ArpFrame(
+            1,
+            arp_hwsrc or arp_socket.hwaddr,
+            arp_psrc or arp_socket.ipaddr,
+            '00:00:00:00:00:00',
+            target,
+        ).to_bytes(ethernet_src or arp_socket.hwaddr, ethernet_dst))
+        for target in targets
+    ]
+
+    for _ in range(count) if count else counter():
+        if len(answered) == len(frames):
+            return
+
+        yield from ((target, frame) for target, frame in frames if target not in answered)
+
+
+async def _aexchange(
+        arp_socket: AsyncArpSocket,
+        requests: Iterator[tuple[str, bytes]],
+        timeout: Optional[float],
+        inter: float,
+        answered: Optional[set[str]] = None,
+) -> AsyncIterator[ArpResult]:
+    # when given, `answered` collects the targets whose requests stop at their first reply.
+    loop = asyncio.get_running_loop()
+    completed: asyncio.Queue[ArpResult] = asyncio.Queue()
+    attempts: dict[str, int] = {}
+    pending: dict[asyncio.Future, str] = {}
+
+    def _on_done(future: asyncio.Future, target: str, attempt: int, sent_time: float) -> None:
+        pending.pop(future, None)
+
+        if future.cancelled():
+            completed.put_nowait(ArpResult(target, None, None, attempt, sent_time))
+        else:
+            frame, timestamp = future.result()
+            completed.put_nowait(ArpResult(
+                target, frame.hwsrc, max(timestamp - sent_time, 0.0), attempt, sent_time
+            ))
+
+    async def _send() -> None:
+        next_send = loop.time()
+
+        for sent, (target, frame) in enumerate(requests, 1):
+            attempts[target] = attempt = attempts.get(target, 0) + 1
+            future = arp_socket.request(frame, target)
+            pending[future] = target
+
+            future.add_done_callback(
+                lambda done, t=target, a=attempt, s=time.time(): _on_done(done, t, a, s)
+            )
+            if timeout is not None:
+                loop.call_later(timeout, future.cancel)
+
+            if inter:
+                next_send += inter
+                await asyncio.sleep(max(next_send - loop.time(), 0))
+            elif not sent % _SEND_BATCH:
+                await asyncio.sleep(0)
+
+    sender = asyncio.create_task(_send())
+
+    try:
+        while not (sender.done() and not pending and completed.empty()):
+            if sender.done():
+                # re-raises the errors of the sender.
+                sender.result()
+                result = await completed.get()
+            else:
+                getter = asyncio.ensure_future(completed.get())
+                await asyncio.wait((getter, sender), return_when=asyncio.FIRST_COMPLETED)
+
+                if not getter.done():
+                    getter.cancel()
+                    continue
+
+                result = getter.result()
+
+            if answered is not None:
+                # the other pending requests of a target that has answered are dropped.
+                if result.target_ip in answered:
+                    continue
+
+                if result.answered:
+                    answered.add(result.target_ip)
+                    for future, target in list(pending.items()):
+                        if target == result.target_ip:
+                            future.cancel()
+
+            yield result
+    finally:
+        sender.cancel()
+        for future in list(pending):
+            future.cancel()
+
+
+async def aiter_arp_request(
+        target_ip: str,
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        arp_hwsrc: Optional[str] = None,
+        arp_psrc: Optional[str] = None,
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        iface: Optional[str] = None,
+        socket: Optional[AsyncArpSocket] = None,
+) -> AsyncIterator[ArpResult]:
+    """Sends ARP requests, and yields the result of every request as soon as
+    it is answered or its timeout expires.
+
+    Typical usage:
+        async for result in aiter_arp_request('192.168.1.1', count=3):
+            print(result.mac, result.rtt)
+
+    Args:
+        target_ip:
+            the target IP of the ARP request (or a range of IPs, in CIDR notation).
+        ethernet_src:
+            the source MAC address of the Ethernet frame.
+        ethernet_dst:
+            the destination MAC address of the Ethernet frame.
+        arp_hwsrc:
+            the hardware source address of the ARP packet.
+        arp_psrc:
+            the protocol source address of the ARP packet.
+        count:
+            how many packet to send to every target (0: until the iteration stops).
+        interval:
+            time interval between packets (only used when count is 0).
+        quit_on_first_reply:
+            sends packets to every target until it gets a reply from it.
+        timeout:
+            how long to wait for a reply (None: until the iteration stops).
+        iface:
+            the network interface (default: scapy's default interface).
+        socket:
+            the socket to use (default: the socket shared by the operations of
+            the running event loop on the interface).
+    """
+
+    async with _SharedSocket(iface) if socket is None else nullcontext(socket) as arp_socket:
+        answered: set[str] = set()
+        requests = _requests(
+            arp_socket, _targets(target_ip), ethernet_src, ethernet_dst,
+            arp_hwsrc, arp_psrc, count, answered,
+        )
+
+        if count and not quit_on_first_reply:
+            inter = 0.0
+        elif count:
+            timeout = timeout if timeout else 1
+            inter = timeout
+        else:
+            inter = interval
+
+        async for result in _aexchange(
+                arp_socket, requests, timeout, inter, answered if quit_on_first_reply else None
+        ):
+            yield result
+
+
+async def aiter_arp_probe(
+        target_ip: str,
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        iface: Optional[str] = None,
+        socket: Optional[AsyncArpSocket] = None,
+) -> AsyncIterator[ArpResult]:
+    """Sends ARP probes to the specified target, and yields the result of every
+    probe as soon as it is answered or its timeout expires.
+
+    Args:
+        target_ip:
+            the destination IP.
+        count:
+            how many packet to send (0: until the iteration stops).
+        interval:
+            time interval between packets (only used when count is 0).
+        quit_on_first_reply:
+            sends packets until it gets a reply.
+        timeout:
+            how long to wait for a reply.
+        iface:
+            the network interface (default: scapy's default interface).
+        socket:
+            the socket to use (default: the shared socket of the interface).
+    """
+
+    async for result in aiter_arp_request(
+            target_ip,
+            arp_psrc='0.0.0.0',
+            count=count,
+            interval=interval,
+            quit_on_first_reply=quit_on_first_reply,
+            timeout=timeout,
+            iface=iface,
+            socket=socket,
+    ):
+        yield result
+
+
+async def aiter_arp_scan(
+        target_range: str,
+        use_arp_probes: bool = False,
+        timeout: float = 2,
+        iface: Optional[str] = None,
+        socket: Optional[AsyncArpSocket] = None,
+) -> AsyncIterator[ArpResult]:
+    """Performs an ARP scan of the network, and yields the result of every IP
+    in range as soon as it responds or its timeout expires.
+
+    Typical usage:
+        async for result in aiter_arp_scan('192.168.1.0/24'):
+            if result.answered:
+                print(result.target_ip, result.mac)
+
+    Args:
+        target_range:
+            the target IP range, in CIDR notation.
+        use_arp_probes:
+            whether to use ARP probes to scan the network.
+        timeout:
+            how long to wait for a reply.
+        iface:
+            the network interface (default: scapy's default interface).
+        socket:
+            the socket to use (default: the shared socket of the interface).
+    """
+
+    async for result in aiter_arp_request(
+            target_range,
+            arp_psrc='0.0.0.0' if use_arp_probes else None,
+            count=1,
+            timeout=timeout,
+            iface=iface,
+            socket=socket,
+    ):
+        yield result
@@ -15,28 +15,35 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+from collections.abc import Collection
 from typing import Optional
 
 from scapy.layers.l2 import ARP
 from scapy.packet import Packet
-from scapy.plist import PacketList, SndRcvList
 
-from .packets.request import arp_request
+from .packets.advertise import advertise_mappings
+from .packets.formatters import OutputFormat
+from .packets.session import ArpSession
+from ..modules.pcap import RotatingPcapWriter
 
 
 def arp_announcement(
-        mapping: tuple[str, str],
+        mapping: tuple[str, str] | Collection[tuple[str, str]],
         ethernet_src: Optional[str] = None,
         ethernet_dst: Optional[str] = None,
         count: int = 0,
         interval: float = 1.0,
+        rate: Optional[float] = None,
         verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
 ) -> None:
     """Sends and ARP announcement advertising the given MAC/IP mapping.
 
     Args:
         mapping:
-            a MAC/IP pair.
+            a MAC/IP pair (or a collection of pairs, advertised in rounds).
         ethernet_src:
             the source MAC address of the Ethernet frame.
         ethernet_dst:
@@ -45,26 +52,32 @@ def arp_announcement(
             how many packet to send.
         interval:
             time interval between packets (only used when count is 0).
+        rate:
+            the maximum number of packets sent per second (default: no limit).
         verbose:
             verbosity level.
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet is recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
     """
 
-    def _arp_announcement_prnfail(unanswered: Packet | PacketList | SndRcvList) -> str | None:
-        return '\n'.join((
-            f'\rARP ANNOUNCEMENT is-at {pkt.hwsrc} says {pkt.pdst}' for pkt in unanswered[ARP]
-        ))
+    def _arp_announcement_prnfail(unanswered: Packet) -> str | None:
+        return f'ARP ANNOUNCEMENT is-at {unanswered[ARP].hwsrc} says {unanswered[ARP].pdst}'
 
-    arp_request(
-        target_ip=mapping[1],
+    advertise_mappings(
+        'who-has',
+        [mapping] if isinstance(mapping[0], str) else mapping,
         ethernet_src=ethernet_src,
         ethernet_dst=ethernet_dst,
-        arp_hwsrc=mapping[0],
-        arp_psrc=mapping[1],
         count=count,
         interval=interval,
-        quit_on_first_reply=False,
-        timeout=0,
-        ignore_unanswered=False,
+        rate=rate,
         verbose=verbose,
-        prnfail=_arp_announcement_prnfail,
+        prnfail=_arp_announcement_prnfail if output_format == 'text' else None,
+        output_format=output_format,
+        pcap_writer=pcap_writer,
+        session=session,
     )
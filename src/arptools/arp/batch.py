@@ -0,0 +1,454 @@
+"""Provides a vectorized decoder for the ARP packets of classic pcap files.
+
+Requires NumPy (`pip install arptools[batch]`).
+"""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from datetime import datetime
+from ipaddress import ip_network
+import logging
+import os
+import struct
+from typing import Any, NamedTuple
+
+from ..modules.pcap import CaptureFormatError, LINKTYPE_ETHERNET
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+# Ethernet + Ethernet/IPv4 ARP header, as laid out after a pcap record header.
+_FRAME_FIELDS: list[tuple[str, str]] = [
+    ('eth_dst', 'V6'),
+    ('eth_src', 'V6'),
+    ('ethertype', '>u2'),
+    ('htype', '>u2'),
+    ('ptype', '>u2'),
+    ('hlen', 'u1'),
+    ('plen', 'u1'),
+    ('op', '>u2'),
+    ('hwsrc', 'V6'),
+    ('psrc', '>u4'),
+    ('hwdst', 'V6'),
+    ('pdst', '>u4'),
+]
+_FRAME_SIZE: int = 42
+_RECORD_HEADER_SIZE: int = 16
+_ETHER_HEADER_SIZE: int = 14
+# the largest packet length of the capture tools.
+_MAX_SNAPLEN: int = 262144
+
+
+class ArpColumns(NamedTuple):
+    """Columns of ARP packets, one array element per packet.
+
+    MAC addresses are 48-bit and IP addresses 32-bit unsigned integers
+    (see mac_to_str() and ip_to_str()).
+    """
+
+    timestamp: Any
+    """Capture time, as UNIX timestamps (float64)."""
+
+    op: Any
+    """ARP operation (uint16)."""
+
+    hwsrc: Any
+    """Sender MAC address (uint64)."""
+
+    psrc: Any
+    """Sender IP address (uint32)."""
+
+    hwdst: Any
+    """Target MAC address (uint64)."""
+
+    pdst: Any
+    """Target IP address (uint32)."""
+
+    def __len__(self) -> int:
+        return len(self.op)
+
+    def select(self, mask: Any) -> 'ArpColumns':
+        """Returns the packets selected by a boolean mask or an index array."""
+
+        return ArpColumns(*(column[mask] for column in self))
+
+
+class ArpPairs(NamedTuple):
+    """Distinct (sender MAC, sender IP) pairs of a set of ARP packets."""
+
+    hwsrc: Any
+    """Sender MAC address (uint64)."""
+
+    psrc: Any
+    """Sender IP address (uint32)."""
+
+    first_seen: Any
+    """Capture time of the first packet of the pair (float64)."""
+
+    last_seen: Any
+    """Capture time of the last packet of the pair (float64)."""
+
+    count: Any
+    """Number of packets of the pair (int64)."""
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError('the batch decoder requires NumPy: pip install arptools[batch]')
+
+
+def load_arp_columns(path: str | os.PathLike) -> ArpColumns:
+    """Decodes every Ethernet/IPv4 ARP packet of a classic pcap file at once.
+
+    The file is memory mapped and viewed as an array of records. When every
+    record has the same captured length (which is the case for captures filtered
+    on ARP) no Python code runs per packet; otherwise the record boundaries are
+    found first, by walking the record headers of many parts of the file at
+    once (or one by one, for the files this walk cannot follow).
+
+    Only untagged frames are decoded: VLAN tagged ARP packets are skipped, and
+    their count is logged as a warning.
+
+    Raises:
+        CaptureFormatError:
+            the file is not a classic Ethernet pcap file.
+        ImportError:
+            NumPy is not installed.
+    """
+
+    _require_numpy()
+
+    with open(path, 'rb') as file:
+        header = file.read(24)
+
+    if len(header) < 24:
+        raise CaptureFormatError(f'{path}: not a pcap file')
+
+    match header[:4]:
+        case b'\xd4\xc3\xb2\xa1':
+            order, resolution = '<', 1e-6
+        case b'\xa1\xb2\xc3\xd4':
+            order, resolution = '>', 1e-6
+        case b'\x4d\x3c\xb2\xa1':
+            order, resolution = '<', 1e-9
+        case b'\xa1\xb2\x3c\x4d':
+            order, resolution = '>', 1e-9
+        case _:
+            raise CaptureFormatError(f'{path}: not a classic pcap file')
+
+    if struct.unpack_from(f'{order}I', header, 20)[0] & 0x0FFFFFFF != LINKTYPE_ETHERNET:
+        raise CaptureFormatError(f'{path}: only Ethernet captures are supported')
+
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=24)
+    if not len(data):
+        return _empty_columns()
+
+    records = _fixed_size_records(data, order)
+    if records is None:
+        snaplen = struct.unpack_from(f'{order}I', header, 16)[0]
+        records = _variable_size_records(data, order, snaplen, round(1 / resolution))
+    if records is None:
+        return _empty_columns()
+
+    frames = records['frame']
+    # behind an 802.1Q tag, the ARP ethertype lands on the protocol type field.
+    tagged = np.count_nonzero((frames['ethertype'] == 0x8100) & (frames['ptype'] == 0x0806))
+    if tagged:
+        logger.warning('skipped %d VLAN tagged ARP packets.', tagged)
+
+    valid = (
+        (records['caplen'] >= _FRAME_SIZE)
+        & (frames['ethertype'] == 0x0806)
+        & (frames['htype'] == 1)
+        & (frames['ptype'] == 0x0800)
+        & (frames['hlen'] == 6)
+        & (frames['plen'] == 4)
+    )
+    records = records[valid]
+    frames = records['frame']
+
+    return ArpColumns(
+        timestamp=records['ts_sec'].astype(np.float64) + records['ts_frac'] * resolution,
+        op=frames['op'].astype(np.uint16),
+        hwsrc=_mac_column(frames['hwsrc']),
+        psrc=frames['psrc'].astype(np.uint32),
+        hwdst=_mac_column(frames['hwdst']),
+        pdst=frames['pdst'].astype(np.uint32),
+    )
+
+
+def filter_range(columns: ArpColumns, target_range: str) -> ArpColumns:
+    """Returns the packets whose sender IP address belongs to an IP range (CIDR notation)."""
+
+    network = ip_network(target_range, strict=False)
+    low, high = int(network.network_address), int(network.broadcast_address)
+
+    return columns.select((columns.psrc >= low) & (columns.psrc <= high))
+
+
+def unique_pairs(columns: ArpColumns) -> ArpPairs:
+    """De-duplicates the (sender MAC, sender IP) pairs of a set of packets,
+    sorted by IP and MAC address."""
+
+    _require_numpy()
+
+    if not len(columns):
+        return ArpPairs(*(np.empty(0, dtype=dtype) for dtype in (
+            np.uint64, np.uint32, np.float64, np.float64, np.int64
+        )))
+
+    # group the packets by pair, then by time.
+    order = np.lexsort((columns.timestamp, columns.hwsrc, columns.psrc))
+    hwsrc, psrc, timestamp = columns.hwsrc[order], columns.psrc[order], columns.timestamp[order]
+
+    starts = np.flatnonzero(np.concatenate((
+        [True], (hwsrc[1:] != hwsrc[:-1]) | (psrc[1:] != psrc[:-1])
+    )))
+    ends = np.concatenate((starts[1:], [len(order)])) - 1
+
+    return ArpPairs(
+        hwsrc=hwsrc[starts],
+        psrc=psrc[starts],
+        first_seen=timestamp[starts],
+        last_seen=timestamp[ends],
+        count=(ends - starts + 1).astype(np.int64),
+    )
+
+
+def mac_to_str(mac: int) -> str:
+    """Formats a MAC address column value."""
+
+    return int(mac).to_bytes(6).hex(':')
+
+
+def ip_to_str(ip: int) -> str:
+    """Formats an IP address column value."""
+
+    return '.'.join(map(str, int(ip).to_bytes(4)))
+
+
+def arp_batch_scan(target_range: str, capture: str) -> None:
+    """Prints the distinct MAC/IP pairs advertised by the senders of the ARP
+    packets of a classic pcap file, with the time they were first and last
+    seen and how many packets advertised them.
+
+    Args:
+        target_range:
+            the target IP range, in CIDR notation.
+        capture:
+            path of the pcap file.
+    """
+
+    def _fmt_timestamp(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='seconds')
+
+    pairs = unique_pairs(filter_range(load_arp_columns(capture), target_range))
+
+    for hwsrc, psrc, first_seen, last_seen, count in zip(*pairs):
+        print(
+            f'{mac_to_str(hwsrc)} <== {ip_to_str(psrc)} '
+            f'({_fmt_timestamp(first_seen)} - {_fmt_timestamp(last_seen)}, {count} hits)'
+        )
+
+
+def _record_dtype(order: str, caplen: int) -> Any:
+    fields = [
+        ('ts_sec', f'{order}u4'),
+        ('ts_frac', f'{order}u4'),
+        ('caplen', f'{order}u4'),
+        ('len', f'{order}u4'),
+        ('frame', np.dtype(_FRAME_FIELDS)),
+    ]
+    if caplen > _FRAME_SIZE:
+        fields.append(('padding', f'V{caplen - _FRAME_SIZE}'))
+
+    return np.dtype(fields)
+
+
+def _fixed_size_records(data: Any, order: str) -> Any:
+    caplen = int(data[8:12].view(f'{order}u4')[0])
+    record_size = _RECORD_HEADER_SIZE + caplen
+
+    if caplen < _FRAME_SIZE or len(data) % record_size:
+        return None
+
+    records = data.view(_record_dtype(order, caplen))
+    if not (records['caplen'] == caplen).all():
+        return None
+
+    return records
+
+
+def _variable_size_records(
+        data: Any,
+        order: str,
+        snaplen: int,
+        ticks: int,
+        chunk_size: int = 1 << 20,
+) -> Any:
+    # find the record boundaries, then gather the ARP sized prefix of every record.
+    offsets, end = _record_offsets(data, order, snaplen, ticks)
+    # the records the walks could not follow are read one by one.
+    offsets = np.concatenate((offsets, _walk_records(data, order, end)))
+
+    record_size = _RECORD_HEADER_SIZE + _FRAME_SIZE
+    # records shorter than an ARP frame may be read past their end, they are discarded later on.
+    starts = offsets[offsets + record_size <= len(data)]
+    if not len(starts):
+        return None
+
+    gathered = np.empty((len(starts), record_size), dtype=np.uint8)
+    for chunk in range(0, len(starts), chunk_size):
+        indexes = starts[chunk:chunk + chunk_size, None] + np.arange(record_size)
+        gathered[chunk:chunk + chunk_size] = data[indexes]
+
+    return gathered.view(_record_dtype(order, _FRAME_SIZE)).ravel()
+
+
+def _record_offsets(
+        data: Any,
+        order: str,
+        snaplen: int,
+        ticks: int,
+        segment: int = 1 << 16,
+        overlap: int = 1 << 12,
+) -> tuple[Any, int]:
+    """Returns the offsets of the records found by walking every `segment`
+    bytes of the file at once, and the offset they stop at.
+
+    A walk started in the middle of a record reads a garbage header at first:
+    it starts again one byte further whenever a header is not plausible (a
+    fraction of second of `ticks` or more, a caplen shorter than an Ethernet
+    header, above the snapshot length or above its len, or a len above the
+    largest packet length), until it lands on a record boundary and follows the
+    records from there. A header jumping out of the segment must be followed by
+    a plausible one, so that a garbage header does not end the walk. Every walk
+    goes `overlap` bytes past the start of the next one: from the first offset
+    both visit, the next walk follows the records too. Only the records chained
+    from the first byte are returned, so that a wrong guess stops the chain
+    early instead of breaking it.
+    """
+
+    size = len(data)
+    # the last walk goes to the end of the file, and starts at least a segment before it.
+    starts = np.arange(0, max(size - segment, 1), segment, dtype=np.int64)
+    limits = np.minimum(starts + segment + overlap, size)
+    limits[-1] = size
+    # the ts_frac, caplen and len fields of a record header.
+    header_fields = np.arange(4, 16)
+
+    def read_headers(offsets: Any) -> tuple[Any, Any]:
+        fields = np.ascontiguousarray(data[offsets[:, None] + header_fields])
+        fraction, caplen, length = fields.view(f'{order}u4').reshape(-1, 3).T.astype(np.int64)
+        plausible = (
+            (fraction < ticks) & (_ETHER_HEADER_SIZE <= caplen) & (caplen <= snaplen)
+            & (caplen <= length) & (length <= _MAX_SNAPLEN)
+        )
+        return plausible, offsets + _RECORD_HEADER_SIZE + caplen
+
+    seeds, positions, lanes = starts.copy(), starts.copy(), np.arange(len(starts))
+    visits: list[tuple[Any, Any, Any, int]] = []
+    step = 0
+    while len(lanes):
+        offsets = positions[lanes]
+        inside = offsets + _RECORD_HEADER_SIZE <= size
+        lanes, offsets = lanes[inside], offsets[inside]
+        plausible, links = read_headers(offsets)
+
+        # a walk leaving its segment before it follows the records would end
+        # there: the header it jumps to must be plausible too.
+        leaving = np.flatnonzero(
+            plausible & (links >= limits[lanes]) & (links + _RECORD_HEADER_SIZE <= size)
+        )
+        plausible[leaving] = read_headers(links[leaving])[0]
+
+        restarted = lanes[~plausible]
+        seeds[restarted] += 1
+        positions[restarted] = seeds[restarted]
+
+        complete = plausible & (links <= size)
+        visits.append((lanes[complete], offsets[complete], links[complete], step))
+        positions[lanes[complete]] = links[complete]
+
+        # walks end past their limit, or at a record truncated by the end of the file.
+        lanes = lanes[(positions[lanes] < limits[lanes]) & (plausible <= complete)]
+        step += 1
+
+    if not visits:
+        return np.zeros(0, dtype=np.int64), 0
+
+    lanes = np.concatenate([visit[0] for visit in visits])
+    offsets = np.concatenate([visit[1] for visit in visits])
+    links = np.concatenate([visit[2] for visit in visits])
+    steps = np.concatenate([np.full(len(visit[0]), visit[3]) for visit in visits])
+
+    # the first step of every walk at an offset also visited by the previous walk.
+    by_offset = np.lexsort((lanes, offsets))
+    shared_offsets, shared_lanes = offsets[by_offset], lanes[by_offset]
+    shared = np.flatnonzero(
+        (shared_offsets[1:] == shared_offsets[:-1]) & (shared_lanes[1:] == shared_lanes[:-1] + 1)
+    ) + 1
+    synced = np.full(len(starts), np.iinfo(np.int64).max)
+    synced[0] = 0
+    np.minimum.at(synced, shared_lanes[shared], steps[by_offset][shared])
+
+    followed = steps >= synced[lanes]
+    offsets, first = np.unique(offsets[followed], return_index=True)
+    links = links[followed][first]
+
+    # the records are right as long as they chain from the first byte: the
+    # walks that could not follow them leave a gap, the chain stops there.
+    if not len(offsets) or offsets[0] != 0:
+        return offsets[:0], 0
+
+    gaps = np.flatnonzero(links[:-1] != offsets[1:])
+    chained = gaps[0] + 1 if len(gaps) else len(offsets)
+    return offsets[:chained], int(links[chained - 1])
+
+
+def _walk_records(data: Any, order: str, offset: int = 0) -> Any:
+    # reads the record headers one by one.
+    caplen_format, buffer = struct.Struct(f'{order}I'), memoryview(data)
+    offsets, size = [], len(data)
+
+    while offset + _RECORD_HEADER_SIZE <= size:
+        caplen = caplen_format.unpack_from(buffer, offset + 8)[0]
+        if offset + _RECORD_HEADER_SIZE + caplen > size:
+            break
+
+        offsets.append(offset)
+        offset += _RECORD_HEADER_SIZE + caplen
+
+    return np.asarray(offsets, dtype=np.int64)
+
+
+def _mac_column(column: Any) -> Any:
+    raw = np.frombuffer(column.tobytes(), dtype=np.uint8).reshape(-1, 6).astype(np.uint64)
+    shifts = np.arange(40, -1, -8, dtype=np.uint64)
+
+    return (raw << shifts).sum(axis=1, dtype=np.uint64)
+
+
+def _empty_columns() -> ArpColumns:
+    return ArpColumns(*(np.empty(0, dtype=dtype) for dtype in (
+        np.float64, np.uint16, np.uint64, np.uint32, np.uint64, np.uint32
+    )))
@@ -0,0 +1,161 @@
+"""Provides an engine that detects MAC flips and ARP spoofing attempts."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections.abc import Callable
+import math
+from typing import Literal, NamedTuple
+
+
+class Alert(NamedTuple):
+    """A suspicious change in the MAC/IP associations of the network."""
+
+    kind: Literal['mac-change', 'ip-conflict', 'arp-storm']
+    """The type of alert:
+     - `mac-change`: the IP address moved to a new MAC address.
+     - `ip-conflict`: more than one MAC address keeps claiming the IP address
+       (a MAC address claimed it back while another one was claiming it).
+     - `arp-storm`: the MAC address is sending ARP requests at an abnormal rate.
+    """
+
+    ip: str
+    """The IP address."""
+
+    mac: str
+    """The MAC address that triggered the alert."""
+
+    previous: tuple[str, ...]
+    """The other MAC addresses that claimed the IP address."""
+
+    timestamp: float
+    """When the alert was raised, as a UNIX timestamp."""
+
+
+class SpoofDetector:
+    """Keeps a reverse IP -> MAC index of the sniffed associations and raises
+    alerts when an IP address changes MAC address or is claimed by several
+    MAC addresses at once.
+
+    An IP address moving to a MAC address raises a `mac-change` alert, unless
+    that MAC address was still claiming it (seen within the last `ttl` seconds):
+    then both MAC addresses are claiming it, and an `ip-conflict` is raised.
+
+    Identical alerts (same kind, IP and MAC) are raised at most once every
+    `cooldown` seconds.
+
+    Typical usage:
+        detector = SpoofDetector(ttl=300)
+        detector.add_listener(print)
+        detector.observe(mac, ip, time.time())
+    """
+
+    def __init__(self, ttl: float, cooldown: float = 60.0):
+        """Args:
+            ttl:
+                how long a MAC address is considered to be claiming an IP address
+                after it was last seen, in seconds.
+            cooldown:
+                minimum time between two identical alerts, in seconds.
+        """
+
+        self._ttl, self._cooldown = ttl, cooldown
+
+        self._claims: dict[str, dict[str, float]] = {}
+        self._owners: dict[str, str] = {}
+        self._last_alerts: dict[tuple[str, str, str], float] = {}
+        self._sweep_threshold: int = 1024
+
+        self._listeners: list[Callable[[Alert], None]] = []
+        self._suppressed: int = 0
+
+    @property
+    def suppressed(self) -> int:
+        """How many alerts have been suppressed by the rate limiter."""
+
+        return self._suppressed
+
+    def add_listener(self, listener: Callable[[Alert], None]) -> None:
+        """Registers a function that gets called on every alert."""
+
+        self._listeners.append(listener)
+
+    def observe(self, mac: str, ip: str, timestamp: float) -> Alert | None:
+        """Feeds a sniffed MAC/IP association to the detector.
+
+        Args:
+            mac:
+                the advertised MAC address.
+            ip:
+                the advertised IP address.
+            timestamp:
+                when the association was sniffed, as a UNIX timestamp.
+
+        Returns:
+            the raised alert, if any.
+        """
+
+        owner = self._owners.get(ip)
+        self._owners[ip] = mac
+
+        if (claims := self._claims.get(ip)) is None:
+            self._claims[ip] = {mac: timestamp}
+
+            return None
+
+        last_claim = claims.get(mac)
+        claims[mac] = timestamp
+
+        # fast path: the owner of the IP address claims it again.
+        if owner == mac:
+            return None
+
+        for claimant, last_seen in tuple(claims.items()):
+            if timestamp - last_seen > self._ttl:
+                del claims[claimant]
+
+        if last_claim is not None and timestamp - last_claim <= self._ttl:
+            others = tuple(claimant for claimant in claims if claimant != mac)
+            return self.report(Alert('ip-conflict', ip, mac, others, timestamp))
+
+        return self.report(Alert('mac-change', ip, mac, (owner,), timestamp))
+
+    def report(self, alert: Alert) -> Alert | None:
+        """Raises an alert through the rate limiter and notifies the listeners.
+
+        Returns:
+            the alert, or None if it was suppressed.
+        """
+
+        key = (alert.kind, alert.ip, alert.mac)
+
+        if alert.timestamp - self._last_alerts.get(key, -math.inf) < self._cooldown:
+            self._suppressed += 1
+
+            return None
+
+        self._last_alerts[key] = alert.timestamp
+        if len(self._last_alerts) > self._sweep_threshold:
+            self._last_alerts = {
+                key: last for key, last in self._last_alerts.items()
+                if alert.timestamp - last < self._cooldown
+            }
+            self._sweep_threshold = max(1024, 2 * len(self._last_alerts))
+
+        for listener in self._listeners:
+            listener(alert)
+
+        return alert
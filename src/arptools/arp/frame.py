@@ -0,0 +1,167 @@
+"""Provides helpers to interpret the fields of an ARP packet."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from socket import inet_aton, inet_ntoa
+import struct
+from typing import Any, Literal, NamedTuple, Optional
+
+from ..modules.pcap import LINKTYPE_ETHERNET, LINKTYPE_LINUX_SLL
+
+
+ArpKind = Literal['request', 'probe', 'announcement', 'reply', 'garp', 'other']
+"""The role of an ARP packet on the network:
+ - `request`: a who-has request (op 1).
+ - `probe`: a request with an unspecified sender address, see RFC 5227.
+ - `announcement`: a request for the sender's own address (gratuitous request).
+ - `reply`: an is-at reply (op 2).
+ - `garp`: a reply for the sender's own address (gratuitous reply).
+ - `other`: any other operation (e.g. RARP).
+"""
+
+ARP_KINDS: tuple[ArpKind, ...] = ('request', 'probe', 'announcement', 'reply', 'garp', 'other')
+
+
+def classify(op: int, psrc: str, pdst: str) -> ArpKind:
+    """Returns the role of an ARP packet, given its operation and protocol addresses."""
+
+    if op == 1:
+        if psrc == '0.0.0.0':
+            return 'probe'
+
+        return 'announcement' if psrc == pdst else 'request'
+
+    if op == 2:
+        return 'garp' if psrc == pdst else 'reply'
+
+    return 'other'
+
+
+_ETHERTYPE_ARP: int = 0x0806
+_ETHERTYPE_VLAN: tuple[int, ...] = (0x8100, 0x88A8, 0x9100)
+
+# Ethernet/IPv4 ARP header (hardware type 1, protocol type 0x0800).
+_ARP_HEADER = struct.Struct('!HHBBH6s4s6s4s')
+
+
+class ArpFrame(NamedTuple):
+    """The fields of an Ethernet/IPv4 ARP packet."""
+
+    op: int
+    """The ARP operation (1: who-has, 2: is-at)."""
+
+    hwsrc: str
+    """The sender MAC address."""
+
+    psrc: str
+    """The sender IP address."""
+
+    hwdst: str
+    """The target MAC address."""
+
+    pdst: str
+    """The target IP address."""
+
+    @property
+    def kind(self) -> ArpKind:
+        """The role of the packet on the network."""
+
+        return classify(self.op, self.psrc, self.pdst)
+
+    @classmethod
+    def from_packet(cls, packet: Any) -> 'ArpFrame':
+        """Returns the fields of a scapy ARP packet (or of any packet with an ARP layer)."""
+
+        if (arp := packet.getlayer('ARP')) is None:
+            raise ValueError('not an ARP packet')
+
+        # reading the values that are set (e.g. on dissected packets) directly skips
+        # scapy's field resolution, which is only needed for the default values.
+        fields = arp.fields
+        return cls(*(
+            value if (value := fields.get(name)) is not None else getattr(arp, name)
+            for name in cls._fields
+        ))
+
+    @classmethod
+    def from_bytes(
+            cls,
+            data: bytes | memoryview,
+            linktype: int = LINKTYPE_ETHERNET,
+    ) -> Optional['ArpFrame']:
+        """Decodes a link layer frame.
+
+        Args:
+            data:
+                the frame, starting from the link layer header.
+            linktype:
+                the link layer header type (Ethernet and Linux cooked captures are supported).
+
+        Returns:
+            the ARP fields, or None if the frame is not an Ethernet/IPv4 ARP packet.
+        """
+
+        if linktype == LINKTYPE_ETHERNET:
+            offset = 12
+        elif linktype == LINKTYPE_LINUX_SLL:
+            offset = 14
+        else:
+            return None
+
+        if len(data) < offset + 2 + _ARP_HEADER.size:
+            return None
+
+        ethertype = (data[offset] << 8) | data[offset + 1]
+        while ethertype in _ETHERTYPE_VLAN and len(data) >= offset + 6:
+            offset += 4
+            ethertype = (data[offset] << 8) | data[offset + 1]
+
+        if ethertype != _ETHERTYPE_ARP or len(data) < offset + 2 + _ARP_HEADER.size:
+            return None
+
+        htype, ptype, hlen, plen, op, hwsrc, psrc, hwdst, pdst = _ARP_HEADER.unpack_from(
+            data, offset + 2
+        )
+        if (htype, ptype, hlen, plen) != (1, 0x0800, 6, 4):
+            return None
+
+        return cls(op, hwsrc.hex(':'), inet_ntoa(psrc), hwdst.hex(':'), inet_ntoa(pdst))
+
+    def to_bytes(
+            self,
+            ethernet_src: Optional[str] = None,
+            ethernet_dst: Optional[str] = None,
+    ) -> bytes:
+        """Encodes the packet in an Ethernet frame, padded to the minimum frame size.
+
+        Args:
+            ethernet_src:
+                the source MAC address of the frame (default: the sender MAC address).
+            ethernet_dst:
+                the destination MAC address of the frame (default: broadcast).
+        """
+
+        return b''.join((
+            bytes.fromhex((ethernet_dst or 'ff:ff:ff:ff:ff:ff').replace(':', '')),
+            bytes.fromhex((ethernet_src or self.hwsrc).replace(':', '')),
+            _ETHERTYPE_ARP.to_bytes(2),
+            _ARP_HEADER.pack(
+                1, 0x0800, 6, 4, self.op,
+                bytes.fromhex(self.hwsrc.replace(':', '')), inet_aton(self.psrc),
+                bytes.fromhex(self.hwdst.replace(':', '')), inet_aton(self.pdst),
+            ),
+        )).ljust(60, b'\x00')
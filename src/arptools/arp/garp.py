@@ -15,28 +15,63 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from typing import Optional
+from collections.abc import Collection, Iterator
+import heapq
+import random
+import time
+from typing import NamedTuple, Optional
 
 from scapy.layers.l2 import ARP
 from scapy.packet import Packet
-from scapy.plist import PacketList, SndRcvList
+from scapy.supersocket import SuperSocket
 
-from .packets.reply import arp_reply
+from .packets import _print_exchanges
+from .packets.advertise import advertise_mappings, mapping_exchanges, mapping_frames
+from .packets.exchange import Exchange, open_socket
+from .packets.formatters import Formatter, OutputFormat
+from .packets.session import ArpSession
+from .packets.statistics import ExchangeStatistics
+from .result import ArpResult
+from ..modules.pcap import RotatingPcapWriter
+
+
+class Keepalive(NamedTuple):
+    """A MAC/IP mapping advertised periodically."""
+
+    mac: str
+    """The MAC address to advertise."""
+
+    ip: str
+    """The IP address to advertise."""
+
+    interval: float
+    """The time between two advertisements, in seconds."""
+
+    jitter: float = 0.0
+    """The largest random delay added to every advertisement, in seconds."""
+
+
+def _garp_prnfail(unanswered: Packet) -> str | None:
+    return f'GARP is-at {unanswered[ARP].hwsrc} says {unanswered[ARP].pdst}'
 
 
 def garp_reply(
-        mapping: tuple[str, str],
+        mapping: tuple[str, str] | Collection[tuple[str, str]],
         ethernet_src: Optional[str] = None,
         ethernet_dst: Optional[str] = None,
         count: int = 0,
         interval: float = 1.0,
+        rate: Optional[float] = None,
         verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
 ) -> None:
     """Sends a gratuitous ARP reply advertising the given MAC/IP mapping.
 
     Args:
         mapping:
-            a MAC/IP pair.
+            a MAC/IP pair (or a collection of pairs, advertised in rounds).
         ethernet_src:
             the source MAC address of the Ethernet frame.
         ethernet_dst:
@@ -45,23 +80,190 @@ def garp_reply(
             how many packet to send.
         interval:
             time interval between packets (only used when count is 0).
+        rate:
+            the maximum number of packets sent per second (default: no limit).
         verbose:
             verbosity level.
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet is recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
     """
 
-    def _arp_announcement_prnfail(unanswered: Packet | PacketList | SndRcvList) -> str | None:
-        return '\n'.join((
-            f'\rGARP is-at {pkt.hwsrc} says {pkt.pdst}' for pkt in unanswered[ARP]
-        ))
-
-    arp_reply(
-        target_ip=mapping[1],
+    advertise_mappings(
+        'is-at',
+        [mapping] if isinstance(mapping[0], str) else mapping,
         ethernet_src=ethernet_src,
         ethernet_dst=ethernet_dst,
-        arp_hwsrc=mapping[0],
-        arp_psrc=mapping[1],
         count=count,
         interval=interval,
+        rate=rate,
         verbose=verbose,
-        prnfail=_arp_announcement_prnfail,
+        prnfail=_garp_prnfail if output_format == 'text' else None,
+        output_format=output_format,
+        pcap_writer=pcap_writer,
+        session=session,
     )
+
+
+def iter_garp_reply(
+        mapping: tuple[str, str] | Collection[tuple[str, str]],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        count: int = 1,
+        interval: float = 1.0,
+        rate: Optional[float] = None,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+) -> Iterator[ArpResult]:
+    """Sends gratuitous ARP replies advertising the given MAC/IP mappings, and
+    yields a result for every sent frame as soon as it is sent.
+
+    Gratuitous replies are not answered: the target IP of every result is the
+    advertised IP, and its MAC address is always None.
+
+    Args:
+        mapping:
+            a MAC/IP pair (or a collection of pairs, advertised in rounds).
+        ethernet_src:
+            the source MAC address of the Ethernet frame.
+        ethernet_dst:
+            the destination MAC address of the Ethernet frame.
+        count:
+            how many packet to send for every mapping (0: until the generator is closed).
+        interval:
+            time interval between rounds (only used when count is 0).
+        rate:
+            the maximum number of packets sent per second (default: no limit).
+        pcap_writer:
+            if set, every sent packet is recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+    """
+
+    for sent in mapping_exchanges(
+            'is-at',
+            [mapping] if isinstance(mapping[0], str) else mapping,
+            ethernet_src=ethernet_src,
+            ethernet_dst=ethernet_dst,
+            count=count,
+            interval=interval,
+            rate=rate,
+            pcap_writer=pcap_writer,
+            session=session,
+    ):
+        yield ArpResult.from_exchange(sent)
+
+
+def _keepalive_exchanges(
+        keepalives: list[Keepalive],
+        frames: list[Packet],
+        socket: SuperSocket,
+        pcap_writer: Optional[RotatingPcapWriter],
+        statistics: ExchangeStatistics,
+) -> Iterator[Exchange]:
+    """Sends the frame of every keepalive when it is due, forever, and yields
+    an (unanswered) exchange for every sent frame.
+
+    The socket receives every ARP frame of the network: it is drained while
+    waiting, so that the frames do not pile up in its receive buffer.
+    """
+
+    start = time.monotonic()
+    rounds = [0] * len(keepalives)
+
+    # the due time of every keepalive, without its jitter (so that the random
+    # delays do not accumulate), and the time it is sent at.
+    heap = [
+        (start + random.uniform(0, keepalive.jitter), start, i)
+        for i, keepalive in enumerate(keepalives)
+    ]
+    heapq.heapify(heap)
+
+    while heap:
+        send_time, due, i = heap[0]
+        while (wait := send_time - time.monotonic()) > 0:
+            if socket.select([socket], wait):
+                socket.recv()
+
+        frame, keepalive = frames[i], keepalives[i]
+        data = bytes(frame)
+        socket.send(data)
+        frame.sent_time = now = time.time()
+
+        if pcap_writer is not None:
+            pcap_writer.write(data, now)
+
+        statistics.sent += 1
+        rounds[i] += 1
+
+        due += keepalive.interval
+        heapq.heapreplace(heap, (due + random.uniform(0, keepalive.jitter), due, i))
+
+        yield Exchange(frame, None, rounds[i])
+
+
+def garp_keepalive(
+        keepalives: Collection[Keepalive],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+) -> None:
+    """Sends gratuitous ARP replies advertising every mapping at its own interval,
+    until the user interrupts them.
+
+    Every mapping is scheduled on a single heap of due times, so thousands of
+    mappings are refreshed by one loop over one socket.
+
+    Typical usage:
+        garp_keepalive([
+            Keepalive('de:ad:be:ef:00:01', '192.168.1.10', interval=30, jitter=5),
+            Keepalive('de:ad:be:ef:00:02', '192.168.1.11', interval=60),
+        ])
+
+    Args:
+        keepalives:
+            the mappings to advertise, with their interval and jitter.
+        ethernet_src:
+            the source MAC address of the Ethernet frames.
+        ethernet_dst:
+            the destination MAC address of the Ethernet frames (default: broadcast).
+        verbose:
+            verbosity level.
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet is recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+    """
+
+    keepalives = list(keepalives)
+    frames = mapping_frames(
+        'is-at',
+        [(keepalive.mac, keepalive.ip) for keepalive in keepalives],
+        ethernet_src,
+        ethernet_dst,
+        session,
+    )
+
+    formatter = Formatter(output_format)
+    statistics = ExchangeStatistics()
+    socket = session.socket if session is not None else open_socket()
+
+    try:
+        _print_exchanges(
+            _keepalive_exchanges(keepalives, frames, socket, pcap_writer, statistics),
+            statistics,
+            prnfail=_garp_prnfail if output_format == 'text' else formatter.unanswered,
+            verbose=verbose,
+            formatter=formatter,
+        )
+    finally:
+        if session is None:
+            socket.close()
@@ -0,0 +1,495 @@
+"""Provides a persistent store for the MAC/IP associations seen by the passive scanner."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from contextlib import closing
+from datetime import datetime
+from ipaddress import ip_address
+import logging
+import math
+import os
+import sqlite3
+from threading import Event, Lock, Thread
+from typing import Any, NamedTuple, Optional
+from urllib.request import pathname2url
+from zlib import crc32
+
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA: str = '''
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    mac TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    hits INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_ip ON observations (ip, last_seen);
+CREATE INDEX IF NOT EXISTS observations_mac ON observations (mac, last_seen);
+CREATE INDEX IF NOT EXISTS observations_time ON observations (last_seen, first_seen);
+'''
+
+# R*Tree interval index over (time, ip, mac) used to answer point-in-time queries.
+# R*Tree coordinates are 32-bit floats rounded outwards, so every match has to be
+# checked again against the observations table.
+_SPANS_SCHEMA: str = '''
+CREATE VIRTUAL TABLE observation_spans USING rtree(
+    id,
+    first_seen, last_seen,
+    ip_min, ip_max,
+    mac_min, mac_max
+);
+'''
+
+
+class Observation(NamedTuple):
+    """A time interval during which a MAC/IP pair has been seen on the network."""
+
+    mac: str
+    """The MAC address."""
+
+    ip: str
+    """The IP address."""
+
+    first_seen: float
+    """UNIX timestamp of the first sighting."""
+
+    last_seen: float
+    """UNIX timestamp of the last sighting."""
+
+    hits: int
+    """How many packets advertised the pair."""
+
+
+def _ip_key(ip: str) -> int:
+    return int(ip_address(ip))
+
+
+def _mac_key(mac: str) -> int:
+    return crc32(mac.lower().encode())
+
+
+def _has_spans(connection: sqlite3.Connection) -> bool:
+    return connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'observation_spans'"
+    ).fetchone() is not None
+
+
+def _lookup(
+        connection: sqlite3.Connection,
+        has_spans: bool,
+        ip: Optional[str],
+        mac: Optional[str],
+        start: float,
+        end: float,
+) -> list[Observation]:
+    conditions, parameters = ['o.last_seen >= ?', 'o.first_seen <= ?'], [start, end]
+    if ip is not None:
+        conditions.append('o.ip = ?')
+        parameters.append(ip)
+    if mac is not None:
+        conditions.append('o.mac = ?')
+        parameters.append(mac.lower())
+
+    if has_spans:
+        span_conditions, span_parameters = ['s.last_seen >= ?', 's.first_seen <= ?'], [start, end]
+        if ip is not None:
+            span_conditions.append('s.ip_min <= ? AND s.ip_max >= ?')
+            span_parameters.extend((_ip_key(ip),) * 2)
+        if mac is not None:
+            span_conditions.append('s.mac_min <= ? AND s.mac_max >= ?')
+            span_parameters.extend((_mac_key(mac),) * 2)
+
+        # CROSS JOIN makes the interval index drive the query.
+        query = (
+            'SELECT o.mac, o.ip, o.first_seen, o.last_seen, o.hits '
+            'FROM observation_spans AS s CROSS JOIN observations AS o ON o.id = s.id '
+            f'WHERE {' AND '.join(span_conditions + conditions)} '
+            'ORDER BY o.first_seen'
+        )
+        parameters = span_parameters + parameters
+    else:
+        query = (
+            'SELECT o.mac, o.ip, o.first_seen, o.last_seen, o.hits '
+            f'FROM observations AS o WHERE {' AND '.join(conditions)} '
+            'ORDER BY o.first_seen'
+        )
+
+    return [Observation(*row) for row in connection.execute(query, parameters)]
+
+
+class _Observation:
+    """In memory copy of an observation row that is still being updated."""
+
+    __slots__ = ('mac', 'ip', 'rowid', 'first_seen', 'last_seen', 'hits', 'dirty', 'resume')
+
+    def __init__(
+            self,
+            mac: str,
+            ip: str,
+            rowid: int | None,
+            first_seen: float,
+            last_seen: float,
+            hits: int,
+    ):
+        self.mac, self.ip = mac, ip
+        self.rowid, self.hits = rowid, hits
+        self.first_seen, self.last_seen = first_seen, last_seen
+        self.dirty: bool = False
+        # whether the latest stored observation of the pair may have to be continued.
+        self.resume: bool = False
+
+
+class MappingHistory:
+    """SQLite backed history of MAC/IP associations.
+
+    Every row of the `observations` table is a time interval during which a
+    (MAC, IP) pair has been seen with gaps no longer than `gap` seconds, together
+    with the number of packets that advertised it.
+
+    Observations are buffered in memory and written in a single transaction every
+    `commit_interval` seconds by a background thread: recording a sighting never
+    touches the database.
+
+    Typical usage:
+        with MappingHistory('arp.db', gap=300) as history:
+            model.add_listener(history.record_event)
+    """
+
+    def __init__(self, path: str, gap: float = 60 * 5, commit_interval: float = 5.0):
+        """Args:
+            path:
+                path of the SQLite database file.
+            gap:
+                how long a pair can go unseen before a new observation is started,
+                in seconds.
+            commit_interval:
+                time between two consecutive write transactions, in seconds.
+        """
+
+        self._gap, self._commit_interval = gap, commit_interval
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+        self._has_spans: bool = self._init_spans()
+
+        # `_lock` guards the buffered observations, `_connection_lock` the database:
+        # a transaction never blocks the threads recording sightings.
+        self._lock, self._connection_lock = Lock(), Lock()
+        self._open: dict[tuple[str, str], _Observation] = {}
+        self._dirty: list[_Observation] = []
+
+        self._stop_event = Event()
+        self._flush_thread = Thread(target=self._flush_loop, daemon=True)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The underlying database connection."""
+
+        return self._connection
+
+    def record(self, mac: str, ip: str, timestamp: float) -> None:
+        """Records a sighting of a MAC/IP pair.
+
+        Args:
+            mac:
+                the MAC address.
+            ip:
+                the IP address.
+            timestamp:
+                when the pair was seen, as a UNIX timestamp.
+        """
+
+        mac = mac.lower()
+
+        with self._lock:
+            observation = self._open.get(key := (mac, ip))
+
+            if observation is None:
+                # the stored observations are looked up by the next flush.
+                observation = _Observation(mac, ip, None, timestamp, timestamp, 0)
+                observation.resume = True
+                self._open[key] = observation
+            elif timestamp - observation.last_seen > self._gap:
+                observation = _Observation(mac, ip, None, timestamp, timestamp, 0)
+                self._open[key] = observation
+
+            observation.last_seen = max(observation.last_seen, timestamp)
+            observation.hits += 1
+
+            if not observation.dirty:
+                observation.dirty = True
+                self._dirty.append(observation)
+
+    def record_event(self, event: Any) -> None:
+        """Records a MappingEvent (expire events are ignored)."""
+
+        if event.kind != 'expire':
+            self.record(event.mac, event.ip, event.timestamp)
+
+    def flush(self) -> None:
+        """Writes every pending observation in a single transaction."""
+
+        with self._connection_lock:
+            with self._lock:
+                pending, self._dirty = self._dirty, []
+
+            if not pending:
+                return
+
+            stored = {
+                id(observation): row
+                for observation in pending
+                if observation.resume and (row := self._latest(observation))
+            }
+
+            # the sightings recorded from now on are written by the next flush.
+            with self._lock:
+                for observation in pending:
+                    if row := stored.get(id(observation)):
+                        observation.rowid, observation.first_seen = row[0], row[1]
+                        observation.last_seen = max(observation.last_seen, row[2])
+                        observation.hits += row[3]
+
+                    observation.resume = observation.dirty = False
+
+                snapshots = [
+                    (observation, observation.last_seen, observation.hits)
+                    for observation in pending
+                ]
+
+            with self._connection:
+                for observation, last_seen, hits in snapshots:
+                    if observation.rowid is None:
+                        observation.rowid = self._insert(observation, last_seen, hits)
+                    else:
+                        self._connection.execute(
+                            'UPDATE observations SET last_seen = ?, hits = ? WHERE id = ?',
+                            (last_seen, hits, observation.rowid),
+                        )
+
+                        if self._has_spans:
+                            self._connection.execute(
+                                'UPDATE observation_spans SET last_seen = ? WHERE id = ?',
+                                (last_seen, observation.rowid),
+                            )
+
+        newest: float = max(last_seen for _, last_seen, _ in snapshots)
+
+        # forget pairs that can not be resumed anymore.
+        with self._lock:
+            for key, observation in tuple(self._open.items()):
+                if newest - observation.last_seen > self._gap and not observation.dirty:
+                    del self._open[key]
+
+    def close(self) -> None:
+        """Writes every pending observation and closes the database."""
+
+        self._stop_event.set()
+        if self._flush_thread.is_alive():
+            self._flush_thread.join()
+
+        self.flush()
+        self._connection.close()
+
+    def lookup(
+            self,
+            ip: Optional[str] = None,
+            mac: Optional[str] = None,
+            start: float = -math.inf,
+            end: float = math.inf,
+    ) -> list[Observation]:
+        """Returns the observations of an IP and/or MAC address that overlap a time interval.
+
+        Args:
+            ip:
+                the IP address to look up.
+            mac:
+                the MAC address to look up.
+            start:
+                start of the time interval, as a UNIX timestamp.
+            end:
+                end of the time interval, as a UNIX timestamp
+                (use the same value as start for a point in time).
+        """
+
+        with self._connection_lock:
+            return _lookup(self._connection, self._has_spans, ip, mac, start, end)
+
+    def _init_spans(self) -> bool:
+        if _has_spans(self._connection):
+            return True
+
+        try:
+            with self._connection:
+                self._connection.executescript(_SPANS_SCHEMA)
+
+                # index the observations written before the interval index existed.
+                rows = self._connection.execute(
+                    'SELECT id, mac, ip, first_seen, last_seen FROM observations'
+                ).fetchall()
+                self._connection.executemany(
+                    'INSERT INTO observation_spans VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        (rowid, first, last, *(_ip_key(ip),) * 2, *(_mac_key(mac),) * 2)
+                        for rowid, mac, ip, first, last in rows
+                    ),
+                )
+        except sqlite3.OperationalError:
+            logger.debug('R*Tree module not available, history lookups will be slower.')
+
+            return False
+
+        return True
+
+    def _insert(self, observation: _Observation, last_seen: float, hits: int) -> int:
+        rowid = self._connection.execute(
+            'INSERT INTO observations (mac, ip, first_seen, last_seen, hits) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (
+                observation.mac,
+                observation.ip,
+                observation.first_seen,
+                last_seen,
+                hits,
+            ),
+        ).lastrowid
+
+        if self._has_spans:
+            self._connection.execute(
+                'INSERT INTO observation_spans VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    rowid,
+                    observation.first_seen,
+                    last_seen,
+                    *(_ip_key(observation.ip),) * 2,
+                    *(_mac_key(observation.mac),) * 2,
+                ),
+            )
+
+        return rowid
+
+    def _latest(self, observation: _Observation) -> Optional[tuple]:
+        # the latest stored observation of the pair, if it was seen recently enough
+        # to be continued.
+        row = self._connection.execute(
+            'SELECT id, first_seen, last_seen, hits FROM observations '
+            'WHERE ip = ? AND mac = ? ORDER BY last_seen DESC LIMIT 1',
+            (observation.ip, observation.mac),
+        ).fetchone()
+
+        if row and 0 <= observation.first_seen - row[2] <= self._gap:
+            return row
+
+        return None
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self._commit_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as err:
+                logger.error('could not write to the mapping history: %s.', err)
+
+    def __enter__(self):
+        self._flush_thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def lookup_history(
+        database: str,
+        ip: Optional[str] = None,
+        mac: Optional[str] = None,
+        start: float = -math.inf,
+        end: float = math.inf,
+) -> list[Observation]:
+    """Returns the observations of an IP and/or MAC address that overlap a time interval,
+    like MappingHistory.lookup(), opening the database read-only: it can be used while
+    a passive scanner is writing to it.
+
+    Args:
+        database:
+            path of the SQLite database written by the passive scanner.
+        ip:
+            the IP address to look up.
+        mac:
+            the MAC address to look up.
+        start:
+            start of the time interval, as a UNIX timestamp.
+        end:
+            end of the time interval, as a UNIX timestamp.
+    """
+
+    uri = f'file:{pathname2url(os.fspath(database))}?mode=ro'
+
+    with closing(sqlite3.connect(uri, uri=True)) as connection:
+        return _lookup(connection, _has_spans(connection), ip, mac, start, end)
+
+
+def arp_history(
+        database: str,
+        ip: Optional[str] = None,
+        mac: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+) -> None:
+    """Prints which MAC held an IP address (or which IP was held by a MAC)
+    at a given time, according to the history recorded by the passive scanner.
+
+    Args:
+        database:
+            path of the SQLite database written by the passive scanner.
+        ip:
+            the IP address to look up.
+        mac:
+            the MAC address to look up.
+        start:
+            start of the time interval, as a UNIX timestamp (default: the beginning).
+        end:
+            end of the time interval, as a UNIX timestamp (default: the end).
+    """
+
+    def _fmt_timestamp(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='seconds')
+
+    try:
+        observations = lookup_history(
+            database,
+            ip=ip,
+            mac=mac,
+            start=-math.inf if start is None else start,
+            end=math.inf if end is None else end,
+        )
+    except sqlite3.Error as err:
+        logger.error('could not read the mapping history: %s.', err)
+
+        return
+
+    for observation in observations:
+        print(
+            f'{observation.mac} <== {observation.ip} '
+            f'({_fmt_timestamp(observation.first_seen)} - '
+            f'{_fmt_timestamp(observation.last_seen)}, {observation.hits} hits)'
+        )
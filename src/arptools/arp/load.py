@@ -0,0 +1,284 @@
+"""Provides functions to generate ARP traffic at a target rate."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections.abc import Sequence
+from ipaddress import ip_network
+from itertools import cycle
+import math
+import random
+import socket
+import time
+from typing import Literal, Optional
+
+from scapy.arch import get_if_addr, get_if_hwaddr
+from scapy.config import conf
+from scapy.interfaces import network_name
+
+from .frame import ArpFrame
+from ..modules.scheduler import DeadlineScheduler
+from ..network import mac_dec_to_hex_notation
+
+
+LoadKind = Literal['request', 'reply', 'announcement']
+"""The kinds of ARP packets the load generator sends:
+ - `request`: requests from the source IPs, for the target IPs.
+ - `reply`: replies from the source IPs, to the target IPs.
+ - `announcement`: announcements of the target IPs.
+"""
+
+LOAD_KINDS: tuple[LoadKind, ...] = ('request', 'reply', 'announcement')
+
+MAX_POOL: int = 65536
+"""The largest number of distinct frames built before sending (they are sent in a loop)."""
+
+REPORT_INTERVAL: float = 1.0
+"""The time between two progress reports, in seconds."""
+
+
+def random_macs(count: int, rng: random.Random) -> list[str]:
+    """Returns `count` distinct random locally administered unicast MAC addresses."""
+
+    macs: set[int] = set()
+    while len(macs) < count:
+        # sets the locally administered bit, clears the multicast bit.
+        macs.add(rng.getrandbits(48) & ~(1 << 40) | (1 << 41))
+
+    return [mac_dec_to_hex_notation(mac) for mac in sorted(macs)]
+
+
+class _AddressPool(Sequence[str]):
+    """The IPs of a range, as strings built when they are indexed: at most
+    MAX_POOL of them end up in the frames, whatever the size of the range."""
+
+    def __init__(self, target_range: str):
+        self._network = ip_network(target_range, strict=False)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        return str(self._network[i])
+
+    def __len__(self) -> int:
+        return self._network.num_addresses
+
+
+def load_frames(
+        kind: LoadKind,
+        targets: Sequence[str],
+        sources: Sequence[str],
+        macs: Sequence[str],
+        ethernet_dst: Optional[str] = None,
+        rng: Optional[random.Random] = None,
+) -> list[bytes]:
+    """Returns the frames of a load, built once from pools of addresses.
+
+    Frames take their fields from the pools in turn (all of their combinations,
+    up to MAX_POOL frames), or at random if `rng` is set.
+
+    Args:
+        kind:
+            the kind of the ARP packets.
+        targets:
+            the pool of target IPs (the announced IPs for announcements).
+        sources:
+            the pool of source IPs (unused for announcements).
+        macs:
+            the pool of source MAC addresses (of the ARP packets and of their frames).
+        ethernet_dst:
+            the destination MAC address of the Ethernet frames (default: broadcast).
+        rng:
+            if set, the random generator the fields are drawn with.
+    """
+
+    if kind == 'announcement':
+        # announcements are sent from the IPs they announce.
+        sources = targets[:1]
+
+    def _frame(mac: str, source: str, target: str) -> bytes:
+        if kind == 'announcement':
+            source = target
+
+        # frames are encoded directly: scapy templates take ~1 ms per frame.
+        return ArpFrame(
+            1 if kind != 'reply' else 2, mac, source, '00:00:00:00:00:00', target,
+        ).to_bytes(ethernet_dst=ethernet_dst)
+
+    if rng is not None:
+        size = min(len(targets) * len(sources) * len(macs), MAX_POOL)
+
+        return [
+            _frame(rng.choice(macs), rng.choice(sources), rng.choice(targets))
+            for _ in range(size)
+        ]
+
+    size = min(len(targets) * len(sources) * len(macs), MAX_POOL)
+
+    # the targets change first, then the sources, then the MAC addresses.
+    return [
+        _frame(
+            macs[i // (len(targets) * len(sources)) % len(macs)],
+            sources[i // len(targets) % len(sources)],
+            targets[i % len(targets)],
+        )
+        for i in range(size)
+    ]
+
+
+def _tx_dropped(iface: str) -> Optional[int]:
+    # the frames dropped by the interface on transmission, if the kernel exposes them.
+    try:
+        with open(f'/sys/class/net/{iface}/statistics/tx_dropped', encoding='ascii') as file:
+            return int(file.read())
+    except (OSError, ValueError):
+        return None
+
+
+class _Progress:
+    def __init__(self, iface: str):
+        self.iface = iface
+        self.sent = self.errors = 0
+        self.start = self.last_time = time.monotonic()
+        self.last_sent = 0
+        self.dropped_before = _tx_dropped(iface)
+
+    @property
+    def dropped(self) -> Optional[int]:
+        if self.dropped_before is None or (dropped := _tx_dropped(self.iface)) is None:
+            return None
+
+        return dropped - self.dropped_before
+
+    def report(self, now: float) -> str:
+        pps = (self.sent - self.last_sent) / max(now - self.last_time, 1e-9)
+        self.last_sent, self.last_time = self.sent, now
+
+        return f'{now - self.start:6.1f} s: {self.line(pps)}'
+
+    def line(self, pps: float) -> str:
+        dropped = self.dropped
+
+        return (
+            f'sent {self.sent} ({pps:.0f} pps), {self.errors} send errors, '
+            f'{dropped if dropped is not None else "n/a"} dropped by the kernel'
+        )
+
+
+def arp_load(
+        kind: LoadKind,
+        target_range: str,
+        source_range: Optional[str] = None,
+        source_macs: int = 0,
+        ethernet_dst: Optional[str] = None,
+        pps: float = 1000.0,
+        count: int = 0,
+        duration: Optional[float] = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+        iface: Optional[str] = None,
+        verbose: Optional[int] = None,
+) -> None:
+    """Sends ARP packets at a target rate, reporting every second the rate
+    achieved, the send errors and the frames dropped by the kernel, until
+    `count` packets are sent, `duration` seconds pass, or the user interrupts it.
+
+    Args:
+        kind:
+            the kind of the ARP packets ('request', 'reply' or 'announcement').
+        target_range:
+            the pool of target IPs, in CIDR notation (the announced IPs for announcements).
+        source_range:
+            the pool of source IPs, in CIDR notation (default: the IP of the interface).
+        source_macs:
+            how many random source MAC addresses to use (0: the MAC of the interface).
+        ethernet_dst:
+            the destination MAC address of the Ethernet frames (default: broadcast).
+        pps:
+            how many packets to send per second.
+        count:
+            how many packets to send (0: no limit).
+        duration:
+            for how long to send packets, in seconds (default: no limit).
+        randomize:
+            whether to draw the fields of the packets at random from the pools
+            (default: in turn).
+        seed:
+            the seed of the random generator (default: random).
+        iface:
+            the network interface (default: scapy's default interface).
+        verbose:
+            verbosity level.
+    """
+
+    verbose = conf.verb if verbose is None else verbose
+    iface = network_name(iface or conf.iface)
+    rng = random.Random(seed)
+
+    frames = load_frames(
+        kind,
+        _AddressPool(target_range),
+        _AddressPool(source_range) if source_range else [get_if_addr(iface)],
+        random_macs(source_macs, rng) if source_macs else [get_if_hwaddr(iface)],
+        ethernet_dst,
+        rng if randomize else None,
+    )
+
+    # frames are sent in batches of about a millisecond.
+    batch = max(min(64, round(pps / 1000)), 1)
+    scheduler = DeadlineScheduler(batch / pps)
+    end = time.monotonic() + duration if duration else math.inf
+    remaining = count or math.inf
+
+    sender = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+    sender.bind((iface, 0))
+    sender.setblocking(False)
+
+    progress = _Progress(iface)
+    next_report = progress.start + REPORT_INTERVAL
+    frames_iter = cycle(frames)
+
+    try:
+        while remaining > 0 and (now := time.monotonic()) < end:
+            if verbose and now >= next_report:
+                print(progress.report(now), flush=True)
+                next_report += REPORT_INTERVAL
+
+            scheduler.wait()
+            scheduler.advance()
+
+            for _ in range(min(batch, remaining)):
+                try:
+                    sender.send(next(frames_iter))
+                    progress.sent += 1
+                except OSError:
+                    # the socket buffer or the interface queue is full.
+                    progress.errors += 1
+
+                remaining -= 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+
+    if verbose:
+        elapsed = time.monotonic() - progress.start
+        print(
+            f'\n{kind}s to {target_range} in {elapsed:.1f} s: '
+            f'{progress.line(progress.sent / max(elapsed, 1e-9))}\n'
+            f'schedule {scheduler.describe()}'
+        )
@@ -15,43 +15,90 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from contextlib import redirect_stdout
-from io import StringIO
+from collections.abc import Callable, Iterable
+import os
+import sys
+from typing import Any, Optional
 
+from scapy.config import conf
 from scapy.packet import Packet
-from scapy.plist import PacketList, QueryAnswer, SndRcvList
-
-
-def _fmt_summary(summary: str) -> str | None:
-    summary = (
-        summary
-        .replace('Ether / ', '')
-        .replace(' / Padding', '')
-        .replace('None', '')
-        .rstrip()
-    )
-
-    if summary:
-        return ''.join(('\r', summary))
-
-    return None
-
-
-def _prn(answer: QueryAnswer) -> str | None:
-    with redirect_stdout(stream := StringIO()):
-        SndRcvList([answer]).summary()
-
-    return _fmt_summary(stream.getvalue())
-
-
-def _prn_qofr(answer: QueryAnswer) -> None:
-    print(_prn(answer))
-
-    raise KeyboardInterrupt
-
-
-def _prnfail(unanswered: Packet | PacketList | SndRcvList) -> str | None:
-    with redirect_stdout(stream := StringIO()):
-        PacketList([unanswered]).summary()
-
-    return _fmt_summary(stream.getvalue())
+from scapy.plist import QueryAnswer
+
+from .exchange import Exchange
+from .formatters import Formatter
+from .statistics import ExchangeStatistics, StatusLine
+
+
+def _print_exchanges(
+        exchanges: Iterable[Exchange],
+        statistics: ExchangeStatistics,
+        prn: Optional[Callable[[QueryAnswer], Any]] = None,
+        prnfail: Optional[Callable[[Packet], Any]] = None,
+        verbose: Optional[int] = None,
+        formatter: Optional[Formatter] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
+) -> None:
+    """Prints a line for every exchange as soon as it is complete, until the
+    exchanges are over or the user interrupts them.
+
+    Args:
+        exchanges:
+            the exchanges to print.
+        statistics:
+            the statistics the exchanges are counted in.
+        prn:
+            function used to print packets that have received an answer.
+        prnfail:
+            function used to print packets that have not received an answer.
+        verbose:
+            verbosity level.
+        formatter:
+            the formatter of the output lines (default: text). With the text format,
+            lines are only printed from verbosity level 2 (a mark per packet is
+            printed at level 1), followed by the summary of the statistics.
+        rtt_histogram:
+            whether to add the histogram of the round-trip times to the summary.
+        live_statistics:
+            whether to keep a line with the latest statistics at the bottom of
+            the terminal (text format only, instead of the marks of level 1).
+    """
+
+    verbose = conf.verb if verbose is None else verbose
+    formatter = formatter or Formatter()
+    text = formatter.output_format == 'text'
+
+    status = None
+    if live_statistics and verbose and text and sys.stderr.isatty():
+        status = StatusLine(statistics)
+
+    if verbose and formatter.header:
+        print(formatter.header)
+
+    try:
+        for query, reply, _attempt in exchanges:
+            if verbose > 1 or (verbose and not text):
+                if reply is not None:
+                    line = prn(QueryAnswer(query, reply)) if prn else None
+                else:
+                    line = prnfail(query) if prnfail else None
+
+                if line:
+                    if status is not None:
+                        status.clear()
+                    print(line, flush=True)
+                    if status is not None:
+                        status.update(force=True)
+            elif verbose == 1 and status is None:
+                os.write(1, b'*' if reply is not None else b'.')
+
+            if status is not None:
+                status.update()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if status is not None:
+            status.clear()
+
+    if verbose and text and statistics.sent:
+        print(f'\n{statistics.summary(histogram=rtt_histogram)}')
@@ -0,0 +1,211 @@
+"""Contains the functions that advertise many MAC/IP mappings at once."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections.abc import Callable, Collection, Iterator, Sequence
+from itertools import repeat
+import math
+from typing import Optional
+
+from scapy.arch import get_if_hwaddr
+from scapy.config import conf
+from scapy.layers.l2 import Ether
+from scapy.packet import Packet
+
+from . import _print_exchanges
+from .exchange import Exchange, exchange
+from .formatters import Formatter, OutputFormat
+from .session import ArpSession
+from .statistics import ExchangeStatistics
+from ..frame import ArpFrame
+from ...modules.pcap import RotatingPcapWriter
+
+
+MAX_BATCH: int = 64
+"""The largest number of frames sent back to back when the rate is capped."""
+
+
+def mapping_frames(
+        op: str,
+        mappings: Collection[tuple[str, str]],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        session: Optional[ArpSession] = None,
+) -> list[Packet]:
+    """Returns the frames advertising every MAC/IP mapping, built once.
+
+    Args:
+        op:
+            the ARP operation ('who-has' for announcements, 'is-at' for gratuitous replies).
+        mappings:
+            the MAC/IP pairs.
+        ethernet_src:
+            the source MAC address of the Ethernet frames.
+        ethernet_dst:
+            the destination MAC address of the Ethernet frames (default: broadcast).
+        session:
+            if set, its MAC address is the default source address of the frames.
+    """
+
+    if ethernet_src is None:
+        ethernet_src = session.hwaddr if session is not None else get_if_hwaddr(conf.iface)
+
+    ops = {'who-has': 1, 'is-at': 2}
+
+    # frames are encoded directly (scapy templates take ~1 ms per frame), then
+    # dissected once: sending them again only costs the copy of their bytes.
+    return [
+        Ether(ArpFrame(ops[op], mac, ip, '00:00:00:00:00:00', ip).to_bytes(
+            ethernet_src, ethernet_dst
+        ))
+        for mac, ip in mappings
+    ]
+
+
+def batched_rounds(
+        frames: Sequence[Packet],
+        count: int = 0,
+        interval: float = 1.0,
+        rate: Optional[float] = None,
+) -> tuple[Iterator[list[Packet]], float]:
+    """Splits the rounds of frames (every frame once, `count` times or forever
+    every `interval` seconds) in batches, and returns them with the time
+    between two batches.
+
+    Without a rate, every round is a single batch. With a rate, batches last
+    about a millisecond each, and rounds that take longer than the interval
+    are sent back to back.
+
+    Args:
+        frames:
+            the frames of a round.
+        count:
+            how many rounds to send (0: forever).
+        interval:
+            time interval between rounds (only used when count is 0).
+        rate:
+            the maximum number of frames per second.
+    """
+
+    rounds = repeat(frames, count) if count else repeat(frames)
+
+    if rate is None:
+        return (list(batch) for batch in rounds), 0 if count else interval
+
+    size = max(min(MAX_BATCH, round(rate / 1000)), 1)
+    inter = size / rate
+
+    batches = [list(frames[i:i + size]) for i in range(0, len(frames), size)]
+    # rounds start every `interval` seconds: the slots left are empty batches.
+    idle = 0 if count else max(math.ceil(interval / inter) - len(batches), 0)
+
+    def _batches() -> Iterator[list[Packet]]:
+        for _ in rounds:
+            yield from batches
+            yield from repeat([], idle)
+
+    return _batches(), inter
+
+
+def mapping_exchanges(
+        op: str,
+        mappings: Collection[tuple[str, str]],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        count: int = 0,
+        interval: float = 1.0,
+        rate: Optional[float] = None,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        statistics: Optional[ExchangeStatistics] = None,
+) -> Iterator[Exchange]:
+    """Sends an unanswered ARP packet advertising every MAC/IP mapping, in
+    rounds of pre-built frames, and yields an exchange for every sent frame.
+
+    See advertise_mappings() for the arguments.
+    """
+
+    frames = mapping_frames(op, mappings, ethernet_src, ethernet_dst, session)
+    rounds, inter = batched_rounds(frames, count, interval, rate)
+
+    return exchange(
+        rounds,
+        timeout=0,
+        inter=inter,
+        socket=session.socket if session is not None else None,
+        pcap_writer=pcap_writer,
+        statistics=statistics,
+    )
+
+
+def advertise_mappings(
+        op: str,
+        mappings: Collection[tuple[str, str]],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        count: int = 0,
+        interval: float = 1.0,
+        rate: Optional[float] = None,
+        verbose: Optional[int] = None,
+        prnfail: Optional[Callable[[Packet], str | None]] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+) -> None:
+    """Sends an unanswered ARP packet advertising every MAC/IP mapping, in
+    rounds of pre-built frames.
+
+    Args:
+        op:
+            the ARP operation ('who-has' for announcements, 'is-at' for gratuitous replies).
+        mappings:
+            the MAC/IP pairs.
+        ethernet_src:
+            the source MAC address of the Ethernet frames.
+        ethernet_dst:
+            the destination MAC address of the Ethernet frames.
+        count:
+            how many packet to send for every mapping.
+        interval:
+            time interval between rounds (only used when count is 0).
+        rate:
+            the maximum number of packets sent per second (default: no limit).
+        verbose:
+            verbosity level.
+        prnfail:
+            function used to print the sent packets (default: the output_format formatter).
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet is recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+    """
+
+    formatter = Formatter(output_format)
+    statistics = ExchangeStatistics()
+
+    _print_exchanges(
+        mapping_exchanges(
+            op, mappings, ethernet_src, ethernet_dst, count, interval, rate,
+            pcap_writer, session, statistics,
+        ),
+        statistics,
+        prnfail=prnfail or formatter.unanswered,
+        verbose=verbose,
+        formatter=formatter,
+    )
@@ -0,0 +1,398 @@
+"""Contains the engine that sends ARP packets and matches their replies."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from itertools import repeat
+import math
+import socket as sockets
+import struct
+import time
+from typing import Any, NamedTuple, Optional
+
+from scapy.config import conf
+from scapy.consts import LINUX
+from scapy.data import ETH_P_ARP
+from scapy.interfaces import resolve_iface
+from scapy.layers.l2 import ARP
+from scapy.packet import Packet
+from scapy.supersocket import SuperSocket
+
+from .statistics import ExchangeStatistics
+from ..frame import ArpFrame
+from ...modules.pcap import RotatingPcapWriter
+from ...modules.scheduler import DeadlineScheduler, SPIN
+
+if LINUX:
+    from scapy.arch.linux import L2Socket, SOL_PACKET
+
+
+class Exchange(NamedTuple):
+    """A sent ARP packet and its reply."""
+
+    query: Packet
+    """The sent packet (its `sent_time` is set)."""
+
+    reply: Optional[Packet]
+    """The reply, or None if none was received before the timeout."""
+
+    attempt: int
+    """How many packets had been sent to the target IP of the query, this one included."""
+
+
+# how many sent frames can be waiting for their kernel timestamp.
+_MAX_UNSTAMPED: int = 4096
+
+# SO_TIMESTAMPING flags: software transmit timestamps, without a copy of the
+# frame, identified by a counter (see the kernel's timestamping documentation).
+_SO_TIMESTAMPING: int = 37
+_SOF_TIMESTAMPING_TX_SOFTWARE: int = 1 << 1
+_SOF_TIMESTAMPING_SOFTWARE: int = 1 << 4
+_SOF_TIMESTAMPING_OPT_ID: int = 1 << 7
+_SOF_TIMESTAMPING_OPT_TSONLY: int = 1 << 11
+_PACKET_TX_TIMESTAMP: int = 16
+
+_TIMESPEC = struct.Struct('qq')
+# struct sock_extended_err: errno, origin, type, code, pad, info, data (the counter).
+_SOCK_EXTENDED_ERR = struct.Struct('IBBBBII')
+
+
+if LINUX:
+    class TimestampingSocket(L2Socket):
+        """A layer 2 socket that timestamps the frames it sends in the kernel.
+
+        Frames are sent from a second socket, whose error queue receives the
+        software timestamp of every frame as it is passed to the driver: reading
+        it never interferes with the frames received by the first socket.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+            self.sent_count: int = 0
+            """How many frames have been sent (the counter of the next frame)."""
+
+            # protocol 0: the sending socket receives nothing.
+            self.outs = sockets.socket(sockets.AF_PACKET, sockets.SOCK_RAW, 0)
+            self.outs.bind((self.iface, 0))
+            self.outs.setsockopt(sockets.SOL_SOCKET, sockets.SO_SNDBUF, conf.bufsize)
+            self.outs.setsockopt(
+                sockets.SOL_SOCKET,
+                _SO_TIMESTAMPING,
+                _SOF_TIMESTAMPING_TX_SOFTWARE | _SOF_TIMESTAMPING_SOFTWARE |
+                _SOF_TIMESTAMPING_OPT_ID | _SOF_TIMESTAMPING_OPT_TSONLY,
+            )
+
+        def send(self, x: Packet | bytes) -> int:
+            sent = super().send(x)
+            self.sent_count += 1
+
+            return sent
+
+        def sent_timestamps(self) -> Iterator[tuple[int, float]]:
+            """Yields the counter and the kernel timestamp of the sent frames whose
+            timestamp is available, in sending order."""
+
+            flags = sockets.MSG_ERRQUEUE | sockets.MSG_DONTWAIT
+
+            while True:
+                try:
+                    _, ancdata, _, _ = self.outs.recvmsg(0, 512, flags)
+                except (BlockingIOError, InterruptedError):
+                    return
+
+                counter = timestamp = None
+                for level, kind, data in ancdata:
+                    if level == sockets.SOL_SOCKET and kind == _SO_TIMESTAMPING:
+                        seconds, nanoseconds = _TIMESPEC.unpack_from(data)
+                        timestamp = seconds + nanoseconds * 1e-9
+                    elif level == SOL_PACKET and kind == _PACKET_TX_TIMESTAMP:
+                        counter = _SOCK_EXTENDED_ERR.unpack_from(data)[-1]
+
+                if counter is not None and timestamp is not None:
+                    yield counter, timestamp
+
+
+def open_socket(iface: Optional[str] = None) -> SuperSocket:
+    """Opens a layer 2 socket that only receives ARP frames (on Linux, a
+    TimestampingSocket).
+
+    Args:
+        iface:
+            the network interface (default: scapy's default interface).
+    """
+
+    iface = resolve_iface(iface or conf.iface)
+    socket_type = iface.l2socket()
+
+    if LINUX and socket_type is L2Socket:
+        socket_type = TimestampingSocket
+
+    return socket_type(iface=iface, type=ETH_P_ARP)
+
+
+class TimestampedSender:
+    """Sends frames over a socket, and gives every frame the kernel timestamp
+    of its transmission as soon as it is available (see TimestampingSocket).
+
+    Until then, and with the sockets that do not timestamp their frames, a
+    frame keeps the time of its send() call.
+    """
+
+    def __init__(self, socket: SuperSocket, stamp: Callable[[Any, float], None]):
+        """Args:
+            socket:
+                the socket the frames are sent over.
+            stamp:
+                function called with the item a frame was sent for, and the time
+                it was sent at.
+        """
+
+        self._socket, self._stamp = socket, stamp
+        self._sent_timestamps = getattr(socket, 'sent_timestamps', None)
+
+        # sent items still waiting for their kernel timestamp, in sending order.
+        self._unstamped: deque[tuple[int, Any]] = deque(maxlen=_MAX_UNSTAMPED)
+
+    def send(self, data: bytes, item: Any) -> float:
+        """Sends the frame of an item, and returns the time of the send() call."""
+
+        self._socket.send(data)
+        self._stamp(item, now := time.time())
+
+        if self._sent_timestamps is not None:
+            self._unstamped.append((self._socket.sent_count - 1, item))
+            self.update()
+
+        return now
+
+    def recv(self) -> Optional[Packet]:
+        """Receives a frame from the socket, and applies the available timestamps."""
+
+        reply = self._socket.recv()
+        self.update()
+
+        return reply
+
+    def update(self) -> None:
+        """Applies the kernel timestamps of the sent frames that are available."""
+
+        if not self._unstamped:
+            return
+
+        for counter, timestamp in self._sent_timestamps():
+            # the frames without a timestamp keep the time of the send() call.
+            while self._unstamped and self._unstamped[0][0] < counter:
+                self._unstamped.popleft()
+
+            if self._unstamped and self._unstamped[0][0] == counter:
+                self._stamp(self._unstamped.popleft()[1], timestamp)
+
+
+def exchange(
+        packets: Iterable[Packet | Sequence[Packet]],
+        timeout: Optional[float] = None,
+        inter: float = 0.0,
+        socket: Optional[SuperSocket] = None,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        statistics: Optional[ExchangeStatistics] = None,
+) -> Iterator[Exchange]:
+    """Sends ARP packets and yields every exchange as soon as it is complete:
+    when the reply is received, or when the timeout of the query expires.
+
+    Replies are matched to the oldest unanswered query for the IP address they
+    advertise, so matching costs O(1) regardless of how many queries are pending.
+    Replies received while sending are processed between packets, so large
+    ranges do not overflow the socket buffer.
+
+    With a TimestampingSocket, the `sent_time` of every query is the kernel
+    timestamp of the sent frame (like the `time` of the replies), so round-trip
+    times are not affected by the scheduling of the process.
+
+    Args:
+        packets:
+            the packets to send (can be infinite). A sequence of packets is a round:
+            its packets are sent back to back.
+        timeout:
+            how long to wait for the reply of a query (default: until interrupted).
+        inter:
+            time interval between packets (between rounds).
+        socket:
+            the socket used to exchange the packets (default: a socket opened
+            with open_socket() for the duration of the exchange).
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        statistics:
+            if set, the exchanged packets are counted in it.
+    """
+
+    own_socket = socket is None
+    socket = open_socket() if own_socket else socket
+    timeout = math.inf if timeout is None else timeout
+
+    # unanswered queries by target IP, and in sending order (with their deadline).
+    pending: dict[str, deque[Exchange]] = {}
+    deadlines: deque[tuple[float, Exchange]] = deque()
+    attempts: Counter[str] = Counter()
+    # the targets that have answered (further replies without a query are duplicates).
+    answered: set[str] = set()
+
+    def _stamp(query: Packet, timestamp: float) -> None:
+        query.sent_time = timestamp
+
+    sender = TimestampedSender(socket, _stamp)
+
+    def _send(query: Packet) -> None:
+        data = bytes(query)
+        now = sender.send(data, query)
+
+        target = ArpFrame.from_packet(query).pdst
+        attempts[target] += 1
+        sent = Exchange(query, None, attempts[target])
+
+        pending.setdefault(target, deque()).append(sent)
+        if timeout < math.inf:
+            deadlines.append((time.monotonic() + timeout, sent))
+
+        if pcap_writer is not None:
+            pcap_writer.write(data, now)
+
+        if statistics is not None:
+            statistics.sent += 1
+
+    def _unqueue(target: str, sent: Exchange) -> bool:
+        # queries are compared by identity, identical packets can be sent more than once.
+        queue = pending.get(target, ())
+        for i, item in enumerate(queue):
+            if item.query is sent.query:
+                del queue[i]
+                if not queue:
+                    del pending[target]
+
+                return True
+
+        return False
+
+    def _receive() -> Optional[Exchange]:
+        reply = sender.recv()
+
+        if reply is None or ARP not in reply:
+            return None
+
+        frame = ArpFrame.from_packet(reply)
+        target = frame.psrc
+        for sent in pending.get(target, ()):
+            if frame.op == sent.query[ARP].op + 1:
+                _unqueue(target, sent)
+
+                if pcap_writer is not None:
+                    pcap_writer.write(bytes(reply), reply.time)
+
+                if statistics is not None:
+                    statistics.record_reply(float(reply.time) - float(sent.query.sent_time))
+                    answered.add(target)
+
+                return sent._replace(reply=reply)
+
+        if statistics is not None and frame.op == 2 and target in answered:
+            statistics.duplicates += 1
+
+        return None
+
+    def _expired(now: float) -> Iterator[Exchange]:
+        while deadlines and deadlines[0][0] <= now:
+            sent = deadlines.popleft()[1]
+
+            if _unqueue(ArpFrame.from_packet(sent.query).pdst, sent):
+                yield sent
+
+    packets = iter(packets)
+    scheduler = DeadlineScheduler(inter) if inter else None
+    next_send: Optional[float] = time.monotonic()
+
+    # the next item is fetched before it is due: building packets takes time. When
+    # paced, it is fetched shortly before its deadline, so that the replies to the
+    # previous items can still change it (e.g. skip the targets that answered).
+    item, fetched = next(packets, None), True
+
+    if statistics is not None:
+        statistics.schedule = scheduler
+
+    try:
+        while True:
+            now = time.monotonic()
+
+            if not fetched and next_send - scheduler.lead <= now:
+                item, fetched = next(packets, None), True
+                now = time.monotonic()
+
+            # send every packet that is due (all of them when there is no interval),
+            # checking for replies in between.
+            while next_send is not None and next_send <= now:
+                # a late send moves on to the next item, it does not send the last one again.
+                if not fetched:
+                    item, fetched = next(packets, None), True
+
+                if item is None:
+                    next_send = None
+                    break
+
+                if scheduler is not None:
+                    scheduler.advance()
+
+                for query in (item,) if isinstance(item, Packet) else item:
+                    _send(query)
+
+                    while socket.select([socket], 0):
+                        if received := _receive():
+                            yield received
+
+                if scheduler is not None:
+                    # deadlines are absolute, so the interval does not drift.
+                    next_send, fetched = scheduler.deadline, False
+                else:
+                    item, next_send = next(packets, None), now
+
+                now = time.monotonic()
+
+            yield from _expired(now)
+
+            if next_send is None and not pending:
+                return
+
+            # waits for the next send stop early and spin (with zero timeouts) until it is due.
+            wake = next_send if next_send is not None else math.inf
+            if scheduler is not None:
+                wake -= SPIN if fetched else scheduler.lead
+
+            wait = min(wake, deadlines[0][0] if deadlines else math.inf) - now
+
+            ready = socket.select([socket], max(wait, 0) if wait < math.inf else None)
+            if ready and (received := _receive()):
+                yield received
+    finally:
+        if own_socket:
+            socket.close()
+
+
+def repeated(pkt: Iterable[Packet], count: int = 0) -> Iterator[Packet]:
+    """Yields the packets generated by a packet template `count` times
+    (forever if count is 0)."""
+
+    for template in repeat(pkt, count) if count else repeat(pkt):
+        yield from template
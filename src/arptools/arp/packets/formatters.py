@@ -0,0 +1,163 @@
+"""Contains the formatters of the output lines of the ARP sending functions."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import math
+from typing import Literal, Optional
+
+from scapy.packet import Packet
+from scapy.plist import QueryAnswer
+
+from ..frame import ArpFrame
+from ...modules.histogram import HdrHistogram
+
+
+OutputFormat = Literal['text', 'jsonl', 'csv', 'tsv']
+"""The format of the output lines:
+ - `text`: human-readable summaries (the default).
+ - `jsonl`: a JSON object per line.
+ - `csv`: comma separated values, with a header line.
+ - `tsv`: tab separated values, with a header line.
+"""
+
+OUTPUT_FORMATS: tuple[OutputFormat, ...] = ('text', 'jsonl', 'csv', 'tsv')
+
+_COLUMNS: tuple[str, ...] = (
+    'status', 'time', 'kind', 'hwsrc', 'psrc', 'hwdst', 'pdst', 'reply_hwsrc', 'reply_psrc', 'rtt',
+)
+
+
+def describe(frame: ArpFrame) -> str:
+    """Returns the human-readable summary of an ARP packet
+    (e.g. `ARP who has 192.168.1.1 says 192.168.1.10`)."""
+
+    match frame.op:
+        case 1:
+            return f'ARP who has {frame.pdst} says {frame.psrc}'
+        case 2:
+            return f'ARP is at {frame.hwsrc} says {frame.psrc}'
+        case _:
+            return f'ARP {frame.op} {frame.psrc} > {frame.pdst}'
+
+
+def describe_rtts(rtts: HdrHistogram, histogram: bool = False) -> str:
+    """Returns the summary of the round-trip times recorded in a histogram,
+    in nanoseconds (e.g. `rtt min/avg/max/p50/p99 = 0.127/0.162/0.268/0.138/0.268 ms`).
+
+    Args:
+        rtts:
+            the histogram of the round-trip times.
+        histogram:
+            whether to add a line for every power of two range of round-trip times.
+    """
+
+    values = (rtts.min, rtts.mean, rtts.max, rtts.percentile(50), rtts.percentile(99))
+    lines = [f'rtt min/avg/max/p50/p99 = {'/'.join(f'{value / 1e6:.3f}' for value in values)} ms']
+
+    if histogram:
+        octaves = list(rtts.octaves())
+        most = max(count for _low, _high, count in octaves)
+
+        for low, high, count in octaves:
+            bar = '#' * math.ceil(40 * count / most)
+            lines.append(f'{low / 1e6:10.3f} - {(high + 1) / 1e6:10.3f} ms | {bar:<40} {count}')
+
+    return '\n'.join(lines)
+
+
+class Formatter:
+    """Builds output lines from the fields of the exchanged packets,
+    in one of the OUTPUT_FORMATS.
+
+    Typical usage:
+        formatter = Formatter('csv')
+        print(formatter.header)
+        print(formatter.answered(answer))
+    """
+
+    def __init__(self, output_format: OutputFormat = 'text'):
+        """Args:
+            output_format:
+                the format of the output lines.
+        """
+
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f'unknown output format {output_format!r}')
+
+        self._output_format = output_format
+        self._separator = '\t' if output_format == 'tsv' else ','
+
+    @property
+    def output_format(self) -> OutputFormat:
+        """The format of the output lines."""
+
+        return self._output_format
+
+    @property
+    def header(self) -> Optional[str]:
+        """The line preceding every other line, if the format has one."""
+
+        if self._output_format in ('csv', 'tsv'):
+            return self._separator.join(_COLUMNS)
+
+        return None
+
+    def answered(self, answer: QueryAnswer) -> str:
+        """Returns the line of a packet that has received an answer."""
+
+        query, reply = answer
+        sent, received = ArpFrame.from_packet(query), ArpFrame.from_packet(reply)
+
+        if self._output_format == 'text':
+            return f'{describe(sent)} ==> {describe(received)}'
+
+        sent_time = query.sent_time or query.time
+        return self._fields(
+            'answered', sent_time, sent, received, float(reply.time) - float(sent_time)
+        )
+
+    def unanswered(self, query: Packet) -> str:
+        """Returns the line of a packet that has not received an answer."""
+
+        sent = ArpFrame.from_packet(query)
+
+        if self._output_format == 'text':
+            return describe(sent)
+
+        return self._fields('unanswered', query.sent_time or query.time, sent)
+
+    def _fields(
+            self,
+            status: str,
+            timestamp: float,
+            sent: ArpFrame,
+            received: Optional[ArpFrame] = None,
+            rtt: Optional[float] = None,
+    ) -> str:
+        values = (
+            status, round(float(timestamp), 6), sent.kind,
+            sent.hwsrc, sent.psrc, sent.hwdst, sent.pdst,
+            received.hwsrc if received else None, received.psrc if received else None,
+            round(rtt, 6) if rtt is not None else None,
+        )
+
+        if self._output_format == 'jsonl':
+            return json.dumps(dict(zip(_COLUMNS, values)))
+
+        # none of the values can contain a separator, a quote or a newline.
+        return self._separator.join('' if value is None else str(value) for value in values)
@@ -18,12 +18,15 @@
 from collections.abc import Callable
 from typing import Optional
 
-from scapy.layers.l2 import ARP, Ether
 from scapy.packet import Packet
-from scapy.plist import PacketList, QueryAnswer, SndRcvList
-from scapy.sendrecv import srploop, srp
+from scapy.plist import QueryAnswer
 
-from . import _prn, _prnfail
+from . import _print_exchanges
+from .exchange import exchange, repeated
+from .formatters import Formatter, OutputFormat
+from .session import ArpSession, build_frames
+from .statistics import ExchangeStatistics
+from ...modules.pcap import RotatingPcapWriter
 
 
 def arp_reply(
@@ -35,8 +38,11 @@ def arp_reply(
         count: int = 0,
         interval: float = 1.0,
         verbose: Optional[int] = None,
-        prn: Callable[[QueryAnswer], str | None] = _prn,
-        prnfail: Callable[[Packet | PacketList | SndRcvList], str | None] = _prnfail,
+        prn: Optional[Callable[[QueryAnswer], str | None]] = None,
+        prnfail: Optional[Callable[[Packet], str | None]] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
 ) -> None:
     """Sends an ARP reply packet.
 
@@ -58,33 +64,40 @@ def arp_reply(
         verbose:
             verbosity level.
         prn:
-            function used to print packets that have received an answer.
+            function used to print packets that have received an answer
+            (default: the output_format formatter).
         prnfail:
-            function used to print packets that have not received an answer.
+            function used to print packets that have not received an answer
+            (default: the output_format formatter).
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet is recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
     """
 
-    pkt = (
-            Ether(dst=ethernet_dst, src=ethernet_src) /
-            ARP(op='is-at', hwsrc=arp_hwsrc, psrc=arp_psrc, pdst=target_ip)
+    pkt = build_frames(
+        'is-at', target_ip, ethernet_src, ethernet_dst, arp_hwsrc, arp_psrc, session
     )
 
-    if count:
-        _results, unanswered = srp(
-            pkt if count == 1 else tuple(pkt for _ in range(count)),
-            timeout=0,
-            verbose=verbose,
-        )
-
-        if verbose != 0:
-            if prn_results := prnfail(unanswered):
-                print('', prn_results, sep='\n')
+    formatter = Formatter(output_format)
 
-        return
+    # replies are not answered: every packet is complete as soon as it is sent.
+    statistics = ExchangeStatistics()
 
-    srploop(
-        pkt,
-        inter=interval,
-        prn=prn,
-        prnfail=prnfail,
+    _print_exchanges(
+        exchange(
+            repeated(pkt, count),
+            timeout=0,
+            inter=0 if count else interval,
+            socket=session.socket if session is not None else None,
+            pcap_writer=pcap_writer,
+            statistics=statistics,
+        ),
+        statistics,
+        prn=prn or formatter.answered,
+        prnfail=prnfail or formatter.unanswered,
         verbose=verbose,
+        formatter=formatter,
     )
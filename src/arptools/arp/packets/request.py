@@ -15,19 +15,130 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from collections.abc import Callable
+from collections.abc import Callable, Collection, Iterable, Iterator
+from itertools import repeat
 from typing import Optional
 
-from scapy.layers.l2 import ARP, Ether
 from scapy.packet import Packet
-from scapy.plist import PacketList, QueryAnswer, SndRcvList
-from scapy.sendrecv import srp, srploop
+from scapy.plist import QueryAnswer
+from scapy.supersocket import SuperSocket
 
-from . import _prn, _prn_qofr, _prnfail
+from . import _print_exchanges
+from .exchange import exchange, Exchange, repeated
+from .formatters import Formatter, OutputFormat
+from .session import ArpSession, PermutedFrames, build_frames
+from .statistics import ExchangeStatistics
+from ..frame import ArpFrame
+from ..result import ArpResult
+from ...modules.pcap import RotatingPcapWriter
+
+
+def _rounds(
+        pkt: Iterable[Packet],
+        count: int,
+        answered: Collection[str],
+) -> Iterator[list[Packet]]:
+    """Yields the requests generated by a packet template `count` times (forever
+    if count is 0), skipping the targets that have already answered."""
+
+    for _ in range(count) if count else repeat(None):
+        yield [query for query in pkt if ArpFrame.from_packet(query).pdst not in answered]
+
+
+def _until_answered(
+        pkt: Iterable[Packet],
+        count: int,
+        timeout: float,
+        inter: float,
+        pcap_writer: Optional[RotatingPcapWriter],
+        socket: Optional[SuperSocket],
+        statistics: Optional[ExchangeStatistics],
+) -> Iterator[Exchange]:
+    """Sends rounds of requests to every target until it answers, and stops as
+    soon as every target has answered (or after `count` rounds)."""
+
+    targets = {ArpFrame.from_packet(query).pdst for query in pkt}
+    answered: set[str] = set()
+
+    exchanges = exchange(
+        _rounds(pkt, count, answered),
+        timeout=timeout,
+        inter=inter,
+        socket=socket,
+        pcap_writer=pcap_writer,
+        statistics=statistics,
+    )
+
+    try:
+        for completed in exchanges:
+            target = ArpFrame.from_packet(completed.query).pdst
+            # the other pending requests of a target that has answered are dropped.
+            if target in answered:
+                continue
+
+            if completed.reply is not None:
+                answered.add(target)
+
+            yield completed
+
+            if len(answered) == len(targets):
+                return
+    finally:
+        exchanges.close()
+
+
+def _request_exchanges(
+        pkt: Iterable[Packet],
+        count: int,
+        interval: float,
+        quit_on_first_reply: bool,
+        timeout: Optional[float],
+        pcap_writer: Optional[RotatingPcapWriter],
+        session: Optional[ArpSession] = None,
+        statistics: Optional[ExchangeStatistics] = None,
+) -> Iterator[Exchange]:
+    """Returns the exchanges of the ARP requests generated by a packet template,
+    for every combination of count and quit_on_first_reply (see arp_request()).
+
+    With several targets, every round of requests is sent at once, all the
+    targets sharing the same socket, and quit_on_first_reply applies to each
+    target on its own.
+    """
+
+    socket = session.socket if session is not None else None
+
+    if count and not quit_on_first_reply:
+        # every request at once.
+        return exchange(
+            repeated(pkt, count),
+            timeout=timeout,
+            socket=socket,
+            pcap_writer=pcap_writer,
+            statistics=statistics,
+        )
+
+    if count:
+        # a round at a time, each waiting for its replies.
+        timeout = inter = timeout if timeout else 1
+    else:
+        timeout = min(2 * interval, 5) if timeout is None else timeout
+        inter = interval
+
+    if quit_on_first_reply:
+        return _until_answered(pkt, count, timeout, inter, pcap_writer, socket, statistics)
+
+    return exchange(
+        _rounds(pkt, count, ()),
+        timeout=timeout,
+        inter=inter,
+        socket=socket,
+        pcap_writer=pcap_writer,
+        statistics=statistics,
+    )
 
 
 def arp_request(
-        target_ip: str,
+        target_ip: str | Collection[str],
         ethernet_src: Optional[str] = None,
         ethernet_dst: Optional[str] = None,
         arp_hwsrc: Optional[str] = None,
@@ -38,15 +149,23 @@ def arp_request(
         timeout: Optional[int] = None,
         ignore_unanswered: bool = False,
         verbose: Optional[int] = None,
-        prn: Callable[[QueryAnswer], str | None] = _prn,
-        prn_qofr: Callable[[QueryAnswer], None] = _prn_qofr,
-        prnfail: Callable[[Packet | PacketList | SndRcvList], str | None] = _prnfail,
+        prn: Optional[Callable[[QueryAnswer], str | None]] = None,
+        prn_qofr: Optional[Callable[[QueryAnswer], None]] = None,
+        prnfail: Optional[Callable[[Packet], str | None]] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
+        randomize: bool = False,
+        seed: Optional[int] = None,
 ) -> None:
     """Sends an ARP request packet.
 
     Args:
         target_ip:
-            the target IP of the ARP request.
+            the target IP of the ARP request (or a range of IPs, in CIDR
+            notation, or a collection of IPs).
         ethernet_src:
             the source MAC address of the Ethernet frame.
         ethernet_dst:
@@ -60,7 +179,7 @@ def arp_request(
         interval:
             time interval between packets (only used when count is 0).
         quit_on_first_reply:
-            sends packets until it gets a reply.
+            sends packets to every target until it gets a reply.
         timeout:
             how long to wait for a reply.
         ignore_unanswered:
@@ -68,55 +187,119 @@ def arp_request(
         verbose:
             verbosity level.
         prn:
-            function used to print packets that have received an answer.
+            function used to print packets that have received an answer
+            (default: the output_format formatter).
         prn_qofr:
             function used to print packets that have received an answer
-            when quit_on_first_reply is True.
+            when quit_on_first_reply is True (default: prn).
         prnfail:
-            function used to print packets that have not received an answer.
+            function used to print packets that have not received an answer
+            (default: the output_format formatter).
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+        rtt_histogram:
+            whether to print the histogram of the round-trip times at exit.
+        live_statistics:
+            whether to keep a line with the latest statistics at the bottom of the terminal.
+        randomize:
+            whether to send the requests in a pseudo-random order of the
+            targets (default: in ascending order).
+        seed:
+            the seed of the order of the targets (default: random).
     """
     
-    pkt = (
-            Ether(dst=ethernet_dst, src=ethernet_src) /
-            ARP(op='who-has', hwsrc=arp_hwsrc, psrc=arp_psrc, pdst=target_ip)
+    pkt = build_frames(
+        'who-has', target_ip, ethernet_src, ethernet_dst, arp_hwsrc, arp_psrc, session
     )
 
-    if count:
-        if quit_on_first_reply:
-            for _ in range(count):
-                results, unanswered = srp(
-                    pkt,
-                    timeout=timeout if timeout else 1,
-                    verbose=0,
-                )
-
-                if verbose != 0:
-                    if prn_results := prnfail(results):
-                        print('', prn_results, sep='\n', end='')
-
-                    if (prn_unanswered := prnfail(unanswered)) and not ignore_unanswered:
-                        print(prn_unanswered, end='')
-        else:
-            results, unanswered = srp(
-                pkt if count == 1 else tuple(pkt for _ in range(count)),
-                timeout=timeout,
-                verbose=verbose,
-            )
-
-            if verbose != 0:
-                if prn_results := prnfail(results):
-                    print('', prn_results, sep='\n')
-
-                if (prn_unanswered := prnfail(unanswered)) and not ignore_unanswered:
-                    print(prn_unanswered)
-
-        return
-
-    srploop(
-        pkt,
-        inter=interval,
-        prn=prn_qofr if quit_on_first_reply else prn,
-        prnfail=prnfail if not ignore_unanswered else lambda i: ...,
-        timeout=timeout,
+    if randomize:
+        pkt = PermutedFrames(pkt, target_ip, seed)
+
+    formatter = Formatter(output_format)
+    prn = prn or formatter.answered
+
+    statistics = ExchangeStatistics()
+
+    _print_exchanges(
+        _request_exchanges(
+            pkt, count, interval, quit_on_first_reply, timeout, pcap_writer, session, statistics
+        ),
+        statistics,
+        prn=(prn_qofr or prn) if quit_on_first_reply else prn,
+        prnfail=None if ignore_unanswered else prnfail or formatter.unanswered,
         verbose=verbose,
+        formatter=formatter,
+        rtt_histogram=rtt_histogram,
+        live_statistics=live_statistics,
     )
+
+
+def iter_arp_request(
+        target_ip: str | Collection[str],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        arp_hwsrc: Optional[str] = None,
+        arp_psrc: Optional[str] = None,
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+) -> Iterator[ArpResult]:
+    """Sends ARP requests, and yields the result of every request as soon as
+    it is answered or its timeout expires.
+
+    Typical usage:
+        for result in iter_arp_request('192.168.1.0/24'):
+            if result.answered:
+                inventory[result.target_ip] = result.mac
+
+    Args:
+        target_ip:
+            the target IP of the ARP request (or a range of IPs, in CIDR
+            notation, or a collection of IPs).
+        ethernet_src:
+            the source MAC address of the Ethernet frame.
+        ethernet_dst:
+            the destination MAC address of the Ethernet frame.
+        arp_hwsrc:
+            the hardware source address of the ARP packet.
+        arp_psrc:
+            the protocol source address of the ARP packet.
+        count:
+            how many packet to send to every target (0: until the generator is closed).
+        interval:
+            time interval between packets (only used when count is 0).
+        quit_on_first_reply:
+            sends packets to every target until it gets a reply.
+        timeout:
+            how long to wait for a reply (None: until the generator is closed).
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+        randomize:
+            whether to send the requests in a pseudo-random order of the
+            targets (default: in ascending order).
+        seed:
+            the seed of the order of the targets (default: random).
+    """
+
+    pkt = build_frames(
+        'who-has', target_ip, ethernet_src, ethernet_dst, arp_hwsrc, arp_psrc, session
+    )
+
+    if randomize:
+        pkt = PermutedFrames(pkt, target_ip, seed)
+
+    for completed in _request_exchanges(
+            pkt, count, interval, quit_on_first_reply, timeout, pcap_writer, session
+    ):
+        yield ArpResult.from_exchange(completed)
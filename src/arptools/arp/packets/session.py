@@ -0,0 +1,257 @@
+"""Contains the session that keeps an ARP socket open across sends."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Collection, Iterable, Iterator
+from ipaddress import ip_network, IPv4Network, IPv6Network
+from typing import Optional
+
+from scapy.config import conf
+from scapy.interfaces import NetworkInterface, resolve_iface
+from scapy.layers.l2 import ARP, Ether
+from scapy.packet import Packet
+from scapy.supersocket import SuperSocket
+
+from .exchange import open_socket
+from ...modules.permutation import CyclicPermutation
+
+
+def _frame_count(pdst: str | tuple[str, ...]) -> int:
+    return sum(
+        ip_network(target, strict=False).num_addresses if '/' in target else 1
+        for target in ((pdst,) if isinstance(pdst, str) else pdst)
+    )
+
+
+class FrameTemplate:
+    """The frames generated by a packet template, built once.
+
+    Every iteration yields fresh copies of the frames, which can be sent and
+    timestamped independently.
+    """
+
+    def __init__(self, pkt: Packet):
+        # dissecting the built frames resolves every default value once.
+        self._frames: list[Packet] = [Ether(bytes(frame)) for frame in pkt]
+
+    def __iter__(self) -> Iterator[Packet]:
+        return (frame.copy() for frame in self._frames)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+class PermutedFrames:
+    """The frames generated by a packet template, in a pseudo-random order of
+    their targets.
+
+    Frames are built one at a time from the first frame of the template, and
+    the order is walked in constant memory (see CyclicPermutation), so even
+    large ranges are never expanded. Every iteration follows the same order.
+    """
+
+    _PDST: slice = slice(38, 42)
+    """The bytes of the target IP in an Ethernet frame carrying an ARP packet."""
+
+    def __init__(
+            self,
+            pkt: Iterable[Packet],
+            target_ip: str | Collection[str],
+            seed: Optional[int] = None,
+    ):
+        """Args:
+            pkt:
+                the packet template (or the frame template of a session).
+            target_ip:
+                the targets of the template (an IP, a range of IPs in CIDR
+                notation, or a collection of both).
+            seed:
+                the seed of the order (default: random).
+        """
+
+        self._networks: list[IPv4Network | IPv6Network] = [
+            ip_network(target, strict=False)
+            for target in ((target_ip,) if isinstance(target_ip, str) else target_ip)
+        ]
+
+        # the index of the first target of every network.
+        self._offsets: list[int] = []
+        size = 0
+        for network in self._networks:
+            self._offsets.append(size)
+            size += network.num_addresses
+
+        self._permutation = CyclicPermutation(size, seed)
+        self._frame: bytes = bytes(next(iter(pkt))) if size else b''
+
+    def _target(self, index: int) -> bytes:
+        i = bisect_right(self._offsets, index) - 1
+        return self._networks[i][index - self._offsets[i]].packed
+
+    def __iter__(self) -> Iterator[Packet]:
+        head, tail = self._frame[:self._PDST.start], self._frame[self._PDST.stop:]
+
+        # dissecting the first frame with another target is about twice as fast as
+        # setting the field of a copy, and resolves every default value once.
+        for index in self._permutation:
+            yield Ether(head + self._target(index) + tail)
+
+    def __len__(self) -> int:
+        return len(self._permutation)
+
+
+class ArpSession:
+    """An open ARP socket, with its resolved interface and the addresses of the host.
+
+    The functions that send ARP packets accept a session, so that services
+    calling them in a loop do not open a socket and resolve the interface, the
+    routes and the default addresses on every call.
+
+    Typical usage:
+        with ArpSession() as session:
+            while True:
+                arp_scan('192.168.1.0/24', session=session)
+    """
+
+    MAX_TEMPLATES: int = 256
+    """How many frame templates are kept (the least recently used are dropped)."""
+
+    MAX_TEMPLATE_FRAMES: int = 4096
+    """Templates generating more frames than this (e.g. large ranges) are not kept."""
+
+    def __init__(self, iface: Optional[str] = None):
+        """Args:
+            iface:
+                the network interface (default: scapy's default interface).
+        """
+
+        self.iface: NetworkInterface = resolve_iface(iface or conf.iface)
+        self.hwaddr: str = self.iface.mac
+        self.ipaddr: str = self.iface.ip
+        self._socket: Optional[SuperSocket] = open_socket(self.iface)
+        self._templates: OrderedDict[tuple, FrameTemplate] = OrderedDict()
+
+    @property
+    def socket(self) -> SuperSocket:
+        """The socket of the session, without the frames received since it was last used."""
+
+        if self._socket is None:
+            raise ValueError('the session is closed')
+
+        # stale replies could otherwise be matched to new requests.
+        while self._socket.select([self._socket], 0):
+            self._socket.recv()
+
+        return self._socket
+
+    def template(
+            self,
+            op: str,
+            target_ip: str | Collection[str],
+            ethernet_src: Optional[str] = None,
+            ethernet_dst: Optional[str] = None,
+            arp_hwsrc: Optional[str] = None,
+            arp_psrc: Optional[str] = None,
+    ) -> FrameTemplate | Packet:
+        """Returns the frames of an ARP packet template, with the addresses of the
+        session as default source addresses.
+
+        Args:
+            op:
+                the ARP operation ('who-has' or 'is-at').
+            target_ip:
+                the target IP (or a range of IPs, in CIDR notation, or a collection of IPs).
+            ethernet_src:
+                the source MAC address of the Ethernet frame.
+            ethernet_dst:
+                the destination MAC address of the Ethernet frame.
+            arp_hwsrc:
+                the hardware source address of the ARP packet.
+            arp_psrc:
+                the protocol source address of the ARP packet.
+        """
+
+        pdst = target_ip if isinstance(target_ip, str) else tuple(target_ip)
+        key = (op, pdst, ethernet_src, ethernet_dst, arp_hwsrc, arp_psrc)
+
+        if (template := self._templates.get(key)) is not None:
+            self._templates.move_to_end(key)
+            return template
+
+        pkt = (
+                Ether(dst=ethernet_dst, src=ethernet_src or self.hwaddr) /
+                ARP(
+                    op=op,
+                    hwsrc=arp_hwsrc or self.hwaddr,
+                    psrc=arp_psrc or self.ipaddr,
+                    pdst=pdst if isinstance(pdst, str) else list(pdst),
+                )
+        )
+
+        if _frame_count(pdst) > self.MAX_TEMPLATE_FRAMES:
+            return pkt
+
+        template = self._templates[key] = FrameTemplate(pkt)
+        if len(self._templates) > self.MAX_TEMPLATES:
+            self._templates.popitem(last=False)
+
+        return template
+
+    def close(self) -> None:
+        """Closes the socket of the session."""
+
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self) -> 'ArpSession':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def build_frames(
+        op: str,
+        target_ip: str | Collection[str],
+        ethernet_src: Optional[str] = None,
+        ethernet_dst: Optional[str] = None,
+        arp_hwsrc: Optional[str] = None,
+        arp_psrc: Optional[str] = None,
+        session: Optional[ArpSession] = None,
+) -> FrameTemplate | Packet:
+    """Returns the template of the frames to send: the frame template of the
+    session if there is one, or a scapy packet template.
+
+    See ArpSession.template() for the arguments.
+    """
+
+    if session is not None:
+        return session.template(op, target_ip, ethernet_src, ethernet_dst, arp_hwsrc, arp_psrc)
+
+    return (
+            Ether(dst=ethernet_dst, src=ethernet_src) /
+            ARP(
+                op=op,
+                hwsrc=arp_hwsrc,
+                psrc=arp_psrc,
+                # scapy only expands lists of addresses.
+                pdst=target_ip if isinstance(target_ip, str) else list(target_ip),
+            )
+    )
@@ -0,0 +1,158 @@
+"""Contains the running statistics of the exchanged ARP packets."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import sys
+import time
+from typing import Optional, TextIO
+
+from .formatters import describe_rtts
+from ...modules.histogram import HdrHistogram
+from ...modules.scheduler import DeadlineScheduler
+
+
+class ExchangeStatistics:
+    """Counts the sent packets, their replies, the duplicate replies and the
+    distribution of the round-trip times of an exchange.
+
+    Every update costs O(1), so the statistics can be kept for exchanges that
+    run for hours, and printed at any time.
+
+    Typical usage:
+        statistics = ExchangeStatistics()
+        for completed in exchange(packets, statistics=statistics):
+            print(statistics.line())
+    """
+
+    def __init__(self):
+        self.sent: int = 0
+        """How many packets were sent."""
+
+        self.received: int = 0
+        """How many packets were answered."""
+
+        self.duplicates: int = 0
+        """How many replies were received for packets that were already answered."""
+
+        self.rtts: HdrHistogram = HdrHistogram()
+        """The distribution of the round-trip times, in nanoseconds."""
+
+        self.last_rtt: Optional[float] = None
+        """The round-trip time of the last reply, in seconds."""
+
+        self.schedule: Optional[DeadlineScheduler] = None
+        """The scheduler that paced the packets, if they were sent at an interval."""
+
+    @property
+    def loss(self) -> float:
+        """The percentage of the sent packets that were not answered."""
+
+        return 100.0 * (self.sent - self.received) / self.sent if self.sent else 0.0
+
+    def record_reply(self, rtt: float) -> None:
+        """Counts a reply, given its round-trip time in seconds."""
+
+        self.received += 1
+        self.last_rtt = rtt = max(rtt, 0.0)
+        self.rtts.record(round(rtt * 1e9))
+
+    def line(self) -> str:
+        """Returns a single line summary, for a live status line
+        (e.g. `sent 12, received 11, 8.3% loss, 0 duplicates, rtt 0.142 ms (avg 0.160 ms)`)."""
+
+        line = (
+            f'sent {self.sent}, received {self.received}, {self.loss:.1f}% loss, '
+            f'{self.duplicates} duplicates'
+        )
+
+        if self.last_rtt is not None:
+            line += f', rtt {self.last_rtt * 1e3:.3f} ms (avg {self.rtts.mean / 1e6:.3f} ms)'
+
+        return line
+
+    def summary(self, histogram: bool = False) -> str:
+        """Returns the summary printed at exit.
+
+        Args:
+            histogram:
+                whether to add the histogram of the round-trip times.
+        """
+
+        lines = [
+            f'Sent {self.sent} packets, received {self.received} packets, '
+            f'{self.duplicates} duplicates. '
+            f'{100.0 - self.loss:3.1f}% hits, {self.loss:3.1f}% loss.'
+        ]
+
+        if self.rtts.count:
+            lines.append(describe_rtts(self.rtts, histogram=histogram))
+
+        if self.schedule is not None and self.schedule.lateness.count > 1:
+            lines.append(f'schedule {self.schedule.describe()}')
+
+        return '\n'.join(lines)
+
+
+class StatusLine:
+    """A terminal line rewritten in place with the latest statistics.
+
+    Typical usage:
+        status = StatusLine(statistics)
+        for completed in exchanges:
+            status.update()
+        status.clear()
+    """
+
+    def __init__(
+            self,
+            statistics: ExchangeStatistics,
+            stream: Optional[TextIO] = None,
+            interval: float = 0.1,
+    ):
+        """Args:
+            statistics:
+                the statistics to show.
+            stream:
+                the stream the line is written to (default: standard error).
+            interval:
+                the minimum time between two updates, in seconds.
+        """
+
+        self._statistics, self._interval = statistics, interval
+        self._stream: TextIO = stream or sys.stderr
+        self._next_update: float = 0.0
+        self._shown: bool = False
+
+    def update(self, force: bool = False) -> None:
+        """Rewrites the line, unless it was rewritten less than `interval` seconds
+        ago and `force` is False."""
+
+        if not force and time.monotonic() < self._next_update:
+            return
+
+        self._stream.write(f'\r\x1b[K{self._statistics.line()}')
+        self._stream.flush()
+        self._next_update = time.monotonic() + self._interval
+        self._shown = True
+
+    def clear(self) -> None:
+        """Erases the line (before other lines are printed)."""
+
+        if self._shown:
+            self._stream.write('\r\x1b[K')
+            self._stream.flush()
+            self._shown = False
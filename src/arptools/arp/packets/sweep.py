@@ -0,0 +1,277 @@
+"""Contains the engine that sweeps ranges of IPs with ARP requests, in compact state."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from array import array
+from collections.abc import Iterable, Iterator
+from ipaddress import IPv4Network
+from socket import inet_aton
+import time
+from typing import Optional
+
+from scapy.layers.l2 import ARP, Ether
+from scapy.packet import Packet
+from scapy.supersocket import SuperSocket
+
+from .exchange import Exchange, TimestampedSender, open_socket
+from .statistics import ExchangeStatistics
+from ..frame import ArpFrame
+from ...modules.pcap import RotatingPcapWriter
+
+
+# the bytes of the target IP in an Ethernet frame carrying an ARP packet.
+_PDST: slice = slice(38, 42)
+
+# send times are kept in microseconds, modulo 2^32 (about 71 minutes): the
+# difference of two of them is exact for intervals shorter than that.
+_MASK: int = 0xFFFFFFFF
+
+
+class Bitmap:
+    """A set of the integers in range(size), stored in a bit each."""
+
+    def __init__(self, size: int):
+        self._bits: bytearray = bytearray((size + 7) // 8)
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self._bits[i >> 3] & (1 << (i & 7)))
+
+    def __len__(self) -> int:
+        return int.from_bytes(self._bits).bit_count()
+
+    def add(self, i: int) -> None:
+        """Adds an integer to the set."""
+
+        self._bits[i >> 3] |= 1 << (i & 7)
+
+    def discard(self, i: int) -> None:
+        """Removes an integer from the set, if it is in it."""
+
+        self._bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the set, in bytes."""
+
+        return len(self._bits)
+
+
+class SweepState:
+    """The state of the requests sent to a range of IPs, indexed by the offset
+    of their target in the range.
+
+    Every target costs about 5 bytes (about 330 KB for a /16), and no packet
+    is kept: the queries are built again from their offset when needed.
+    """
+
+    def __init__(self, size: int):
+        """Args:
+            size:
+                the number of IPs in the range.
+        """
+
+        self.answered: Bitmap = Bitmap(size)
+        """The targets that have answered."""
+
+        self.outstanding: Bitmap = Bitmap(size)
+        """The targets whose last request is waiting for its reply."""
+
+        self.attempts: bytearray = bytearray(size)
+        """How many requests were sent to every target (at most 255)."""
+
+        self.sent_times: array = array('I', bytes(4 * size))
+        """When the last request to every target was sent, in microseconds
+        since the start of the sweep, modulo 2^32."""
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the state, in bytes."""
+
+        return (
+            self.answered.nbytes + self.outstanding.nbytes + len(self.attempts) +
+            self.sent_times.itemsize * len(self.sent_times)
+        )
+
+
+def sweep(
+        network: IPv4Network,
+        frame: bytes,
+        order: Optional[Iterable[int]] = None,
+        timeout: float = 2.0,
+        retries: int = 0,
+        socket: Optional[SuperSocket] = None,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        statistics: Optional[ExchangeStatistics] = None,
+) -> Iterator[Exchange]:
+    """Sends an ARP request to every IP of a range, and yields every exchange as
+    soon as it is complete, like exchange(), keeping the state of the requests
+    in a SweepState: the memory used by a scan does not grow with the packets.
+
+    Requests are sent all at once, checking for replies in between. Unanswered
+    targets are sent a request again in up to `retries` more passes, each
+    starting once the previous one has timed out: only the exchanges of the
+    last attempt of every target are yielded.
+
+    The timeouts are tracked by walking the order of the targets a second
+    time, behind the requests: they expire in the order they were sent.
+
+    Args:
+        network:
+            the range of IPs.
+        frame:
+            the request sent to the first IP of the range (the target IP is
+            replaced for the other ones).
+        order:
+            the offsets of the targets in the range, in sending order (default:
+            ascending). It is iterated twice per pass, and must always give the
+            same order.
+        timeout:
+            how long to wait for the reply of a request.
+        retries:
+            how many more requests to send to the targets that do not answer.
+        socket:
+            the socket used to exchange the packets (default: a socket opened
+            with open_socket() for the duration of the sweep).
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        statistics:
+            if set, the exchanged packets are counted in it.
+    """
+
+    own_socket = socket is None
+    socket = open_socket() if own_socket else socket
+
+    size, base = network.num_addresses, int(network.network_address)
+    order = range(size) if order is None else order
+    head, tail = frame[:_PDST.start], frame[_PDST.stop:]
+
+    state = SweepState(size)
+    origin = time.time()
+
+    def _us(timestamp: float) -> int:
+        return round((timestamp - origin) * 1e6) & _MASK
+
+    def _elapsed(index: int, now: float) -> float:
+        return ((_us(now) - state.sent_times[index]) & _MASK) / 1e6
+
+    def _query(index: int, sent_time: float) -> Packet:
+        query = Ether(head + (base + index).to_bytes(4) + tail)
+        query.sent_time = sent_time
+
+        return query
+
+    def _stamp(index: int, timestamp: float) -> None:
+        state.sent_times[index] = _us(timestamp)
+
+    sender = TimestampedSender(socket, _stamp)
+
+    def _send(index: int) -> None:
+        data = head + (base + index).to_bytes(4) + tail
+        now = sender.send(data, index)
+
+        state.attempts[index] = min(state.attempts[index] + 1, 255)
+        state.outstanding.add(index)
+
+        if pcap_writer is not None:
+            pcap_writer.write(data, now)
+
+        if statistics is not None:
+            statistics.sent += 1
+
+    def _receive() -> Optional[Exchange]:
+        reply = sender.recv()
+
+        if reply is None or ARP not in reply:
+            return None
+
+        arp = ArpFrame.from_packet(reply)
+        index = int.from_bytes(inet_aton(arp.psrc)) - base
+        if arp.op != 2 or not 0 <= index < size:
+            return None
+
+        if index not in state.outstanding:
+            if statistics is not None and index in state.answered:
+                statistics.duplicates += 1
+
+            return None
+
+        state.outstanding.discard(index)
+        state.answered.add(index)
+        rtt = _elapsed(index, float(reply.time))
+
+        if pcap_writer is not None:
+            pcap_writer.write(bytes(reply), reply.time)
+
+        if statistics is not None:
+            statistics.record_reply(rtt)
+
+        return Exchange(
+            _query(index, float(reply.time) - rtt), reply, state.attempts[index]
+        )
+
+    # the order is walked a second time to expire the requests: `behind` targets
+    # behind the requests, from the target at its head.
+    expiring: Iterator[int] = iter(())
+    behind, head_index, last = 0, None, False
+
+    def _expired(now: float) -> Iterator[Exchange]:
+        nonlocal behind, head_index
+
+        while behind:
+            if head_index is None:
+                head_index = next(expiring)
+
+            if head_index in state.outstanding:
+                if (elapsed := _elapsed(head_index, now)) < timeout:
+                    return
+
+                state.outstanding.discard(head_index)
+                if last:
+                    yield Exchange(
+                        _query(head_index, now - elapsed), None, state.attempts[head_index]
+                    )
+
+            head_index, behind = None, behind - 1
+
+    try:
+        for attempt in range(retries + 1):
+            expiring, last = iter(order), attempt == retries
+
+            for index in order:
+                behind += 1
+                if index in state.answered:
+                    continue
+
+                _send(index)
+
+                while socket.select([socket], 0):
+                    if received := _receive():
+                        yield received
+
+                yield from _expired(time.time())
+
+            while behind:
+                yield from _expired(now := time.time())
+
+                if behind:
+                    # waits for the reply to the oldest pending request, or for its timeout.
+                    wait = max(timeout - _elapsed(head_index, now), 0)
+                    if socket.select([socket], wait) and (received := _receive()):
+                        yield received
+    finally:
+        if own_socket:
+            socket.close()
@@ -16,34 +16,54 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+from collections.abc import Collection, Iterator
 from typing import Optional
 
-from .packets.request import arp_request
+from .packets.formatters import OutputFormat
+from .packets.session import ArpSession
+from .packets.request import arp_request, iter_arp_request
+from .result import ArpResult
+from ..modules.pcap import RotatingPcapWriter
 
 
 def arp_probe(
-        target_ip: str,
+        target_ip: str | Collection[str],
         count: int = 0,
         interval: float = 1.0,
         quit_on_first_reply: bool = False,
         timeout: Optional[int] = None,
         verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
 ) -> None:
-    """Sends an ARP probe to the specified target.
+    """Sends ARP probes to the specified targets, all at once over the same socket.
 
     Args:
         target_ip:
-            the destination IP.
+            the destination IP (or a collection of IPs).
         count:
             how many packet to send.
         interval:
             time interval between packets (only used when count is 0).
         quit_on_first_reply:
-            sends packets until it gets a reply.
+            sends packets to every target until it gets a reply.
         timeout:
             how long to wait for a reply.
         verbose:
             verbosity level.
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+        rtt_histogram:
+            whether to print the histogram of the round-trip times at exit.
+        live_statistics:
+            whether to keep a line with the latest statistics at the bottom of the terminal.
     """
 
     arp_request(
@@ -55,4 +75,50 @@ def arp_probe(
         timeout=timeout,
         ignore_unanswered=False,
         verbose=verbose,
+        output_format=output_format,
+        pcap_writer=pcap_writer,
+        session=session,
+        rtt_histogram=rtt_histogram,
+        live_statistics=live_statistics,
+    )
+
+
+def iter_arp_probe(
+        target_ip: str | Collection[str],
+        count: int = 1,
+        interval: float = 1.0,
+        quit_on_first_reply: bool = False,
+        timeout: Optional[float] = 2.0,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+) -> Iterator[ArpResult]:
+    """Sends ARP probes to the specified targets, and yields the result of every
+    probe as soon as it is answered or its timeout expires.
+
+    Args:
+        target_ip:
+            the destination IP (or a collection of IPs).
+        count:
+            how many packet to send (0: until the generator is closed).
+        interval:
+            time interval between packets (only used when count is 0).
+        quit_on_first_reply:
+            sends packets to every target until it gets a reply.
+        timeout:
+            how long to wait for a reply.
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+    """
+
+    return iter_arp_request(
+        target_ip=target_ip,
+        arp_psrc='0.0.0.0',
+        count=count,
+        interval=interval,
+        quit_on_first_reply=quit_on_first_reply,
+        timeout=timeout,
+        pcap_writer=pcap_writer,
+        session=session,
     )
@@ -16,29 +16,68 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from collections import defaultdict
-from datetime import datetime
+from base64 import b64encode
+from collections import Counter, defaultdict, deque
+from collections.abc import Callable, Collection
+from contextlib import ExitStack, nullcontext
 from functools import partial
 from ipaddress import ip_address, ip_network
 from queue import SimpleQueue
+import signal
+from socket import inet_aton
 import sys
-from threading import Thread, Event
-
+from threading import Thread, Event, Lock
+import time
+from typing import Literal, NamedTuple, Optional, TextIO
 
 from asciimatics.event import KeyboardEvent
 from asciimatics.exceptions import ResizeScreenError
 from asciimatics.scene import Scene
 from asciimatics.screen import ManagedScreen, Screen
 from asciimatics.widgets import Frame
-from scapy.layers.l2 import ARP, Ether
+from scapy.layers.l2 import ARP
 from scapy.sendrecv import sniff
 
+from .detection import Alert, SpoofDetector
+from .frame import ARP_KINDS, ArpFrame, ArpKind
+from .history import MappingHistory
 from ..modules.ansi import Cursor, echo_ansi, fg_rgb, Fore
 from ..modules.ascii.animation import Animation
-from ..modules.utils import ExpirableDict
+from ..modules.pcap import read_capture, RotatingPcapWriter
+from ..modules.sketch import HyperLogLog, SlidingCounter
+from ..modules.stream import BatchedLineWriter
+from ..modules.utils import ExpirableBiIndex
 from ..network import get_default_gateway, get_local_ip
 
 
+class MappingEvent(NamedTuple):
+    """A change in the MAC/IP associations held by a MappingModel."""
+
+    kind: Literal['add', 'refresh', 'expire']
+    """The type of change."""
+
+    mac: str
+    """The MAC address of the association."""
+
+    ip: str
+    """The IP address of the association."""
+
+    timestamp: float
+    """When the change happened, as a UNIX timestamp."""
+
+
+LEARNABLE_KINDS: tuple[ArpKind, ...] = ('request', 'announcement', 'reply', 'garp')
+"""The kinds of ARP packets a MappingModel can extract associations from
+(probes carry no sender IP address)."""
+
+RATE_WINDOWS: tuple[int, ...] = (1, 10, 60)
+"""The sliding windows the ARP request rate of every host is measured over, in seconds."""
+
+MAX_SOURCES: int = 4096
+"""How many sender MAC addresses get their own packet counters (the packets of
+the others are only counted in the totals)."""
+
+
 class MappingModel:
     """Data model that holds the MAC/IP associations extracted from sniffed ARP packets."""
 
@@ -63,20 +102,110 @@ class MappingModel:
 
             return self._stop_event.is_set()
 
-    def __init__(self, target_range: str, ttl: int):
+    def __init__(
+            self,
+            target_range: str,
+            ttl: int,
+            learn_from: Collection[ArpKind] = ('request',),
+            storm_threshold: Optional[float] = None,
+            hll_precision: int = 12,
+            pcap_writer: Optional[RotatingPcapWriter] = None,
+    ):
         """Args:
             target_range:
                 the target IP range, in CIDR notation.
             ttl:
                 initial time to live for a new mapping, in seconds.
+            learn_from:
+                the kinds of ARP packets associations are extracted from
+                (see LEARNABLE_KINDS). The spoofing detector is fed with the
+                associations of every kind.
+            storm_threshold:
+                if set, hosts sending more ARP requests per second than this
+                (averaged over 10 seconds) raise an `arp-storm` alert.
+            hll_precision:
+                precision of the HyperLogLog sketches that estimate the number of
+                distinct MAC and IP addresses (they take 2^hll_precision bytes each).
+            pcap_writer:
+                if set, every sniffed ARP packet is recorded to it.
         """
 
-        self._target_range, self._ttl = target_range, ttl
-        self._db, self._queue = ExpirableDict(delta=ttl), SimpleQueue()
-        self._total_requests: int = 0
+        if unknown := set(learn_from) - set(LEARNABLE_KINDS):
+            raise ValueError(f'cannot learn associations from {', '.join(sorted(unknown))}')
 
+        network = ip_network(target_range, strict=False)
+        self._network_range: tuple[int, int] = (
+            int(network.network_address), int(network.broadcast_address)
+        )
+        self._ttl = ttl
+        self._learn_from: frozenset[ArpKind] = frozenset(learn_from)
+        self._db = ExpirableBiIndex(delta=ttl, on_expire=partial(self._emit, 'expire'))
+        self._queue = SimpleQueue()
+        self._total_requests: int = 0
+        self._op_counters: Counter[ArpKind] = Counter()
+        self._source_counters: defaultdict[str, Counter[ArpKind]] = defaultdict(Counter)
+        self._untracked_packets: int = 0
+        self._rates = SlidingCounter(windows=RATE_WINDOWS)
+        self._storm_threshold = storm_threshold
+        self._mac_sketch = HyperLogLog(hll_precision)
+        self._ip_sketch = HyperLogLog(hll_precision)
+
+        self._detector = SpoofDetector(ttl)
+        self._alerts: deque[Alert] = deque(maxlen=100)
+        self._detector.add_listener(self._alerts.append)
+
+        self._capture_time: float | None = None
+        self._pcap_writer = pcap_writer
+
+        self._lock = Lock()
+        self._listeners: list[Callable[[MappingEvent], None]] = []
         self._sniff_thread: MappingModel.StoppableThread | None = None
 
+    def add_listener(self, listener: Callable[[MappingEvent], None]) -> None:
+        """Registers a function that gets called on every change of the mapping database.
+
+        Listeners are called from the sniffer thread, so they should return quickly.
+        """
+
+        self._listeners.append(listener)
+
+    def now(self) -> float:
+        """The current time of the model, as a UNIX timestamp: the wall clock time,
+        or the capture time of the last packet read from a capture file."""
+
+        return time.time() if self._capture_time is None else self._capture_time
+
+    def prune(self) -> None:
+        """Removes expired mappings from the database."""
+
+        with self._lock:
+            self._db.prune(self.now())
+
+    def mappings(self) -> list[tuple[str, str, float]]:
+        """Returns a snapshot of the active mappings as (MAC, IP, expiration date) tuples,
+        sorted by IP address.
+        """
+
+        with self._lock:
+            self._db.prune(self.now())
+            snapshot = [
+                (mac, ip, self._db.get_expiration_date(mac, ip)) for mac, ip in self._db.items()
+            ]
+
+        return sorted(snapshot, key=lambda mapping: (int(ip_address(mapping[1])), mapping[0]))
+
+    def macs(self, ip: str) -> tuple[str, ...]:
+        """Returns the MAC addresses currently associated with an IP address."""
+
+        with self._lock:
+            return tuple(self._db.lefts(ip))
+
+    def ips(self, mac: str) -> tuple[str, ...]:
+        """Returns the IP addresses currently associated with a MAC address."""
+
+        with self._lock:
+            return tuple(self._db.rights(mac))
+
     def start_gatherer(self) -> None:
         """Starts the ARP sniffer as a background thread."""
 
@@ -86,6 +215,9 @@ class MappingModel:
     def stop_gatherer(self) -> None:
         """Stops the ARP sniffer."""
 
+        if self._sniff_thread is None:
+            return
+
         self._sniff_thread.stop()
         self._sniff_thread.join()
 
@@ -104,39 +236,199 @@ class MappingModel:
 
         return self._ttl
 
+    @property
+    def learn_from(self) -> frozenset[ArpKind]:
+        """The kinds of ARP packets associations are extracted from."""
+
+        return self._learn_from
+
     @property
     def requests(self) -> int:
-        """The total number of sniffed ARP requests (excluding probes)."""
+        """The total number of sniffed ARP packets associations were extracted from."""
 
         return self._total_requests
 
     @property
-    def db(self) -> ExpirableDict:
-        """The internal mapping database."""
+    def op_counters(self) -> Counter[ArpKind]:
+        """How many ARP packets of each kind have been sniffed."""
+
+        with self._lock:
+            return self._op_counters.copy()
+
+    @property
+    def source_counters(self) -> dict[str, Counter[ArpKind]]:
+        """How many ARP packets of each kind have been sniffed, by sender MAC address
+        (for the first MAX_SOURCES senders of an address in range)."""
+
+        with self._lock:
+            return {
+                mac: counter.copy() for mac, counter in self._source_counters.items()
+            }
+
+    @property
+    def untracked_packets(self) -> int:
+        """How many ARP packets from an address in range were sent by a MAC
+        address without its own counters (see MAX_SOURCES)."""
+
+        return self._untracked_packets
+
+    @property
+    def mac_sketch(self) -> HyperLogLog:
+        """HyperLogLog sketch of the sender MAC addresses of every sniffed ARP packet."""
+
+        return self._mac_sketch
+
+    @property
+    def ip_sketch(self) -> HyperLogLog:
+        """HyperLogLog sketch of the sender IP addresses of every sniffed ARP packet."""
+
+        return self._ip_sketch
+
+    def distinct(self) -> tuple[int, int]:
+        """Returns the estimated number of distinct (MAC addresses, IP addresses)
+        that sent an ARP packet."""
+
+        with self._lock:
+            return self._mac_sketch.estimate(), self._ip_sketch.estimate()
+
+    def top_talkers(self, window: int = 10) -> list[tuple[str, float]]:
+        """Returns the MAC addresses sending the most ARP requests, with their estimated
+        rate in requests per second, in descending order.
+
+        Args:
+            window:
+                the sliding window the rates are measured over (see RATE_WINDOWS).
+        """
+
+        with self._lock:
+            return [
+                (mac, count / window)
+                for mac, count in self._rates.top(window, self.now())
+            ]
+
+    @property
+    def db(self) -> ExpirableBiIndex:
+        """The internal mapping database, relating MAC addresses to IP addresses."""
 
         return self._db
 
+    @property
+    def detector(self) -> SpoofDetector:
+        """The MAC flip and ARP spoofing detector fed with every sniffed association."""
+
+        return self._detector
+
+    @property
+    def alerts(self) -> deque[Alert]:
+        """The most recent alerts raised by the detector."""
+
+        return self._alerts
+
     def _init_sniffer(self) -> None:
         self._sniff_thread = MappingModel.StoppableThread(target=sniff, kwargs={
             'filter': 'arp',
-            'prn': partial(self._arp_monitor_callback, ip_range=self._target_range),
+            'prn': self._arp_monitor_callback,
             'stop_filter': lambda p: self._sniff_thread.stopped(),
             'store': 0,
         })
         self._total_requests = 0
+        self._op_counters.clear()
+        self._source_counters.clear()
+        self._untracked_packets = 0
+
+    def read_capture(self, path: str) -> int:
+        """Feeds every ARP packet of a pcap or pcapng file to the model, using
+        the capture timestamps as the clock.
+
+        Returns:
+            the number of ARP packets read.
+        """
+
+        packets: int = 0
+
+        for record in read_capture(path):
+            if (frame := ArpFrame.from_bytes(record.data, record.linktype)) is None:
+                continue
+
+            self._capture_time = record.timestamp
+            self.feed(frame, record.timestamp)
+            packets += 1
+
+        return packets
 
-    def _arp_monitor_callback(self, pkt, ip_range: str) -> None:
-        if ARP in pkt and pkt[ARP].op not in (1,):
+    def feed(self, frame: ArpFrame, timestamp: float) -> None:
+        """Extracts the MAC/IP association of an ARP packet.
+
+        Args:
+            frame:
+                the fields of the ARP packet.
+            timestamp:
+                when the packet was captured, as a UNIX timestamp.
+        """
+
+        hwsrc, psrc, kind = frame.hwsrc, frame.psrc, frame.kind
+
+        with self._lock:
+            self._op_counters[kind] += 1
+
+            self._mac_sketch.add(hwsrc)
+            if kind != 'probe':
+                self._ip_sketch.add(psrc)
+
+            if frame.op == 1:
+                rates = self._rates.add(hwsrc, timestamp)
+
+                if self._storm_threshold and rates[10] / 10 > self._storm_threshold:
+                    self._detector.report(Alert('arp-storm', psrc, hwsrc, (), timestamp))
+
+        low, high = self._network_range
+        if not low <= int.from_bytes(inet_aton(psrc)) <= high:
             return
 
-        if ip_address(pkt[ARP].psrc) not in ip_network(ip_range, strict=False):
+        with self._lock:
+            # the counters are bounded: random source addresses cannot grow them.
+            if hwsrc in self._source_counters or len(self._source_counters) < MAX_SOURCES:
+                self._source_counters[hwsrc][kind] += 1
+            else:
+                self._untracked_packets += 1
+
+            if kind not in LEARNABLE_KINDS:
+                return
+
+            # every association reaches the detector, learned from or not: replies
+            # and gratuitous ARP are the usual vectors of MAC takeovers.
+            self._detector.observe(hwsrc, psrc, timestamp)
+
+            if kind not in self._learn_from:
+                return
+
+            change = 'add' if self._db.add(hwsrc, psrc, timestamp) else 'refresh'
+            self._total_requests += 1
+
+        self._emit(change, hwsrc, psrc, timestamp)
+
+    def _arp_monitor_callback(self, pkt) -> None:
+        if ARP not in pkt:
             return
 
-        if pkt[ARP].psrc in ('0.0.0.0',):
+        if self._pcap_writer is not None:
+            self._pcap_writer.write(bytes(pkt), pkt.time)
+
+        self.feed(ArpFrame.from_packet(pkt), float(pkt.time))
+
+    def _emit(
+            self,
+            kind: Literal['add', 'refresh', 'expire'],
+            mac: str,
+            ip: str,
+            timestamp: Optional[float] = None,
+    ) -> None:
+        if not self._listeners:
             return
 
-        self._total_requests += 1
-        self._db[pkt[Ether].hwsrc] = pkt[ARP].psrc
+        event = MappingEvent(kind, mac, ip, self.now() if timestamp is None else timestamp)
+        for listener in self._listeners:
+            listener(event)
 
 
 class MainView(Frame):
@@ -167,17 +459,12 @@ class MainView(Frame):
                 data model to hold passive scan data.
         """
 
-        assoc_counter: int = len(model.db)
-
         super().__init__(
             screen=screen,
             height=screen.height,
             width=screen.width,
             has_border=True,
-            title=(
-                f'ARP requests{f' | {assoc_counter} / {model.requests}'
-                if assoc_counter else ''}'
-            ),
+            title=self._format_title(model),
         )
 
         self._model: MappingModel = model
@@ -221,26 +508,29 @@ class MainView(Frame):
             echo_ansi(Cursor.POS)(3, y)
             print(' ' * (self.screen.width - 5), end='')
 
-    def _update(self, frame_no):
-        assoc_counter: int = len(self._model.db)
-        self.title = (
-            f'ARP requests{f' | {assoc_counter} / {self._model.requests}'
-            if assoc_counter else ''}'
+    @staticmethod
+    def _format_title(model: MappingModel) -> str:
+        assoc_counter: int = len(model.db)
+        alert_counter: int = len(model.alerts)
+
+        return (
+            f'{'ARP requests' if model.learn_from == {'request'} else 'ARP traffic'}'
+            f'{f' | {assoc_counter} / {model.requests}' if assoc_counter else ''}'
+            f'{f' | {alert_counter} alerts' if alert_counter else ''}'
         )
 
-        sorted_db = dict(sorted(
-            self._model.db.items(),
-            key=lambda item: int(ip_address(item[1]))
-        ))
+    def _update(self, frame_no):
+        self.title = self._format_title(self._model)
+
+        mappings = self._model.mappings()
+        now = self._model.now()
 
         self._clear_display_window()
-        for y, (hwsrc, psrc) in zip(
+        for y, (hwsrc, psrc, expiration_date) in zip(
                 range(2, self.screen.height),
-                tuple(sorted_db.items())[self._scroll_index:],
+                mappings[self._scroll_index:],
         ):
-            cttl = int((
-                self._model.db.get_expiration_date(hwsrc) - datetime.now()
-            ).total_seconds())
+            cttl = int(expiration_date - now)
 
             line_color = self._ttl_animation.frame_from_state(cttl / self._model.ttl)
             if psrc == get_default_gateway():
@@ -313,26 +603,231 @@ class PassiveScanTUI:
         self._model.stop_gatherer()
 
 
-def arp_pscan(target_range: str, ttl: int = 60 * 5) -> None:
+class PassiveScanStream:
+    """Context manager that streams the passive ARP scanner events as JSON Lines,
+    without rendering a TUI.
+
+    Every add/refresh/expire event becomes one JSON object per line. Lines are
+    buffered and written in batches, so that a busy network does not translate
+    into a write call per packet.
+
+    Typical usage:
+        with PassiveScanStream(model, sys.stdout) as stream:
+            stream.run()
+    """
+
+    def __init__(
+            self,
+            model: MappingModel,
+            output: TextIO,
+            flush_interval: float = 1.0,
+            close_output: bool = False,
+    ):
+        """Args:
+            model:
+                data model to hold passive scan data.
+            output:
+                text stream the events are written to.
+            flush_interval:
+                maximum time an event is held in memory before being written, in seconds.
+            close_output:
+                whether to close the output stream on exit.
+        """
+
+        self._model = model
+        self._writer = BatchedLineWriter(
+            output,
+            flush_interval=flush_interval,
+            close_stream=close_output,
+        )
+        self._stop_event = Event()
+
+        self._model.add_listener(self._on_event)
+        self._model.detector.add_listener(self._on_alert)
+
+    def run(self, tick: float = 0.5) -> None:
+        """Streams events until stop() is called.
+
+        Args:
+            tick:
+                how often expired mappings are looked for, in seconds.
+        """
+
+        if not self._model.is_gatherer_alive:
+            self._model.start_gatherer()
+
+        while not self._stop_event.wait(tick):
+            self._model.prune()
+            self._writer.flush(force=False)
+
+    def stop(self) -> None:
+        """Makes run() return."""
+
+        self._stop_event.set()
+
+    def _on_event(self, event: MappingEvent) -> None:
+        self._writer.write_record({
+            'event': event.kind,
+            'time': round(event.timestamp, 6),
+            'mac': event.mac,
+            'ip': event.ip,
+            'ttl': self._model.ttl,
+        })
+
+    def _on_alert(self, alert: Alert) -> None:
+        self._writer.write_record({
+            'event': 'alert',
+            'time': round(alert.timestamp, 6),
+            'kind': alert.kind,
+            'mac': alert.mac,
+            'ip': alert.ip,
+            'previous': alert.previous,
+        })
+
+    def __enter__(self):
+        return self
+
+    def _write_stats(self) -> None:
+        op_counters = self._model.op_counters
+        self._writer.write_record({
+            'event': 'stats',
+            'time': round(self._model.now(), 6),
+            # every kind is reported, so that records always have the same fields.
+            'ops': {kind: op_counters[kind] for kind in ARP_KINDS},
+            'sources': self._model.source_counters,
+            'untracked': self._model.untracked_packets,
+            'top': {
+                window: self._model.top_talkers(window) for window in RATE_WINDOWS
+            },
+            'distinct': dict(zip(('macs', 'ips'), self._model.distinct())),
+            # serialized sketches, to merge the estimates of several runs or sensors.
+            'sketches': {
+                'macs': b64encode(self._model.mac_sketch.to_bytes()).decode(),
+                'ips': b64encode(self._model.ip_sketch.to_bytes()).decode(),
+            },
+        })
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._model.stop_gatherer()
+            self._write_stats()
+        finally:
+            self._writer.close()
+
+
+def arp_pscan(
+        target_range: str,
+        ttl: int = 60 * 5,
+        output: Optional[str] = None,
+        database: Optional[str] = None,
+        learn_from: Collection[ArpKind] = ('request',),
+        storm_threshold: Optional[float] = None,
+        capture: Optional[str] = None,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+) -> None:
     """Performs a passive scan of the network by extracting MAC/IP pairs
-    from broadcast ARP requests.
+    from sniffed ARP packets (broadcast ARP requests by default).
 
     Args:
         target_range:
             the target IP range, in CIDR notation.
         ttl:
             initial time to live for a new mapping, in seconds.
+        output:
+            if set, no TUI is shown and the scanner events are streamed as JSON Lines
+            to the given file ('-' for stdout).
+        database:
+            if set, every MAC/IP association is also recorded in the given
+            SQLite database.
+        learn_from:
+            the kinds of ARP packets MAC/IP pairs are extracted from
+            (any of 'request', 'announcement', 'reply' and 'garp').
+        storm_threshold:
+            if set, hosts sending more ARP requests per second than this
+            are reported as alerts.
+        capture:
+            if set, packets are read from the given pcap or pcapng file instead of
+            being sniffed, and their capture timestamps are used as the clock.
+        pcap_writer:
+            if set, every sniffed ARP packet is recorded to it.
     """
 
-    model = MappingModel(target_range, ttl)
+    model = MappingModel(
+        target_range, ttl, learn_from, storm_threshold, pcap_writer=pcap_writer
+    )
 
-    try:
-        with PassiveScanTUI(model) as tui:
-            tui.show()
-    except KeyboardInterrupt:
-        pass
-    finally:
-        for hwsrc, psrc in model.db.items():
-            print(f'{hwsrc} <== {psrc}')
+    with MappingHistory(database, gap=ttl) if database else nullcontext() as history:
+        if history:
+            model.add_listener(history.record_event)
+
+        if output is not None:
+            _arp_pscan_headless(model, output, capture)
+
+            return
+
+        if capture is not None:
+            model.read_capture(capture)
+            _print_summary(model)
+
+            return
+
+        try:
+            with PassiveScanTUI(model) as tui:
+                tui.show()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            _print_summary(model)
+
+    sys.exit()
+
+
+def _print_summary(model: MappingModel) -> None:
+    for hwsrc, psrc, _expiration_date in model.mappings():
+        print(f'{hwsrc} <== {psrc}')
+
+    if op_counters := model.op_counters:
+        print(', '.join(
+            f'{count} {kind}' for kind, count in op_counters.most_common()
+        ))
+
+        macs, ips = model.distinct()
+        print(f'~{macs} distinct MAC addresses, ~{ips} distinct IP addresses')
+
+    for mac, rate in model.top_talkers(window=60)[:5]:
+        print(f'{mac} sent {rate:.2f} requests/s over the last 60 sec')
+
+    for alert in model.alerts:
+        print(f'{Fore.YELLOW}{_fmt_alert(alert)}{Fore.RESET}')
+
+
+def _fmt_alert(alert: Alert) -> str:
+    if alert.kind == 'arp-storm':
+        return f'[{alert.kind}] {alert.mac} ({alert.ip}) is flooding the network with requests'
+
+    return (
+        f'[{alert.kind}] {alert.ip} claimed by {alert.mac} '
+        f'(previously {', '.join(alert.previous)})'
+    )
+
+
+def _arp_pscan_headless(model: MappingModel, output: str, capture: Optional[str]) -> None:
+    with ExitStack() as stack:
+        stream = sys.stdout if output == '-' else stack.enter_context(
+            open(output, 'a', encoding='utf-8')
+        )
+        # the scanner flushes its last events before the output file is closed.
+        scanner = stack.enter_context(PassiveScanStream(model, stream))
+
+        if capture is not None:
+            model.read_capture(capture)
+
+            return
+
+        # stop cleanly when running as a service.
+        signal.signal(signal.SIGTERM, lambda *_: scanner.stop())
 
-        sys.exit()
+        try:
+            scanner.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,207 @@
+"""Provides functions to replay captured ARP traffic on the network."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections.abc import Iterable, Iterator
+import os
+import socket
+import time
+from typing import Optional
+
+from scapy.config import conf
+from scapy.interfaces import network_name
+
+from .frame import ArpFrame
+from ..modules.histogram import HdrHistogram
+from ..modules.pcap import CaptureRecord, LINKTYPE_ETHERNET, read_capture
+from ..modules.scheduler import sleep_until
+
+
+BATCH_WINDOW: float = 50e-6
+"""Frames due within this time of each other are sent back to back, in seconds."""
+
+MAX_BATCH: int = 1024
+"""The largest number of frames sent back to back (and read ahead from the capture)."""
+
+
+class ReplayReport:
+    """The outcome of a replay: how many frames were sent, and how far from
+    their scheduled time."""
+
+    def __init__(self):
+        self.sent: int = 0
+        """How many frames were sent."""
+
+        self.skipped: int = 0
+        """How many frames were not replayed (not ARP, or not Ethernet frames)."""
+
+        self.errors: int = 0
+        """How many frames could not be sent."""
+
+        self.lateness: HdrHistogram = HdrHistogram()
+        """The distribution of how late frames were sent, in nanoseconds
+        (not recorded when frames are sent as fast as possible)."""
+
+        self.capture_duration: float = 0.0
+        """The time between the first and the last replayed frame in the capture, in seconds."""
+
+        self.duration: float = 0.0
+        """How long the replay took, in seconds."""
+
+    def summary(self, speed: Optional[float]) -> str:
+        """Returns the summary printed at the end of a replay."""
+
+        lines = [
+            f'Replayed {self.sent} frames ({self.skipped} skipped, {self.errors} send errors) '
+            f'in {self.duration:.3f} s, for {self.capture_duration:.3f} s of capture.'
+        ]
+
+        if speed is not None and self.lateness.count:
+            expected = self.capture_duration / speed
+            lateness = '/'.join(
+                f'{value / 1e6:.3f}' for value in (
+                    self.lateness.percentile(50),
+                    self.lateness.percentile(99),
+                    self.lateness.max,
+                )
+            )
+
+            lines.append(
+                f'timing x{speed:g}: {self.duration - expected:+.3f} s over {expected:.3f} s, '
+                f'lateness p50/p99/max = {lateness} ms'
+            )
+
+        return '\n'.join(lines)
+
+
+def _replayable(
+        records: Iterable[CaptureRecord],
+        report: ReplayReport,
+        arp_only: bool,
+) -> Iterator[CaptureRecord]:
+    origin = None
+
+    for record in records:
+        if record.linktype != LINKTYPE_ETHERNET or (
+                arp_only and ArpFrame.from_bytes(record.data) is None
+        ):
+            report.skipped += 1
+            continue
+
+        if origin is None:
+            origin = record.timestamp
+
+        report.capture_duration = record.timestamp - origin
+        yield record
+
+
+def _batches(
+        records: Iterator[CaptureRecord],
+        speed: Optional[float],
+) -> Iterator[tuple[float, list[tuple[float, bytes]]]]:
+    """Groups the frames due within BATCH_WINDOW of each other (MAX_BATCH at most),
+    and yields the time of every batch (relative to the first frame) with the
+    times of its frames."""
+
+    if (first := next(records, None)) is None:
+        return
+
+    origin = first.timestamp
+    batch = [(0.0, first.data)]
+
+    for record in records:
+        due = (record.timestamp - origin) / speed if speed is not None else 0.0
+
+        if due - batch[0][0] > BATCH_WINDOW or len(batch) >= MAX_BATCH:
+            yield batch[0][0], batch
+            batch = []
+
+        batch.append((due, record.data))
+
+    yield batch[0][0], batch
+
+
+def arp_replay(
+        capture: str | os.PathLike,
+        speed: Optional[float] = 1.0,
+        arp_only: bool = True,
+        iface: Optional[str] = None,
+        verbose: Optional[int] = None,
+) -> ReplayReport:
+    """Sends the frames of a capture file on the network, keeping their original
+    timing, scaled by `speed`, or as fast as possible.
+
+    Frames due within 50 us of each other are sent back to back, and every frame
+    is timed against an absolute deadline, so delays do not accumulate.
+
+    Typical usage:
+        report = arp_replay('storm.pcap', speed=10)
+        print(report.lateness.percentile(99))
+
+    Args:
+        capture:
+            the path of the pcap or pcapng file.
+        speed:
+            how many times faster than in the capture to send the frames
+            (None: as fast as possible).
+        arp_only:
+            whether to only replay the ARP frames of the capture.
+        iface:
+            the network interface (default: scapy's default interface).
+        verbose:
+            verbosity level.
+
+    Raises:
+        CaptureFormatError:
+            the file is not a valid capture.
+    """
+
+    verbose = conf.verb if verbose is None else verbose
+    report = ReplayReport()
+
+    sender = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+    sender.bind((network_name(iface or conf.iface), 0))
+
+    records = _replayable(read_capture(capture), report, arp_only)
+    start = time.monotonic()
+
+    try:
+        for batch_due, batch in _batches(records, speed):
+            sleep_until(start + batch_due)
+
+            for due, data in batch:
+                try:
+                    sender.send(data)
+                    report.sent += 1
+                except OSError:
+                    report.errors += 1
+
+                if speed is not None:
+                    report.lateness.record(
+                        max(round((time.monotonic() - start - due) * 1e9), 0)
+                    )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+
+    report.duration = time.monotonic() - start
+
+    if verbose:
+        print(report.summary(speed))
+
+    return report
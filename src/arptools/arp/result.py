@@ -0,0 +1,65 @@
+"""Contains the structured results of the ARP sending functions."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from typing import NamedTuple, Optional
+
+from .frame import ArpFrame
+from .packets.exchange import Exchange
+
+
+class ArpResult(NamedTuple):
+    """The outcome of an ARP request."""
+
+    target_ip: str
+    """The IP address the request was sent for."""
+
+    mac: Optional[str]
+    """The MAC address advertised by the reply, or None if the request was not answered."""
+
+    rtt: Optional[float]
+    """How long the reply took, in seconds, or None if the request was not answered."""
+
+    attempt: int
+    """How many requests had been sent for the target IP address, this one included."""
+
+    timestamp: float
+    """When the request was sent, as a UNIX timestamp."""
+
+    @property
+    def answered(self) -> bool:
+        """Whether the request was answered."""
+
+        return self.mac is not None
+
+    @classmethod
+    def from_exchange(cls, exchange: Exchange) -> 'ArpResult':
+        """Returns the result of a completed exchange."""
+
+        query, reply, attempt = exchange
+        sent_time = float(query.sent_time)
+
+        if reply is None:
+            return cls(ArpFrame.from_packet(query).pdst, None, None, attempt, sent_time)
+
+        return cls(
+            ArpFrame.from_packet(query).pdst,
+            ArpFrame.from_packet(reply).hwsrc,
+            max(float(reply.time) - sent_time, 0.0),
+            attempt,
+            sent_time,
+        )
@@ -16,9 +16,53 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+from collections.abc import Iterator
+from ipaddress import ip_network
 from typing import Optional
 
-from .packets.request import arp_request
+from .packets import _print_exchanges
+from .packets.exchange import Exchange
+from .packets.formatters import Formatter, OutputFormat
+from .packets.session import ArpSession, build_frames
+from .packets.statistics import ExchangeStatistics
+from .packets.sweep import sweep
+from .result import ArpResult
+from ..modules.pcap import RotatingPcapWriter
+from ..modules.permutation import CyclicPermutation
+
+
+def _scan_exchanges(
+        target_range: str,
+        use_arp_probes: bool,
+        timeout: float,
+        retries: int,
+        randomize: bool,
+        seed: Optional[int],
+        pcap_writer: Optional[RotatingPcapWriter],
+        session: Optional[ArpSession],
+        statistics: Optional[ExchangeStatistics] = None,
+) -> Iterator[Exchange]:
+    """Returns the exchanges of a scan (see arp_scan()), swept in compact state."""
+
+    network = ip_network(target_range, strict=False)
+
+    pkt = build_frames(
+        'who-has',
+        str(network.network_address),
+        arp_psrc='0.0.0.0' if use_arp_probes else None,
+        session=session,
+    )
+
+    return sweep(
+        network,
+        bytes(next(iter(pkt))),
+        order=CyclicPermutation(network.num_addresses, seed) if randomize else None,
+        timeout=timeout,
+        retries=retries,
+        socket=session.socket if session is not None else None,
+        pcap_writer=pcap_writer,
+        statistics=statistics,
+    )
 
 
 def arp_scan(
@@ -26,10 +70,21 @@ def arp_scan(
         use_arp_probes: bool = False,
         timeout: int = 2,
         verbose: Optional[int] = None,
+        output_format: OutputFormat = 'text',
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        rtt_histogram: bool = False,
+        live_statistics: bool = False,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+        retries: int = 0,
 ) -> None:
     """Performs an ARP scan of the network by sending ARP requests to all the
     IPs in range and waiting for a response.
 
+    The state of the scan is kept in a few bytes per IP (see sweep()), so even
+    large ranges can be scanned in little memory.
+
     Args:
         target_range:
             target IP range in CIDR notation (e.g. 192.168.1.0/24).
@@ -39,13 +94,80 @@ def arp_scan(
             how long to wait for a reply.
         verbose:
             verbosity level.
+        output_format:
+            the format of the printed lines.
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+        rtt_histogram:
+            whether to print the histogram of the round-trip times at exit.
+        live_statistics:
+            whether to keep a line with the latest statistics at the bottom of the terminal.
+        randomize:
+            whether to scan the range in a pseudo-random order (default: in
+            ascending order), which spreads the requests across the network.
+        seed:
+            the seed of the order, to repeat a scan (default: random).
+        retries:
+            how many more requests to send to the IPs that do not answer.
     """
 
-    arp_request(
-        target_ip=target_range,
-        arp_psrc='0.0.0.0' if use_arp_probes else None,
-        count=1,
-        timeout=timeout,
-        ignore_unanswered=True,
+    formatter = Formatter(output_format)
+    statistics = ExchangeStatistics()
+
+    _print_exchanges(
+        _scan_exchanges(
+            target_range, use_arp_probes, timeout, retries, randomize, seed,
+            pcap_writer, session, statistics,
+        ),
+        statistics,
+        prn=formatter.answered,
         verbose=verbose,
+        formatter=formatter,
+        rtt_histogram=rtt_histogram,
+        live_statistics=live_statistics,
     )
+
+
+def iter_arp_scan(
+        target_range: str,
+        use_arp_probes: bool = False,
+        timeout: float = 2,
+        pcap_writer: Optional[RotatingPcapWriter] = None,
+        session: Optional[ArpSession] = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+        retries: int = 0,
+) -> Iterator[ArpResult]:
+    """Performs an ARP scan of the network, and yields the result of every IP
+    in range as soon as it responds or its timeout expires.
+
+    Typical usage:
+        hosts = {result.target_ip: result.mac for result in iter_arp_scan(cidr) if result.answered}
+
+    Args:
+        target_range:
+            the target IP range, in CIDR notation.
+        use_arp_probes:
+            whether to use ARP probes to scan the network.
+        timeout:
+            how long to wait for a reply.
+        pcap_writer:
+            if set, every sent packet and every reply are recorded to it.
+        session:
+            if set, the packets are sent over the socket of the session.
+        randomize:
+            whether to scan the range in a pseudo-random order (default: in
+            ascending order), which spreads the requests across the network.
+        seed:
+            the seed of the order, to repeat a scan (default: random).
+        retries:
+            how many more requests to send to the IPs that do not answer.
+    """
+
+    for completed in _scan_exchanges(
+            target_range, use_arp_probes, timeout, retries, randomize, seed,
+            pcap_writer, session,
+    ):
+        yield ArpResult.from_exchange(completed)
@@ -17,15 +17,54 @@
 
 
 from argparse import Namespace
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+import logging
+import sys
 
 from .arp import (
     arp_announcement,
+    arp_batch_scan,
+    arp_history,
+    arp_load,
     arp_probe,
     arp_request,
     arp_pscan,
+    arp_replay,
     arp_scan,
+    garp_keepalive,
     garp_reply,
 )
+from .arp.pscan import LEARNABLE_KINDS
+from .modules.pcap import CaptureFormatError, RotatingPcapWriter
+
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _capture_errors() -> Iterator[None]:
+    """Reports the capture files that cannot be read, and exits with an error code."""
+
+    try:
+        yield
+    except CaptureFormatError as err:
+        logger.error('could not read the capture file: %s.', err)
+        sys.exit(1)
+
+
+def _pcap_writer(namespace: Namespace) -> AbstractContextManager:
+    """Returns the capture file writer requested with --write-pcap,
+    or a null context if the option is not set."""
+
+    if namespace.write_pcap is None:
+        return nullcontext()
+
+    return RotatingPcapWriter(
+        namespace.write_pcap,
+        max_bytes=namespace.pcap_size * 2**20 or None,
+        max_files=namespace.pcap_files or None,
+    )
 
 
 def arpa(namespace: Namespace) -> None:
@@ -36,14 +75,18 @@ def arpa(namespace: Namespace) -> None:
           Namespace containing the command line arguments.
     """
 
-    arp_announcement(
-        mapping=namespace.mapping,
-        ethernet_src=namespace.ethernet_src,
-        ethernet_dst=namespace.ethernet_dst,
-        count=namespace.packet_count,
-        interval=namespace.interval,
-        verbose=0 if namespace.quiet else None,
-    )
+    with _pcap_writer(namespace) as pcap_writer:
+        arp_announcement(
+            mapping=namespace.mapping,
+            ethernet_src=namespace.ethernet_src,
+            ethernet_dst=namespace.ethernet_dst,
+            count=namespace.packet_count,
+            interval=namespace.interval,
+            rate=namespace.rate,
+            verbose=0 if namespace.quiet else None,
+            output_format=namespace.output_format,
+            pcap_writer=pcap_writer,
+        )
 
 
 def arpr(namespace: Namespace) -> None:
@@ -54,16 +97,44 @@ def arpr(namespace: Namespace) -> None:
           Namespace containing the command line arguments.
     """
 
-    arp_request(
-        target_ip=namespace.destination,
-        ethernet_src=namespace.ethernet_src,
+    with _pcap_writer(namespace) as pcap_writer:
+        arp_request(
+            target_ip=namespace.destination,
+            ethernet_src=namespace.ethernet_src,
+            ethernet_dst=namespace.ethernet_dst,
+            arp_hwsrc=namespace.arp_hwsrc,
+            arp_psrc=namespace.arp_psrc,
+            count=namespace.packet_count,
+            interval=namespace.interval,
+            quit_on_first_reply=namespace.quit_on_first_reply,
+            timeout=namespace.timeout,
+            verbose=0 if namespace.quiet else None,
+            output_format=namespace.output_format,
+            pcap_writer=pcap_writer,
+            rtt_histogram=namespace.rtt_histogram,
+            live_statistics=namespace.live_statistics,
+        )
+
+
+def arpload(namespace: Namespace) -> None:
+    """Arpload CLI.
+
+    Args:
+        namespace:
+          Namespace containing the command line arguments.
+    """
+
+    arp_load(
+        kind=namespace.kind,
+        target_range=namespace.destination_range,
+        source_range=namespace.source_range,
+        source_macs=namespace.source_macs,
         ethernet_dst=namespace.ethernet_dst,
-        arp_hwsrc=namespace.arp_hwsrc,
-        arp_psrc=namespace.arp_psrc,
+        pps=namespace.pps,
         count=namespace.packet_count,
-        interval=namespace.interval,
-        quit_on_first_reply=namespace.quit_on_first_reply,
-        timeout=namespace.timeout,
+        duration=namespace.duration,
+        randomize=namespace.randomize,
+        seed=namespace.seed,
         verbose=0 if namespace.quiet else None,
     )
 
@@ -76,14 +147,36 @@ def arprobe(namespace: Namespace) -> None:
           Namespace containing the command line arguments.
     """
 
-    arp_probe(
-        target_ip=namespace.destination,
-        count=namespace.packet_count,
-        interval=namespace.interval,
-        quit_on_first_reply=namespace.quit_on_first_reply,
-        timeout=namespace.timeout,
-        verbose=0 if namespace.quiet else None,
-    )
+    with _pcap_writer(namespace) as pcap_writer:
+        arp_probe(
+            target_ip=namespace.destination,
+            count=namespace.packet_count,
+            interval=namespace.interval,
+            quit_on_first_reply=namespace.quit_on_first_reply,
+            timeout=namespace.timeout,
+            verbose=0 if namespace.quiet else None,
+            output_format=namespace.output_format,
+            pcap_writer=pcap_writer,
+            rtt_histogram=namespace.rtt_histogram,
+            live_statistics=namespace.live_statistics,
+        )
+
+
+def arpreplay(namespace: Namespace) -> None:
+    """Arpreplay CLI.
+
+    Args:
+        namespace:
+          Namespace containing the command line arguments.
+    """
+
+    with _capture_errors():
+        arp_replay(
+            capture=namespace.capture,
+            speed=namespace.speed,
+            arp_only=namespace.arp_only,
+            verbose=0 if namespace.quiet else None,
+        )
 
 
 def arpscan(namespace: Namespace) -> None:
@@ -94,20 +187,55 @@ def arpscan(namespace: Namespace) -> None:
           Namespace containing the command line arguments.
     """
 
-    if namespace.passive:
-        arp_pscan(
-            target_range=namespace.destination_range,
-            ttl=namespace.passive,
+    if namespace.history:
+        arp_history(
+            database=namespace.history,
+            ip=namespace.destination_range,
+            mac=namespace.mac,
+            start=namespace.since,
+            end=namespace.until,
         )
 
         return
 
-    arp_scan(
-        target_range=namespace.destination_range,
-        use_arp_probes=namespace.use_arp_probes,
-        timeout=namespace.timeout,
-        verbose=0 if namespace.quiet else None,
-    )
+    if namespace.batch:
+        with _capture_errors():
+            arp_batch_scan(
+                target_range=namespace.destination_range,
+                capture=namespace.capture,
+            )
+
+        return
+
+    if namespace.passive:
+        with _capture_errors(), _pcap_writer(namespace) as pcap_writer:
+            arp_pscan(
+                target_range=namespace.destination_range,
+                ttl=namespace.ttl,
+                output=namespace.output,
+                database=namespace.database,
+                learn_from=LEARNABLE_KINDS if namespace.all_ops else ('request',),
+                storm_threshold=namespace.storm_threshold,
+                capture=namespace.capture,
+                pcap_writer=pcap_writer,
+            )
+
+        return
+
+    with _pcap_writer(namespace) as pcap_writer:
+        arp_scan(
+            target_range=namespace.destination_range,
+            use_arp_probes=namespace.use_arp_probes,
+            timeout=namespace.timeout,
+            verbose=0 if namespace.quiet else None,
+            output_format=namespace.output_format,
+            pcap_writer=pcap_writer,
+            rtt_histogram=namespace.rtt_histogram,
+            live_statistics=namespace.live_statistics,
+            randomize=namespace.randomize,
+            seed=namespace.seed,
+            retries=namespace.retries,
+        )
 
 
 def garp(namespace: Namespace) -> None:
@@ -118,11 +246,28 @@ def garp(namespace: Namespace) -> None:
           Namespace containing the command line arguments.
     """
 
-    garp_reply(
-        mapping=namespace.mapping,
-        ethernet_src=namespace.ethernet_src,
-        ethernet_dst=namespace.ethernet_dst,
-        count=namespace.packet_count,
-        interval=namespace.interval,
-        verbose=0 if namespace.quiet else None,
-    )
+    if namespace.keepalive:
+        with _pcap_writer(namespace) as pcap_writer:
+            garp_keepalive(
+                keepalives=namespace.keepalives,
+                ethernet_src=namespace.ethernet_src,
+                ethernet_dst=namespace.ethernet_dst,
+                verbose=0 if namespace.quiet else None,
+                output_format=namespace.output_format,
+                pcap_writer=pcap_writer,
+            )
+
+        return
+
+    with _pcap_writer(namespace) as pcap_writer:
+        garp_reply(
+            mapping=namespace.mapping,
+            ethernet_src=namespace.ethernet_src,
+            ethernet_dst=namespace.ethernet_dst,
+            count=namespace.packet_count,
+            interval=namespace.interval,
+            rate=namespace.rate,
+            verbose=0 if namespace.quiet else None,
+            output_format=namespace.output_format,
+            pcap_writer=pcap_writer,
+        )
@@ -0,0 +1,158 @@
+"""Contains a histogram that records values over a wide range with a bounded relative error."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import Counter
+from collections.abc import Iterator
+import math
+from typing import Optional
+
+
+class HdrHistogram:
+    """A high dynamic range histogram of non-negative integer values.
+
+    Values are counted in log-linear buckets: every power of two range is split
+    in `2 ** (precision - 1)` buckets, so any value is recorded with a relative
+    error below `2 ** (1 - precision)`, and the number of buckets only grows with
+    the logarithm of the largest value. Minimum, maximum and mean are exact.
+
+    Typical usage:
+        histogram = HdrHistogram()
+        histogram.record(412_000)
+        histogram.percentile(99)
+    """
+
+    def __init__(self, precision: int = 7):
+        """Args:
+            precision:
+                how many significant bits of every value are kept.
+        """
+
+        if precision < 1:
+            raise ValueError('precision must be strictly positive')
+
+        self._precision = precision
+        self._buckets: Counter[int] = Counter()
+        self._count: int = 0
+        self._total: int = 0
+        self._min: Optional[int] = None
+        self._max: Optional[int] = None
+
+    @property
+    def count(self) -> int:
+        """How many values were recorded."""
+
+        return self._count
+
+    @property
+    def min(self) -> Optional[int]:
+        """The smallest recorded value, or None if no value was recorded."""
+
+        return self._min
+
+    @property
+    def max(self) -> Optional[int]:
+        """The largest recorded value, or None if no value was recorded."""
+
+        return self._max
+
+    @property
+    def mean(self) -> Optional[float]:
+        """The mean of the recorded values, or None if no value was recorded."""
+
+        return self._total / self._count if self._count else None
+
+    def record(self, value: int, count: int = 1) -> None:
+        """Records `count` occurrences of a value."""
+
+        if value < 0:
+            raise ValueError('values must be non-negative')
+
+        self._buckets[self._index(value)] += count
+        self._count += count
+        self._total += value * count
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+
+    def percentile(self, percentile: float) -> Optional[int]:
+        """Returns the value below which `percentile` percent of the recorded values
+        fall (the highest value of its bucket), or None if no value was recorded."""
+
+        if not self._count:
+            return None
+
+        rank = max(math.ceil(self._count * percentile / 100), 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(self._bounds(index)[1], self._max)
+
+        return self._max
+
+    def buckets(self) -> Iterator[tuple[int, int, int]]:
+        """Yields the lowest value, the highest value and the count of every
+        non-empty bucket, in ascending order."""
+
+        for index in sorted(self._buckets):
+            yield *self._bounds(index), self._buckets[index]
+
+    def octaves(self) -> Iterator[tuple[int, int, int]]:
+        """Yields the lowest value, the highest value and the count of every power
+        of two range, from the one of the minimum to the one of the maximum."""
+
+        if not self._count:
+            return
+
+        counts: Counter[int] = Counter()
+        for low, _high, count in self.buckets():
+            counts[low.bit_length()] += count
+
+        for bits in range(self._min.bit_length(), self._max.bit_length() + 1):
+            yield (1 << bits) >> 1, (1 << bits) - 1, counts[bits]
+
+    def merge(self, other: 'HdrHistogram') -> None:
+        """Adds the values recorded by another histogram to this one."""
+
+        if self._precision != other._precision:
+            raise ValueError('histograms have different precisions')
+
+        if not other._count:
+            return
+
+        self._buckets.update(other._buckets)
+        self._count += other._count
+        self._total += other._total
+        self._min = other._min if self._min is None else min(self._min, other._min)
+        self._max = other._max if self._max is None else max(self._max, other._max)
+
+    def _index(self, value: int) -> int:
+        # values below 2 ** precision have a bucket each, larger values share
+        # buckets as wide as their least significant bits that are dropped.
+        if (shift := value.bit_length() - self._precision) <= 0:
+            return value
+
+        return (shift << (self._precision - 1)) + (value >> shift)
+
+    def _bounds(self, index: int) -> tuple[int, int]:
+        if index < 1 << self._precision:
+            return index, index
+
+        shift = (index >> (self._precision - 1)) - 1
+        mantissa = index - (shift << (self._precision - 1))
+
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
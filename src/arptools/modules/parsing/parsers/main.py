@@ -115,7 +115,7 @@ class MainArgumentParserTemplate(ExtendableArgumentParser):
         super().__init__(
             *args,
             formatter_class=SmartFormatter,
-            parents=[VerboseArgumentParser()],
+            parents=[VerboseArgumentParser(), *kwargs.pop('parents', ())],
             **kwargs,
         )
 
@@ -0,0 +1,332 @@
+"""Contains a memory mapped reader for pcap and pcapng capture files,
+and a buffered writer for pcap files."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections.abc import Iterator
+import logging
+import mmap
+import os
+from queue import Empty, SimpleQueue
+import struct
+from threading import Thread
+from typing import BinaryIO, NamedTuple, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+LINKTYPE_ETHERNET: int = 1
+LINKTYPE_LINUX_SLL: int = 113
+
+_PCAP_MAGIC: dict[bytes, tuple[str, float]] = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+_PCAPNG_SHB: int = 0x0A0D0D0A
+_PCAPNG_BYTE_ORDER_MAGIC: int = 0x1A2B3C4D
+_PCAPNG_IDB: int = 0x00000001
+_PCAPNG_OPB: int = 0x00000002
+_PCAPNG_SPB: int = 0x00000003
+_PCAPNG_EPB: int = 0x00000006
+
+
+class CaptureRecord(NamedTuple):
+    """A frame read from a capture file."""
+
+    timestamp: float
+    """When the frame was captured, as a UNIX timestamp."""
+
+    linktype: int
+    """The link layer header type of the frame (see https://www.tcpdump.org/linktypes.html)."""
+
+    data: bytes
+    """The captured bytes."""
+
+
+class CaptureFormatError(ValueError):
+    """The file is not a valid pcap or pcapng capture."""
+
+
+def read_capture(path: str | os.PathLike) -> Iterator[CaptureRecord]:
+    """Yields every frame of a pcap or pcapng file, in file order.
+
+    The file is memory mapped instead of being read in memory, so captures larger
+    than the available RAM can be processed: only the frame being yielded is copied.
+
+    Raises:
+        CaptureFormatError:
+            the file is not a valid capture.
+    """
+
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            try:
+                if mapped[:4] in _PCAP_MAGIC:
+                    yield from _read_pcap(mapped)
+                elif struct.unpack_from('<I', mapped)[0] == _PCAPNG_SHB:
+                    yield from _read_pcapng(mapped, path)
+                else:
+                    raise CaptureFormatError(f'{path}: unknown capture format')
+            except struct.error as err:
+                raise CaptureFormatError(f'{path}: truncated capture') from err
+
+
+def _read_pcap(mapped: mmap.mmap) -> Iterator[CaptureRecord]:
+    order, resolution = _PCAP_MAGIC[mapped[:4]]
+    linktype = struct.unpack_from(f'{order}I', mapped, 20)[0] & 0x0FFFFFFF
+
+    record_header = struct.Struct(f'{order}IIII')
+    offset, size = 24, len(mapped)
+
+    while offset + record_header.size <= size:
+        seconds, fraction, captured, _original = record_header.unpack_from(mapped, offset)
+        offset += record_header.size
+
+        if offset + captured > size:
+            raise struct.error('truncated record')
+
+        yield CaptureRecord(
+            seconds + fraction * resolution, linktype, mapped[offset:offset + captured]
+        )
+        offset += captured
+
+
+def _read_pcapng(mapped: mmap.mmap, path: str | os.PathLike) -> Iterator[CaptureRecord]:
+    order, offset, size = '<', 0, len(mapped)
+    # (linktype, timestamp resolution, timestamp offset) of every interface of the section.
+    interfaces: list[tuple[int, float, int]] = []
+    timestamp: float = 0.0
+
+    while offset + 12 <= size:
+        block_type = struct.unpack_from(f'{order}I', mapped, offset)[0]
+
+        if block_type == _PCAPNG_SHB:
+            # every section can have a different byte order.
+            magic = struct.unpack_from('<I', mapped, offset + 8)[0]
+            order = '<' if magic == _PCAPNG_BYTE_ORDER_MAGIC else '>'
+            interfaces = []
+
+        block_length = struct.unpack_from(f'{order}I', mapped, offset + 4)[0]
+        if block_length < 12 or offset + block_length > size:
+            raise struct.error('truncated block')
+
+        body, end = offset + 8, offset + block_length - 4
+
+        if block_type == _PCAPNG_IDB:
+            interfaces.append(_read_interface(mapped[body:end], order))
+        elif block_type in (_PCAPNG_EPB, _PCAPNG_OPB):
+            if block_type == _PCAPNG_EPB:
+                interface, high, low, captured = struct.unpack_from(f'{order}IIII', mapped, body)
+            else:
+                interface, _drops, high, low, captured = struct.unpack_from(
+                    f'{order}HHIII', mapped, body
+                )
+
+            if interface >= len(interfaces):
+                raise CaptureFormatError(f'{path}: packet of an undescribed interface')
+
+            linktype, resolution, ts_offset = interfaces[interface]
+            timestamp = ts_offset + ((high << 32) | low) * resolution
+
+            yield CaptureRecord(
+                timestamp, linktype, mapped[body + 20:min(body + 20 + captured, end)]
+            )
+        elif block_type == _PCAPNG_SPB and interfaces:
+            # simple packet blocks carry no timestamp (the previous one is reused)
+            # nor captured length.
+            original = struct.unpack_from(f'{order}I', mapped, body)[0]
+
+            yield CaptureRecord(
+                timestamp, interfaces[0][0], mapped[body + 4:min(body + 4 + original, end)]
+            )
+
+        offset += block_length
+
+
+def _read_interface(body: bytes, order: str) -> tuple[int, float, int]:
+    linktype = struct.unpack_from(f'{order}H', body)[0]
+    resolution, ts_offset = 1e-6, 0
+
+    offset = 8
+    while offset + 4 <= len(body):
+        code, length = struct.unpack_from(f'{order}HH', body, offset)
+        value = body[offset + 4:offset + 4 + length]
+
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            # if_tsresol: negative power of 10, or of 2 if the MSB is set.
+            exponent = value[0]
+            resolution = 2.0 ** -(exponent & 0x7F) if exponent & 0x80 else 10.0 ** -exponent
+        elif code == 14 and length >= 8:
+            ts_offset = struct.unpack_from(f'{order}q', value)[0]
+
+        offset += 4 + (length + 3) // 4 * 4
+
+    return linktype, resolution, ts_offset
+
+
+class RotatingPcapWriter:
+    """Writes frames to pcap files (with nanosecond timestamps) from a background thread.
+
+    write() only enqueues the frame, so the caller is never blocked by disk I/O.
+    Frames are written through a large buffer that is flushed whenever the queue
+    runs empty for `flush_interval` seconds.
+
+    Once a file grows over `max_bytes`, a new one is started: `FILE`, `FILE.1`,
+    `FILE.2`, ... every file being a valid capture on its own. Only the last
+    `max_files` files are kept, the older ones are deleted on rotation.
+
+    The writer holds the current file open until close() is called: use it as
+    a context manager, so that the file is flushed and closed on every exit path.
+
+    Typical usage:
+        with RotatingPcapWriter('arp.pcap', max_bytes=100 * 2**20) as writer:
+            writer.write(bytes(packet), packet.time)
+    """
+
+    _STOP = object()
+
+    def __init__(
+            self,
+            path: str | os.PathLike,
+            max_bytes: Optional[int] = None,
+            max_files: Optional[int] = None,
+            linktype: int = LINKTYPE_ETHERNET,
+            buffer_size: int = 1 << 20,
+            flush_interval: float = 1.0,
+    ):
+        """Args:
+            path:
+                path of the first capture file.
+            max_bytes:
+                size after which a new capture file is started (default: never).
+            max_files:
+                how many capture files are kept, at most (default: all of them).
+            linktype:
+                the link layer header type of the frames.
+            buffer_size:
+                size of the write buffer, in bytes.
+            flush_interval:
+                how long frames can stay in the buffer when no new frame is written,
+                in seconds.
+        """
+
+        self._path, self._max_bytes, self._linktype = os.fspath(path), max_bytes, linktype
+        self._max_files = max_files
+        self._buffer_size, self._flush_interval = buffer_size, flush_interval
+
+        self._paths: list[str] = []
+        self._rotations: int = 0
+        self._written: int = 0
+        self._file: BinaryIO = self._open_next()
+
+        self._queue: SimpleQueue = SimpleQueue()
+        self._thread = Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def paths(self) -> tuple[str, ...]:
+        """The capture files written so far (and not deleted by the rotation)."""
+
+        return tuple(self._paths)
+
+    def write(self, data: bytes, timestamp: float) -> None:
+        """Enqueues a frame.
+
+        Args:
+            data:
+                the frame, starting from the link layer header.
+            timestamp:
+                when the frame was sent or received, as a UNIX timestamp.
+        """
+
+        self._queue.put((data, timestamp))
+
+    def close(self) -> None:
+        """Writes the enqueued frames and closes the capture file."""
+
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+        self._file.close()
+
+    def _open_next(self) -> BinaryIO:
+        path = self._path if not self._rotations else f'{self._path}.{self._rotations}'
+        self._paths.append(path)
+        self._rotations += 1
+
+        # the writer owns the current file, which outlives this call: it is closed
+        # on rotation or by close(), which leaving the `with` block always reaches.
+        file = open(path, 'wb', buffering=self._buffer_size)  # noqa: SIM115
+        try:
+            file.write(struct.pack(
+                '<IHHiIII', 0xA1B23C4D, 2, 4, 0, 0, 262144, self._linktype
+            ))
+        except BaseException:
+            file.close()
+            raise
+
+        self._written = 24
+
+        while self._max_files and len(self._paths) > self._max_files:
+            try:
+                os.remove(self._paths.pop(0))
+            except OSError as err:
+                logger.error('could not delete the old capture file: %s.', err)
+
+        return file
+
+    def _write_loop(self) -> None:
+        record_header = struct.Struct('<IIII')
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except Empty:
+                self._file.flush()
+                continue
+
+            if item is self._STOP:
+                break
+
+            data, timestamp = item
+            seconds, nanoseconds = divmod(round(float(timestamp) * 1e9), 10**9)
+
+            try:
+                if self._max_bytes and self._written + 16 + len(data) > self._max_bytes:
+                    self._file.close()
+                    self._file = self._open_next()
+
+                self._file.write(record_header.pack(seconds, nanoseconds, len(data), len(data)))
+                self._file.write(data)
+                self._written += 16 + len(data)
+            except OSError as err:
+                logger.error('could not write to the capture file: %s.', err)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
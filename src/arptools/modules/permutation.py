@@ -0,0 +1,126 @@
+"""Contains constant memory pseudo-random permutations of integer ranges."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections.abc import Iterator
+import random
+from typing import Optional
+
+
+_WITNESSES: tuple[int, ...] = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def _is_prime(n: int) -> bool:
+    # Miller-Rabin, deterministic for n < 3.3 * 10^24 with these witnesses.
+    if n < 2:
+        return False
+
+    for p in _WITNESSES:
+        if n % p == 0:
+            return n == p
+
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+
+    for a in _WITNESSES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+
+    return True
+
+
+def _prime_factors(n: int) -> list[int]:
+    factors, p = [], 2
+
+    while p * p <= n:
+        if n % p == 0:
+            factors.append(p)
+            while n % p == 0:
+                n //= p
+        p += 1 if p == 2 else 2
+
+    return factors + [n] if n > 1 else factors
+
+
+class CyclicPermutation:
+    """A pseudo-random permutation of range(size), walked in constant memory.
+
+    The permutation walks the multiplicative group of integers modulo the
+    smallest prime p > size: starting from a random element, every step
+    multiplies by a random generator of the group, which visits every element
+    in 1..p-1 exactly once. Elements past `size` are skipped (less than one
+    in two, since p < 2 * size).
+
+    The same size and seed always give the same permutation.
+
+    Typical usage:
+        for index in CyclicPermutation(network.num_addresses, seed=1):
+            send(network[index])
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        """Args:
+            size:
+                the number of elements of the range.
+            seed:
+                the seed of the permutation (default: random).
+        """
+
+        if size < 0:
+            raise ValueError('size must be positive')
+
+        self._size: int = size
+
+        self._prime: int = size + 1
+        while not _is_prime(self._prime):
+            self._prime += 1
+
+        rng = random.Random(seed)
+        order = self._prime - 1
+        factors = _prime_factors(order)
+
+        # generators are the elements whose order is not a proper divisor of p - 1.
+        self._generator: int = 1
+        while order > 1:
+            candidate = rng.randrange(2, self._prime)
+            if all(pow(candidate, order // q, self._prime) != 1 for q in factors):
+                self._generator = candidate
+                break
+
+        self._start: int = rng.randrange(1, self._prime)
+
+    def __iter__(self) -> Iterator[int]:
+        size, prime, generator = self._size, self._prime, self._generator
+        element = self._start
+
+        for _ in range(prime - 1):
+            if element <= size:
+                yield element - 1
+
+            element = element * generator % prime
+
+    def __len__(self) -> int:
+        return self._size
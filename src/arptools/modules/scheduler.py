@@ -0,0 +1,123 @@
+"""Contains a scheduler that paces events on a grid of absolute deadlines."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import time
+from typing import Optional
+
+from .histogram import HdrHistogram
+
+
+SPIN: float = 200e-6
+"""How long before a deadline waits stop blocking and start spinning, in seconds."""
+
+
+def sleep_until(deadline: float) -> None:
+    """Waits until a deadline of the time.monotonic() clock.
+
+    The wait blocks until shortly before the deadline (timers wake up late by
+    tens of microseconds) and spins for the rest.
+    """
+
+    if (remaining := deadline - time.monotonic() - SPIN) > 0:
+        time.sleep(remaining)
+
+    while time.monotonic() < deadline:
+        pass
+
+
+class DeadlineScheduler:
+    """Paces events every `interval` seconds on a grid of absolute monotonic deadlines.
+
+    Deadlines never depend on when the previous event actually happened, so
+    delays do not accumulate. Waits block until shortly before the deadline
+    and spin for the rest (see sleep_until()). Events later than a whole
+    interval skip the deadlines they missed, instead of bursting to catch up.
+
+    Typical usage:
+        scheduler = DeadlineScheduler(0.01)
+        for pkt in packets:
+            scheduler.wait()
+            send(pkt)
+            scheduler.advance()
+    """
+
+    LEAD: float = 2e-3
+    """How long before a deadline events should be prepared, at most, in seconds."""
+
+    def __init__(self, interval: float, start: Optional[float] = None):
+        """Args:
+            interval:
+                the time between two deadlines, in seconds.
+            start:
+                the first deadline, on the time.monotonic() clock (default: now).
+        """
+
+        if interval <= 0:
+            raise ValueError('interval must be strictly positive')
+
+        self.interval: float = interval
+        self.lead: float = min(self.LEAD, interval / 2)
+        """How long before a deadline the event should be prepared, in seconds."""
+        self._interval_ns: int = round(interval * 1e9)
+        self._deadline_ns: int = time.monotonic_ns() if start is None else round(start * 1e9)
+
+        self.lateness: HdrHistogram = HdrHistogram()
+        """The distribution of how late events were, in nanoseconds."""
+
+        self.missed: int = 0
+        """How many deadlines were skipped because an event was late by a whole interval."""
+
+    @property
+    def deadline(self) -> float:
+        """The next deadline, on the time.monotonic() clock."""
+
+        return self._deadline_ns / 1e9
+
+    def wait(self) -> None:
+        """Waits until the next deadline."""
+
+        sleep_until(self.deadline)
+
+    def advance(self) -> None:
+        """Records how late the event of the current deadline is (call it right
+        when the event happens), and moves to the next deadline."""
+
+        lateness = max(time.monotonic_ns() - self._deadline_ns, 0)
+        self.lateness.record(lateness)
+
+        skipped = lateness // self._interval_ns
+        self.missed += skipped
+        self._deadline_ns += (skipped + 1) * self._interval_ns
+
+    def describe(self) -> str:
+        """Returns a line with the jitter of the events and the missed deadlines
+        (e.g. `interval 10.000 ms, jitter p50/p99/max = 0.004/0.021/0.057 ms, 0 missed`)."""
+
+        if not self.lateness.count:
+            return f'interval {self.interval * 1e3:.3f} ms, {self.missed} missed'
+
+        jitter = '/'.join(
+            f'{value / 1e6:.3f}' for value in (
+                self.lateness.percentile(50), self.lateness.percentile(99), self.lateness.max,
+            )
+        )
+
+        return (
+            f'interval {self.interval * 1e3:.3f} ms, '
+            f'jitter p50/p99/max = {jitter} ms, {self.missed} missed'
+        )
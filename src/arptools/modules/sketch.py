@@ -0,0 +1,393 @@
+"""Contains fixed memory data structures that summarize large streams of keys."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from hashlib import blake2b
+import heapq
+import math
+from operator import sub
+
+
+def hash64(key: str, seed: int = 0) -> int:
+    """Returns a seeded 64-bit hash of a key, stable across processes."""
+
+    return int.from_bytes(
+        blake2b(key.encode(), digest_size=8, salt=seed.to_bytes(16, 'little')).digest(),
+        'little',
+    )
+
+
+class CountMinSketch:
+    """Approximate counter of the occurrences of every key in a stream.
+
+    Estimates never undercount, and overcount by at most `e / width` times
+    the total count with probability `1 - exp(-depth)`, regardless of how
+    many distinct keys are counted.
+
+    Typical usage:
+        sketch = CountMinSketch(width=1024, depth=4)
+        sketch.add('aa:bb:cc:dd:ee:ff')
+        sketch.estimate('aa:bb:cc:dd:ee:ff')
+    """
+
+    def __init__(self, width: int = 1024, depth: int = 4, seed: int = 0):
+        """Args:
+            width:
+                number of counters in a row.
+            depth:
+                number of rows (independent hash functions).
+            seed:
+                seed of the hash functions. Only sketches with the same
+                dimensions and seed can be subtracted.
+        """
+
+        if width < 1 or depth < 1:
+            raise ValueError('width and depth must be strictly positive')
+
+        self._width, self._depth, self._seed = width, depth, seed
+        self._rows: list[array] = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self._total: int = 0
+
+    @property
+    def total(self) -> int:
+        """The sum of every counted occurrence."""
+
+        return self._total
+
+    def indexes(self, key: str) -> tuple[int, ...]:
+        """Returns the counter of every row the key is mapped to.
+
+        The result can be reused with add_at() and estimate_at() to hash a key only once.
+        """
+
+        # derive `depth` hash functions from a single 64-bit hash (Kirsch-Mitzenmacher).
+        digest = hash64(key, self._seed)
+        h1, h2 = digest & 0xFFFFFFFF, (digest >> 32) | 1
+
+        return tuple((h1 + i * h2) % self._width for i in range(self._depth))
+
+    def add(self, key: str, count: int = 1) -> None:
+        """Counts `count` occurrences of a key."""
+
+        self.add_at(self.indexes(key), count)
+
+    def add_at(self, indexes: tuple[int, ...], count: int = 1) -> None:
+        """Counts `count` occurrences of the key mapped to the given counters."""
+
+        for row, index in zip(self._rows, indexes):
+            row[index] += count
+
+        self._total += count
+
+    def estimate(self, key: str) -> int:
+        """Returns an upper bound of the occurrences of a key."""
+
+        return self.estimate_at(self.indexes(key))
+
+    def estimate_at(self, indexes: tuple[int, ...]) -> int:
+        """Returns an upper bound of the occurrences of the key mapped to the given counters."""
+
+        return min(map(array.__getitem__, self._rows, indexes))
+
+    def subtract(self, other: 'CountMinSketch') -> None:
+        """Removes the counts of another sketch (that were added to this one)."""
+
+        self._check_compatible(other)
+
+        for i, (row, other_row) in enumerate(zip(self._rows, other._rows)):
+            self._rows[i] = array('Q', map(sub, row, other_row))
+
+        self._total -= other._total
+
+    def clear(self) -> None:
+        """Resets every counter."""
+
+        if not self._total:
+            return
+
+        for row in self._rows:
+            row[:] = array('Q', bytes(8 * self._width))
+
+        self._total = 0
+
+    def _check_compatible(self, other: 'CountMinSketch') -> None:
+        if (self._width, self._depth, self._seed) != (other._width, other._depth, other._seed):
+            raise ValueError('sketches have different dimensions or seeds')
+
+
+class SlidingCounter:
+    """Counts the occurrences of every key over sliding time windows, in fixed memory,
+    and keeps track of the `k` most frequent keys of every window.
+
+    Time is split in slots of `resolution` seconds, each holding a CountMinSketch.
+    Every window keeps the running sum of its slots, so counting a key and estimating
+    its count cost O(depth) per window, and moving to the next slot costs
+    O(width * depth) per window.
+
+    Typical usage:
+        counter = SlidingCounter(windows=(1, 10, 60))
+        counter.add('aa:bb:cc:dd:ee:ff', time.time())
+        counter.top(10, time.time())
+    """
+
+    def __init__(
+            self,
+            windows: Iterable[int] = (1, 10, 60),
+            resolution: float = 1.0,
+            width: int = 1024,
+            depth: int = 4,
+            k: int = 10,
+    ):
+        """Args:
+            windows:
+                the length of the sliding windows, in slots.
+            resolution:
+                the length of a slot, in seconds.
+            width:
+                number of counters in a row of every sketch.
+            depth:
+                number of rows of every sketch.
+            k:
+                how many of the most frequent keys are tracked for every window.
+        """
+
+        self._windows: tuple[int, ...] = tuple(sorted(set(windows)))
+        if not self._windows or self._windows[0] < 1:
+            raise ValueError('windows must be strictly positive')
+
+        self._resolution, self._k = resolution, k
+
+        self._slots: list[CountMinSketch] = [
+            CountMinSketch(width, depth) for _ in range(self._windows[-1])
+        ]
+        self._sums: dict[int, CountMinSketch] = {
+            window: CountMinSketch(width, depth) for window in self._windows
+        }
+        self._top: dict[int, dict[str, int]] = {window: {} for window in self._windows}
+        self._heaps: dict[int, list[tuple[int, str]]] = {window: [] for window in self._windows}
+
+        self._slot: int | None = None
+
+    @property
+    def windows(self) -> tuple[float, ...]:
+        """The length of the sliding windows, in seconds."""
+
+        return tuple(window * self._resolution for window in self._windows)
+
+    def add(self, key: str, now: float, count: int = 1) -> dict[int, int]:
+        """Counts `count` occurrences of a key.
+
+        Args:
+            key:
+                the key.
+            now:
+                when the key occurred, in seconds. Timestamps older than the
+                current slot are counted in the current slot.
+            count:
+                the number of occurrences.
+
+        Returns:
+            the estimated count of the key in every window.
+        """
+
+        self._advance(now)
+
+        indexes = self._slots[0].indexes(key)
+        self._slots[self._slot % len(self._slots)].add_at(indexes, count)
+
+        estimates: dict[int, int] = {}
+        for window, window_sum in self._sums.items():
+            window_sum.add_at(indexes, count)
+            estimates[window] = estimate = window_sum.estimate_at(indexes)
+
+            self._offer(window, key, estimate)
+
+        return estimates
+
+    def count(self, key: str, window: int, now: float) -> int:
+        """Returns the estimated count of a key over a window."""
+
+        self._advance(now)
+
+        return self._sums[window].estimate(key)
+
+    def top(self, window: int, now: float) -> list[tuple[str, int]]:
+        """Returns the most frequent keys of a window with their estimated count,
+        in descending order."""
+
+        self._advance(now)
+
+        return sorted(self._top[window].items(), key=lambda item: (-item[1], item[0]))
+
+    def _offer(self, window: int, key: str, estimate: int) -> None:
+        top, heap = self._top[window], self._heaps[window]
+
+        if key in top or len(top) < self._k:
+            top[key] = estimate
+            heapq.heappush(heap, (estimate, key))
+        else:
+            # drop the heap entries that are stale, to find the current minimum.
+            while heap[0][0] != top.get(heap[0][1]):
+                heapq.heappop(heap)
+
+            if estimate <= heap[0][0]:
+                return
+
+            del top[heapq.heappop(heap)[1]]
+            top[key] = estimate
+            heapq.heappush(heap, (estimate, key))
+
+        if len(heap) > 4 * self._k:
+            self._rebuild(window)
+
+    def _rebuild(self, window: int) -> None:
+        top = self._top[window]
+        for key in tuple(top):
+            if not (estimate := self._sums[window].estimate(key)):
+                del top[key]
+            else:
+                top[key] = estimate
+
+        self._heaps[window] = [(estimate, key) for key, estimate in top.items()]
+        heapq.heapify(self._heaps[window])
+
+    def _advance(self, now: float) -> None:
+        slot = int(now // self._resolution)
+
+        if self._slot is None:
+            self._slot = slot
+        if slot <= self._slot:
+            return
+
+        if slot - self._slot >= len(self._slots):
+            # every slot fell out of every window.
+            for sketch in (*self._slots, *self._sums.values()):
+                sketch.clear()
+        else:
+            for current in range(self._slot + 1, slot + 1):
+                for window, window_sum in self._sums.items():
+                    expired = self._slots[(current - window) % len(self._slots)]
+                    if expired.total:
+                        window_sum.subtract(expired)
+
+                self._slots[current % len(self._slots)].clear()
+
+        self._slot = slot
+        for window in self._windows:
+            self._rebuild(window)
+
+
+class HyperLogLog:
+    """Approximate counter of the distinct keys in a stream.
+
+    Uses 2^precision one byte registers regardless of how many keys are counted,
+    with a standard error of about `1.04 / sqrt(2^precision)`
+    (1.6% with the default precision). Sketches with the same precision can be
+    merged, e.g. to combine the estimates of several sensors or time windows,
+    and serialized with to_bytes().
+
+    Typical usage:
+        sketch = HyperLogLog(precision=12)
+        sketch.add('aa:bb:cc:dd:ee:ff')
+        sketch.estimate()
+    """
+
+    _VERSION: int = 1
+
+    def __init__(self, precision: int = 12):
+        """Args:
+            precision:
+                number of hash bits used to select a register (4 to 18).
+        """
+
+        if not 4 <= precision <= 18:
+            raise ValueError('precision must be between 4 and 18')
+
+        self._precision = precision
+        self._registers = bytearray(1 << precision)
+
+    @property
+    def precision(self) -> int:
+        """The number of hash bits used to select a register."""
+
+        return self._precision
+
+    def add(self, key: str) -> None:
+        """Counts a key."""
+
+        digest, bits = hash64(key), 64 - self._precision
+        index, rest = digest >> bits, digest & ((1 << bits) - 1)
+
+        # position of the leftmost 1 bit of the remaining hash bits.
+        rank = bits - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def estimate(self) -> int:
+        """Returns the estimated number of distinct keys."""
+
+        m = len(self._registers)
+        histogram = Counter(self._registers)
+
+        match m:
+            case 16:
+                alpha = 0.673
+            case 32:
+                alpha = 0.697
+            case 64:
+                alpha = 0.709
+            case _:
+                alpha = 0.7213 / (1 + 1.079 / m)
+
+        raw = alpha * m * m / sum(count * 2.0 ** -rank for rank, count in histogram.items())
+
+        # linear counting is more accurate when few keys have been counted.
+        if raw <= 2.5 * m and (zeros := histogram[0]):
+            return round(m * math.log(m / zeros))
+
+        return round(raw)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """Adds the keys counted by another sketch to this one."""
+
+        if other._precision != self._precision:
+            raise ValueError('sketches have different precisions')
+
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def to_bytes(self) -> bytes:
+        """Returns the serialized sketch."""
+
+        return bytes((self._VERSION, self._precision)) + self._registers
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        """Returns a sketch serialized with to_bytes()."""
+
+        if len(data) < 2 or data[0] != cls._VERSION:
+            raise ValueError('unsupported sketch format')
+
+        sketch = cls(data[1])
+        if len(data) - 2 != len(sketch._registers):
+            raise ValueError('truncated sketch')
+
+        sketch._registers[:] = data[2:]
+
+        return sketch
@@ -0,0 +1,111 @@
+"""Contains buffered writers for line oriented output streams."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+from threading import Lock
+from time import monotonic
+from typing import Any, TextIO
+
+
+class BatchedLineWriter:
+    """Writer that groups lines in batches and writes each batch with a single call.
+
+    A batch is written to the underlying stream once it holds `batch_size` lines,
+    or once `flush_interval` seconds have passed since the last write.
+    The writer is thread safe.
+
+    Typical usage:
+        with BatchedLineWriter(sys.stdout) as writer:
+            writer.write_record({'event': 'add'})
+    """
+
+    def __init__(
+            self,
+            stream: TextIO,
+            batch_size: int = 256,
+            flush_interval: float = 1.0,
+            close_stream: bool = False,
+    ):
+        """Args:
+            stream:
+                the output text stream.
+            batch_size:
+                maximum number of lines held in memory before a write.
+            flush_interval:
+                maximum time a line is held in memory, in seconds.
+            close_stream:
+                whether to close the stream when the writer is closed.
+        """
+
+        self._stream, self._close_stream = stream, close_stream
+        self._batch_size, self._flush_interval = batch_size, flush_interval
+
+        self._lines: list[str] = []
+        self._lock = Lock()
+        self._last_flush: float = monotonic()
+
+    def write_line(self, line: str) -> None:
+        """Appends a line to the current batch."""
+
+        with self._lock:
+            self._lines.append(line)
+
+            if len(self._lines) >= self._batch_size:
+                self._flush()
+
+    def write_record(self, record: dict[str, Any]) -> None:
+        """Appends a record to the current batch, serialized as a JSON line."""
+
+        self.write_line(json.dumps(record, separators=(',', ':')))
+
+    def flush(self, force: bool = True) -> None:
+        """Writes the current batch to the stream.
+
+        Args:
+            force:
+                if False, the batch is written only if the flush interval has elapsed.
+        """
+
+        with self._lock:
+            if force or monotonic() - self._last_flush >= self._flush_interval:
+                self._flush()
+
+    def close(self) -> None:
+        """Flushes the current batch and releases the stream."""
+
+        self.flush()
+
+        if self._close_stream:
+            self._stream.close()
+
+    def _flush(self) -> None:
+        self._last_flush = monotonic()
+
+        if not self._lines:
+            return
+
+        self._lines.append('')
+        self._stream.write('\n'.join(self._lines))
+        self._stream.flush()
+        self._lines.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -16,10 +16,11 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from collections import UserDict
-from collections.abc import Mapping
+from collections import OrderedDict, UserDict
+from collections.abc import Callable, Iterator, KeysView, Mapping
 from datetime import datetime, timedelta
-from typing import Any
+import time
+from typing import Any, Optional
 
 
 class ExpirableDict(UserDict):
@@ -77,6 +78,124 @@ class ExpirableDict(UserDict):
         self._ttl[key] = datetime.now()
 
 
+class ExpirableBiIndex:
+    """Many-to-many relation whose pairs expire after a set amount of time.
+
+    Every (left, right) pair has its own time to live, which is restarted each time
+    the pair is added again. Lookups are O(1) from either side of the relation.
+
+    Expired pairs are only removed by prune(), so that the relation can be driven
+    by a clock other than the wall clock (e.g. the timestamps of a capture file).
+    """
+
+    def __init__(self, delta: float, on_expire: Optional[Callable[[Any, Any], None]] = None):
+        """Args:
+            delta:
+                the time to live of a pair in seconds.
+            on_expire:
+                function called with the left and right value of every expired pair.
+        """
+
+        self._delta, self._on_expire = delta, on_expire
+
+        # pairs are kept sorted by last refresh, oldest first.
+        self._pairs: OrderedDict[tuple[Any, Any], float] = OrderedDict()
+        self._left: dict[Any, dict[Any, None]] = {}
+        self._right: dict[Any, dict[Any, None]] = {}
+
+    @property
+    def delta(self) -> float:
+        """Time after a stale pair is deleted."""
+
+        return self._delta
+
+    def add(self, left, right, now: Optional[float] = None) -> bool:
+        """Adds a pair to the relation, or restarts its time to live.
+
+        Args:
+            left:
+                the left value of the pair.
+            right:
+                the right value of the pair.
+            now:
+                the current time as a UNIX timestamp (default: the wall clock).
+
+        Returns:
+            whether the pair is new.
+        """
+
+        now = time.time() if now is None else now
+        self.prune(now)
+
+        if (pair := (left, right)) in self._pairs:
+            self._pairs[pair] = now
+            self._pairs.move_to_end(pair)
+
+            return False
+
+        self._pairs[pair] = now
+        self._left.setdefault(left, {})[right] = None
+        self._right.setdefault(right, {})[left] = None
+
+        return True
+
+    def rights(self, left) -> KeysView:
+        """Returns the right values paired with a left value."""
+
+        return self._left.get(left, {}).keys()
+
+    def lefts(self, right) -> KeysView:
+        """Returns the left values paired with a right value."""
+
+        return self._right.get(right, {}).keys()
+
+    def get_expiration_date(self, left, right) -> float:
+        """Returns the expiration date of a pair, as a UNIX timestamp."""
+
+        return self._pairs[(left, right)] + self._delta
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Removes expired pairs from the relation.
+
+        Args:
+            now:
+                the current time as a UNIX timestamp (default: the wall clock).
+        """
+
+        now = time.time() if now is None else now
+
+        while self._pairs:
+            pair, last_refresh = next(iter(self._pairs.items()))
+            if now - last_refresh <= self._delta:
+                break
+
+            del self._pairs[pair]
+            self._discard(*pair)
+
+            if self._on_expire:
+                self._on_expire(*pair)
+
+    def items(self) -> KeysView:
+        """Returns every (left, right) pair of the relation."""
+
+        return self._pairs.keys()
+
+    def _discard(self, left, right) -> None:
+        for index, key, value in ((self._left, left, right), (self._right, right, left)):
+            del (values := index[key])[value]
+            if not values:
+                del index[key]
+
+    def __contains__(self, pair) -> bool:
+        return pair in self._pairs
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        return iter(self._pairs)
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+
 # Guangyang Li (2017, November 9). Setup dictionary lazily. StackOverflow.
 # https://stackoverflow.com/a/47212782.
 class LazyDict(Mapping):
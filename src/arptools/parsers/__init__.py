@@ -24,16 +24,20 @@ See https://sphinx-argparse.readthedocs.io/en/stable for more information.
 
 
 from .arpa import Arpa
+from .arpload import Arpload
 from .arprobe import Arprobe
 from .arpscan import Arpscan
 from .arpr import Arpr
+from .arpreplay import Arpreplay
 from .garp import Garp
 
 
 __all__ = [
     'Arpa',
+    'Arpload',
     'Arprobe',
     'Arpr',
+    'Arpreplay',
     'Arpscan',
     'Garp',
 ]
@@ -17,13 +17,14 @@
 
 
 from argparse import (
-    ArgumentParser, Namespace,
+    ArgumentParser, ArgumentTypeError, Namespace,
 )
 from collections.abc import Sequence
 import logging
 from typing import Optional, override
 
 from . import types
+from .parents import OutputFormatArgumentParser, PcapWriterArgumentParser
 from ..modules.parsing.parsers import MainArgumentParserTemplate
 from ..network import get_mac
 
@@ -49,6 +50,7 @@ class Arpa(MainArgumentParserTemplate):
             prog='arpa',
             description='Send ARP announcements.',
             prefix_chars='-',
+            parents=[OutputFormatArgumentParser(), PcapWriterArgumentParser()],
         )
 
     def _extend_arguments(self) -> None:
@@ -60,7 +62,9 @@ class Arpa(MainArgumentParserTemplate):
         self.add_argument(
             'mac',
             action='store',
+            default=None,
             help='MAC address to announce',
+            nargs='?',
             metavar='mac',
             type=types.mac_address_type,
         )
@@ -68,7 +72,9 @@ class Arpa(MainArgumentParserTemplate):
         self.add_argument(
             'ip',
             action='store',
+            default=None,
             help='IP address to announce',
+            nargs='?',
             metavar='ip',
             type=types.ipv4_address_type,
         )
@@ -97,6 +103,28 @@ class Arpa(MainArgumentParserTemplate):
             type=types.mac_address_type,
         )
 
+        self.add_argument(
+            '-M', '--mappings',
+            action='store',
+            default=None,
+            dest='mappings_file',
+            help='read more mappings to announce from file, one "mac ip" pair per line '
+                 '("-" for standard input)',
+            metavar='file',
+            required=False,
+        )
+
+        self.add_argument(
+            '--rate',
+            action='store',
+            default=None,
+            dest='rate',
+            help='send at most pps packets per second (default: as fast as possible)',
+            metavar='pps',
+            required=False,
+            type=types.strictly_positive_float_type,
+        )
+
         rate_group = self.add_mutually_exclusive_group(required=False)
 
         rate_group.add_argument(
@@ -133,8 +161,35 @@ class Arpa(MainArgumentParserTemplate):
 
         namespace = super().parse_args(args=args, namespace=namespace)
 
-        namespace.mapping = (namespace.mac, namespace.ip)
+        mappings = []
+
+        if namespace.mac is not None:
+            if namespace.ip is None:
+                self.error('the following arguments are required: ip')
+
+            mappings.append((namespace.mac, namespace.ip))
+
+        if namespace.mappings_file is not None:
+            mappings.extend(self._read_mappings(namespace.mappings_file))
+
+        if not mappings:
+            self.error('at least one mapping is required (as arguments or with -M)')
+
+        # announce every mapping once per round, even if it is listed more than once.
+        mappings = list(dict.fromkeys(mappings))
+        namespace.mapping = mappings[0] if len(mappings) == 1 else mappings
         delattr(namespace, 'mac')
         delattr(namespace, 'ip')
 
         return namespace
+
+    def _read_mappings(self, path: str) -> list[tuple[str, str]]:
+        """Returns the MAC/IP mappings listed in a file, one per line
+        (blank lines and # comments are skipped)."""
+
+        try:
+            return types.read_entries(path, types.mapping_type)
+        except OSError as e:
+            self.error(f'argument -M/--mappings: {e}')
+        except ArgumentTypeError as e:
+            self.error(f'argument -M/--mappings: invalid mapping {e}')
@@ -0,0 +1,161 @@
+"""ARP load generator parser module."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from argparse import ArgumentParser
+import logging
+from typing import override
+
+from . import types
+from ..arp.load import LOAD_KINDS
+from ..modules.parsing.parsers import MainArgumentParserTemplate
+
+
+logger = logging.getLogger(__name__)
+
+
+def _construct() -> ArgumentParser:
+    """Returns an instance of the module's argument parser.
+
+    Invoked by the `argparse` directive in the docs.
+    For more information, see https://sphinx-argparse.readthedocs.io/en/stable.
+    """
+
+    return Arpload()
+
+
+class Arpload(MainArgumentParserTemplate):
+    """Handles the arguments that get passed to the `arpload` command."""
+
+    @override
+    def __init__(self):
+        super().__init__(
+            prog='arpload',
+            description='Generate ARP traffic at a target rate.',
+            prefix_chars='-',
+        )
+
+    def _extend_arguments(self) -> None:
+        default_hardware_destination = types.mac_address_type('broadcast')
+        default_pps: float = 1000.0
+
+        self.add_argument(
+            'kind',
+            action='store',
+            choices=LOAD_KINDS,
+            help='the kind of ARP packets to send',
+            metavar='{' + ','.join(LOAD_KINDS) + '}',
+        )
+
+        self.add_argument(
+            'destination_range',
+            action='store',
+            help='target ip address or subnet (the announced addresses for announcements)',
+            metavar='ip | cidr',
+            type=types.ipv4_range_type,
+        )
+
+        self.add_argument(
+            '-s',
+            action='store',
+            default=None,
+            dest='source_range',
+            help='ARP protocol source address or subnet (default: the local ip address)',
+            metavar='ip | cidr',
+            required=False,
+            type=types.ipv4_range_type,
+        )
+
+        self.add_argument(
+            '-S',
+            action='store',
+            default=0,
+            dest='source_macs',
+            help='use count random ARP and ETHERNET source addresses '
+                 '(default: the local MAC address)',
+            metavar='count',
+            required=False,
+            type=types.positive_int_type,
+        )
+
+        self.add_argument(
+            '-D',
+            action='store',
+            default=default_hardware_destination,
+            dest='ethernet_dst',
+            help='ETHERNET destination address '
+                 f'(default: {default_hardware_destination})',
+            metavar='mac',
+            required=False,
+            type=types.mac_address_type,
+        )
+
+        self.add_argument(
+            '-r', '--pps',
+            action='store',
+            default=default_pps,
+            dest='pps',
+            help=f'how many packets to send per second (default: {default_pps:.0f})',
+            metavar='pps',
+            required=False,
+            type=types.strictly_positive_float_type,
+        )
+
+        self.add_argument(
+            '-c',
+            action='store',
+            default=0,
+            dest='packet_count',
+            help='how many packets to send (default: infinite)',
+            metavar='count',
+            required=False,
+            type=types.positive_int_type,
+        )
+
+        self.add_argument(
+            '-t', '--duration',
+            action='store',
+            default=None,
+            dest='duration',
+            help='stop after sec seconds (default: never)',
+            metavar='sec',
+            required=False,
+            type=types.strictly_positive_float_type,
+        )
+
+        self.add_argument(
+            '--random',
+            action='store_true',
+            default=False,
+            dest='randomize',
+            help='draw the addresses at random from the pools (default: in turn)',
+            required=False,
+        )
+
+        self.add_argument(
+            '--seed',
+            action='store',
+            default=None,
+            dest='seed',
+            help='seed of the random addresses, to repeat a load (default: random)',
+            metavar='n',
+            required=False,
+            type=int,
+        )
+
+    def _extend_subparsers(self) -> None:
+        pass
@@ -24,6 +24,9 @@ import logging
 from typing import Optional, override
 
 from . import types
+from .parents import (
+    OutputFormatArgumentParser, PcapWriterArgumentParser, StatisticsArgumentParser,
+)
 from ..modules.parsing.parsers import MainArgumentParserTemplate
 from ..network import get_local_ip, get_mac
 
@@ -50,6 +53,11 @@ class Arpr(MainArgumentParserTemplate):
             prog='arpr',
             description='Lightweight utility to send ARP requests.',
             prefix_chars='-',
+            parents=[
+                OutputFormatArgumentParser(),
+                PcapWriterArgumentParser(),
+                StatisticsArgumentParser(),
+            ],
         )
 
     def _extend_arguments(self) -> None:
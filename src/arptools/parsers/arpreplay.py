@@ -0,0 +1,91 @@
+"""ARP capture replay parser module."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from argparse import ArgumentParser
+import logging
+from typing import override
+
+from . import types
+from ..modules.parsing.parsers import MainArgumentParserTemplate
+
+
+logger = logging.getLogger(__name__)
+
+
+def _construct() -> ArgumentParser:
+    """Returns an instance of the module's argument parser.
+
+    Invoked by the `argparse` directive in the docs.
+    For more information, see https://sphinx-argparse.readthedocs.io/en/stable.
+    """
+
+    return Arpreplay()
+
+
+class Arpreplay(MainArgumentParserTemplate):
+    """Handles the arguments that get passed to the `arpreplay` command."""
+
+    @override
+    def __init__(self):
+        super().__init__(
+            prog='arpreplay',
+            description='Replay the ARP traffic of a capture file on the network.',
+            prefix_chars='-',
+        )
+
+    def _extend_arguments(self) -> None:
+        default_speed: float = 1.0
+
+        self.add_argument(
+            'capture',
+            action='store',
+            help='the pcap or pcapng file to replay',
+            metavar='file',
+        )
+
+        speed_group = self.add_mutually_exclusive_group(required=False)
+
+        speed_group.add_argument(
+            '-x', '--speed',
+            action='store',
+            default=default_speed,
+            dest='speed',
+            help=f'replay n times faster than captured (default: {default_speed:g})',
+            metavar='n',
+            type=types.strictly_positive_float_type,
+        )
+
+        speed_group.add_argument(
+            '-m', '--max-speed',
+            action='store_const',
+            const=None,
+            dest='speed',
+            help='replay as fast as possible',
+        )
+
+        self.add_argument(
+            '-a', '--all-frames',
+            action='store_false',
+            default=True,
+            dest='arp_only',
+            help='also replay the frames that are not ARP packets',
+            required=False,
+        )
+
+    def _extend_subparsers(self) -> None:
+        pass
@@ -17,13 +17,16 @@
 
 
 from argparse import (
-    ArgumentParser, Namespace,
+    ArgumentParser, ArgumentTypeError, Namespace,
 )
 from collections.abc import Sequence
 import logging
 from typing import Optional, override
 
 from . import types
+from .parents import (
+    OutputFormatArgumentParser, PcapWriterArgumentParser, StatisticsArgumentParser,
+)
 from ..modules.parsing.parsers import MainArgumentParserTemplate
 
 
@@ -49,6 +52,11 @@ class Arprobe(MainArgumentParserTemplate):
             prog='arprobe',
             description='Send ARP probes.',
             prefix_chars='-',
+            parents=[
+                OutputFormatArgumentParser(),
+                PcapWriterArgumentParser(),
+                StatisticsArgumentParser(),
+            ],
         )
 
     def _extend_arguments(self) -> None:
@@ -58,11 +66,23 @@ class Arprobe(MainArgumentParserTemplate):
         self.add_argument(
             'destination',
             action='store',
-            help='ip address to probe',
+            help='ip addresses to probe (all of them at once)',
             metavar='ip',
+            nargs='*',
             type=types.ipv4_address_type,
         )
 
+        self.add_argument(
+            '-T', '--targets',
+            action='store',
+            default=None,
+            dest='targets_file',
+            help='read more ip addresses to probe from file, one per line '
+                 '("-" for standard input)',
+            metavar='file',
+            required=False,
+        )
+
         rate_group = self.add_mutually_exclusive_group(required=False)
 
         rate_group.add_argument(
@@ -119,4 +139,23 @@ class Arprobe(MainArgumentParserTemplate):
         namespace = super().parse_args(args=args, namespace=namespace)
         # arguments = vars(namespace)
 
+        if namespace.targets_file is not None:
+            namespace.destination.extend(self._read_targets(namespace.targets_file))
+
+        if not namespace.destination:
+            self.error('at least one ip address is required (as an argument or with -T)')
+
+        # probe every target once, even if it is listed more than once.
+        namespace.destination = list(dict.fromkeys(namespace.destination))
+
         return namespace
+
+    def _read_targets(self, path: str) -> list[str]:
+        """Returns the ip addresses listed in a file (blank lines and # comments are skipped)."""
+
+        try:
+            return types.read_entries(path, types.ipv4_address_type)
+        except OSError as e:
+            self.error(f'argument -T/--targets: {e}')
+        except ArgumentTypeError as e:
+            self.error(f'argument -T/--targets: invalid ip address {e}')
@@ -21,15 +21,23 @@ from argparse import (
 )
 from collections.abc import Sequence
 import logging
+import os
 from typing import Optional, override
 
 from . import types
+from .parents import (
+    OutputFormatArgumentParser, PcapWriterArgumentParser, StatisticsArgumentParser,
+)
 from ..modules.parsing.parsers import MainArgumentParserTemplate
 
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_TIME_TO_LIVE: int = 60 * 5
+"""How long an association is kept in passive mode without being seen, in seconds."""
+
+
 def _construct() -> ArgumentParser:
     """Returns an instance of the module's argument parser.
 
@@ -49,17 +57,22 @@ class Arpscan(MainArgumentParserTemplate):
             prog='arpscan',
             description='Scan the network using ARP requests.',
             prefix_chars='-',
+            parents=[
+                OutputFormatArgumentParser(),
+                PcapWriterArgumentParser(),
+                StatisticsArgumentParser(),
+            ],
         )
 
     def _extend_arguments(self) -> None:
-        default_time_to_live: int = 60 * 5
         default_timeout: float = 2.0
 
         self.add_argument(
             'destination_range',
             action='store',
-            help='ip address or subnet to scan',
+            help='ip address or subnet to scan (ip address to look up in history mode)',
             metavar='ip | cidr',
+            nargs='?',
             type=types.ipv4_cidr_type,
         )
 
@@ -76,15 +89,145 @@ class Arpscan(MainArgumentParserTemplate):
 
         mode_group.add_argument(
             '-P', '--passive',
-            action='store',
-            default=default_time_to_live,
+            action='store_true',
+            default=False,
             dest='passive',
-            help='extrapolate ARP associations from ARP requests' +
-                f'(default ttl: {default_time_to_live} sec)',
+            help='extrapolate ARP associations from ARP requests',
+            required=False,
+        )
+
+        mode_group.add_argument(
+            '--history',
+            action='store',
+            default=None,
+            dest='history',
+            help='look up MAC/IP associations in a database recorded in passive mode',
+            metavar='file',
+            required=False,
+        )
+
+        self.add_argument(
+            '--ttl',
+            action='store',
+            default=None,
+            dest='ttl',
+            help='passive mode only: how long an association is kept without being seen '
+                f'(default: {DEFAULT_TIME_TO_LIVE} sec)',
+            metavar='sec',
             required=False,
             type=types.strictly_positive_int_type,
         )
 
+        self.add_argument(
+            '-a', '--all-ops',
+            action='store_true',
+            default=False,
+            dest='all_ops',
+            help='passive mode only: also learn associations from ARP replies, '
+                 'gratuitous ARP and announcements',
+            required=False,
+        )
+
+        self.add_argument(
+            '--storm',
+            action='store',
+            default=None,
+            dest='storm_threshold',
+            help='passive mode only: report hosts sending more than pps ARP requests '
+                 'per second (averaged over 10 sec)',
+            metavar='pps',
+            required=False,
+            type=types.positive_float_type,
+        )
+
+        self.add_argument(
+            '-r', '--read',
+            action='store',
+            default=None,
+            dest='capture',
+            help='passive mode only: read packets from a pcap or pcapng file '
+                 'instead of sniffing them',
+            metavar='file',
+            required=False,
+        )
+
+        self.add_argument(
+            '-b', '--batch',
+            action='store_true',
+            default=False,
+            dest='batch',
+            help='with -r only: decode the whole capture at once with NumPy and print '
+                 'the distinct MAC/IP pairs (classic pcap files only)',
+            required=False,
+        )
+
+        self.add_argument(
+            '-o', '--output',
+            action='store',
+            default=None,
+            dest='output',
+            help='passive mode only: stream events as JSON Lines to file '
+                 'instead of showing the TUI (use - for stdout)',
+            metavar='file',
+            required=False,
+        )
+
+        self.add_argument(
+            '-d', '--database',
+            action='store',
+            default=None,
+            dest='database',
+            help='passive mode only: record every MAC/IP association in a SQLite database',
+            metavar='file',
+            required=False,
+        )
+
+        history_group = self.add_argument_group('history mode')
+
+        history_group.add_argument(
+            '--mac',
+            action='store',
+            default=None,
+            dest='mac',
+            help='MAC address to look up, instead of an ip address',
+            metavar='mac',
+            required=False,
+            type=types.mac_address_type,
+        )
+
+        history_group.add_argument(
+            '--at',
+            action='store',
+            default=None,
+            dest='at',
+            help='point in time to look up (ISO 8601 date or UNIX timestamp)',
+            metavar='time',
+            required=False,
+            type=types.timestamp_type,
+        )
+
+        history_group.add_argument(
+            '--since',
+            action='store',
+            default=None,
+            dest='since',
+            help='start of the time interval to look up (default: the beginning)',
+            metavar='time',
+            required=False,
+            type=types.timestamp_type,
+        )
+
+        history_group.add_argument(
+            '--until',
+            action='store',
+            default=None,
+            dest='until',
+            help='end of the time interval to look up (default: the end)',
+            metavar='time',
+            required=False,
+            type=types.timestamp_type,
+        )
+
         self.add_argument(
             '-w',
             action='store',
@@ -97,6 +240,37 @@ class Arpscan(MainArgumentParserTemplate):
             type=types.positive_float_type,
         )
 
+        self.add_argument(
+            '--retries',
+            action='store',
+            default=0,
+            dest='retries',
+            help='how many more requests to send to the IPs that do not answer (default: 0)',
+            metavar='n',
+            required=False,
+            type=types.positive_int_type,
+        )
+
+        self.add_argument(
+            '--random',
+            action='store_true',
+            default=False,
+            dest='randomize',
+            help='scan the range in a pseudo-random order (default: ascending)',
+            required=False,
+        )
+
+        self.add_argument(
+            '--seed',
+            action='store',
+            default=None,
+            dest='seed',
+            help='seed of the random order, to repeat a scan (default: random)',
+            metavar='n',
+            required=False,
+            type=int,
+        )
+
     def _extend_subparsers(self) -> None:
         pass
 
@@ -108,6 +282,77 @@ class Arpscan(MainArgumentParserTemplate):
     ) -> Namespace:
 
         namespace = super().parse_args(args=args, namespace=namespace)
-        # arguments = vars(namespace)
+
+        if namespace.ttl is not None and not namespace.passive:
+            self.error('argument --ttl: only allowed in passive mode (-P)')
+
+        if namespace.all_ops and not namespace.passive:
+            self.error('argument -a/--all-ops: only allowed in passive mode (-P)')
+
+        if namespace.storm_threshold is not None and not namespace.passive:
+            self.error('argument --storm: only allowed in passive mode (-P)')
+
+        if namespace.capture is not None:
+            if not namespace.passive:
+                self.error('argument -r/--read: only allowed in passive mode (-P)')
+
+            if not os.path.isfile(namespace.capture):
+                self.error(f'argument -r/--read: no such file {namespace.capture!r}')
+
+        if namespace.batch and namespace.capture is None:
+            self.error('argument -b/--batch: only allowed with -r/--read')
+
+        if namespace.output is not None and not namespace.passive:
+            self.error('argument -o/--output: only allowed in passive mode (-P)')
+
+        if namespace.database is not None and not namespace.passive:
+            self.error('argument -d/--database: only allowed in passive mode (-P)')
+
+        if namespace.output_format != 'text' and (namespace.passive or namespace.history):
+            self.error('argument --format: not allowed in passive or history mode')
+
+        if namespace.rtt_histogram and (namespace.passive or namespace.history):
+            self.error('argument --histogram: not allowed in passive or history mode')
+
+        if namespace.live_statistics and (namespace.passive or namespace.history):
+            self.error('argument --stats: not allowed in passive or history mode')
+
+        if namespace.retries and (namespace.passive or namespace.history):
+            self.error('argument --retries: not allowed in passive or history mode')
+
+        if namespace.randomize and (namespace.passive or namespace.history):
+            self.error('argument --random: not allowed in passive or history mode')
+
+        if namespace.seed is not None and not namespace.randomize:
+            self.error('argument --seed: only allowed with --random')
+
+        if namespace.write_pcap is not None and (namespace.capture or namespace.history):
+            self.error('argument --write-pcap: not allowed with -r/--read or --history')
+
+        if namespace.ttl is None:
+            namespace.ttl = DEFAULT_TIME_TO_LIVE
+
+        if namespace.history is None:
+            if namespace.destination_range is None:
+                self.error('the following arguments are required: ip | cidr')
+
+            for option in ('mac', 'at', 'since', 'until'):
+                if getattr(namespace, option) is not None:
+                    self.error(f'argument --{option}: only allowed in history mode (--history)')
+        else:
+            if not os.path.isfile(namespace.history):
+                self.error(f'argument --history: no such file {namespace.history!r}')
+
+            if (namespace.destination_range is None) == (namespace.mac is None):
+                self.error('history mode requires either an ip address or a MAC address (--mac)')
+
+            if namespace.destination_range and '/' in namespace.destination_range:
+                self.error('history mode does not support subnets')
+
+            if namespace.at is not None:
+                if namespace.since is not None or namespace.until is not None:
+                    self.error('argument --at: not allowed with --since/--until')
+
+                namespace.since = namespace.until = namespace.at
 
         return namespace
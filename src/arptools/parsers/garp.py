@@ -17,13 +17,15 @@
 
 
 from argparse import (
-    ArgumentParser, Namespace,
+    ArgumentParser, ArgumentTypeError, Namespace,
 )
 from collections.abc import Sequence
 import logging
 from typing import Optional, override
 
 from . import types
+from .parents import OutputFormatArgumentParser, PcapWriterArgumentParser
+from ..arp.garp import Keepalive
 from ..modules.parsing.parsers import MainArgumentParserTemplate
 from ..network import get_mac
 
@@ -50,6 +52,7 @@ class Garp(MainArgumentParserTemplate):
             prog='garp',
             description='Send gratuitous ARP replies.',
             prefix_chars='-',
+            parents=[OutputFormatArgumentParser(), PcapWriterArgumentParser()],
         )
 
     def _extend_arguments(self) -> None:
@@ -61,7 +64,9 @@ class Garp(MainArgumentParserTemplate):
         self.add_argument(
             'mac',
             action='store',
+            default=None,
             help='MAC address to announce',
+            nargs='?',
             metavar='mac',
             type=types.mac_address_type,
         )
@@ -69,7 +74,9 @@ class Garp(MainArgumentParserTemplate):
         self.add_argument(
             'ip',
             action='store',
+            default=None,
             help='IP address to announce',
+            nargs='?',
             metavar='ip',
             type=types.ipv4_address_type,
         )
@@ -98,6 +105,49 @@ class Garp(MainArgumentParserTemplate):
             type=types.mac_address_type,
         )
 
+        self.add_argument(
+            '-M', '--mappings',
+            action='store',
+            default=None,
+            dest='mappings_file',
+            help='read more mappings to announce from file, one "mac ip" pair per line '
+                 '("-" for standard input)',
+            metavar='file',
+            required=False,
+        )
+
+        self.add_argument(
+            '--rate',
+            action='store',
+            default=None,
+            dest='rate',
+            help='send at most pps packets per second (default: as fast as possible)',
+            metavar='pps',
+            required=False,
+            type=types.strictly_positive_float_type,
+        )
+
+        self.add_argument(
+            '--keepalive',
+            action='store_true',
+            default=False,
+            dest='keepalive',
+            help='advertise every mapping forever, each at its own interval: lines of -M '
+                 'files can set them ("mac ip [interval [jitter]]")',
+            required=False,
+        )
+
+        self.add_argument(
+            '--jitter',
+            action='store',
+            default=0.0,
+            dest='jitter',
+            help='delay every keepalive by a random time up to sec seconds (default: 0 sec)',
+            metavar='sec',
+            required=False,
+            type=types.positive_float_type,
+        )
+
         rate_group = self.add_mutually_exclusive_group(required=False)
 
         rate_group.add_argument(
@@ -134,8 +184,65 @@ class Garp(MainArgumentParserTemplate):
 
         namespace = super().parse_args(args=args, namespace=namespace)
 
-        namespace.mapping = (namespace.mac, namespace.ip)
+        if namespace.keepalive:
+            if namespace.packet_count:
+                self.error('argument -c: not allowed with --keepalive')
+
+            if namespace.rate is not None:
+                self.error('argument --rate: not allowed with --keepalive')
+        elif namespace.jitter:
+            self.error('argument --jitter: only allowed with --keepalive')
+
+        entries = []
+
+        if namespace.mac is not None:
+            if namespace.ip is None:
+                self.error('the following arguments are required: ip')
+
+            entries.append((namespace.mac, namespace.ip, None, None))
+
+        if namespace.mappings_file is not None:
+            entries.extend(self._read_mappings(namespace.mappings_file, namespace.keepalive))
+
+        if not entries:
+            self.error('at least one mapping is required (as arguments or with -M)')
+
+        # announce every mapping once per round, even if it is listed more than once.
+        mappings = list(dict.fromkeys((mac, ip) for mac, ip, _, _ in entries))
+        namespace.mapping = mappings[0] if len(mappings) == 1 else mappings
+
+        # the last interval and jitter listed for a mapping win.
+        namespace.keepalives = list({
+            (mac, ip): Keepalive(
+                mac,
+                ip,
+                namespace.interval if interval is None else interval,
+                namespace.jitter if jitter is None else jitter,
+            )
+            for mac, ip, interval, jitter in entries
+        }.values())
+
         delattr(namespace, 'mac')
         delattr(namespace, 'ip')
 
         return namespace
+
+    def _read_mappings(
+            self,
+            path: str,
+            keepalive: bool,
+    ) -> list[tuple[str, str, Optional[float], Optional[float]]]:
+        """Returns the MAC/IP mappings listed in a file, one per line, with their
+        interval and jitter in keepalive mode (blank lines and # comments are skipped)."""
+
+        def _mapping_type(argument: str) -> tuple[str, str, None, None]:
+            return *types.mapping_type(argument), None, None
+
+        try:
+            return types.read_entries(
+                path, types.keepalive_mapping_type if keepalive else _mapping_type
+            )
+        except OSError as e:
+            self.error(f'argument -M/--mappings: {e}')
+        except ArgumentTypeError as e:
+            self.error(f'argument -M/--mappings: invalid mapping {e}')
@@ -0,0 +1,135 @@
+"""Contains parent parsers for the options shared by several commands."""
+
+# Copyright (C) 2024  Stefano Cuizza
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from argparse import ArgumentParser
+from typing import override
+
+from . import types
+from ..arp.packets.formatters import OUTPUT_FORMATS
+
+
+class PcapWriterArgumentParser(ArgumentParser):
+    """Adds the ability to record the exchanged packets to a capture file.
+
+    New flags:
+        --write-pcap:
+            record every sent and received frame to a pcap file.
+        --pcap-size:
+            size after which a new capture file is started.
+        --pcap-files:
+            how many capture files are kept.
+    """
+
+    @override
+    def __init__(self, *args, **kwargs):
+        kwargs['add_help'] = False
+        super().__init__(*args, **kwargs)
+
+        default_pcap_size: int = 100
+
+        self.add_argument(
+            '--write-pcap',
+            action='store',
+            default=None,
+            dest='write_pcap',
+            help='record every sent and received frame to a pcap file',
+            metavar='file',
+            required=False,
+        )
+
+        self.add_argument(
+            '--pcap-size',
+            action='store',
+            default=default_pcap_size,
+            dest='pcap_size',
+            help='start a new capture file (file.1, file.2, ...) every mb megabytes, '
+                 f'0 to never rotate (default: {default_pcap_size} mb)',
+            metavar='mb',
+            required=False,
+            type=types.positive_int_type,
+        )
+
+        self.add_argument(
+            '--pcap-files',
+            action='store',
+            default=0,
+            dest='pcap_files',
+            help='keep only the last n capture files, deleting the older ones on rotation '
+                 '(default: keep them all)',
+            metavar='n',
+            required=False,
+            type=types.positive_int_type,
+        )
+
+
+class OutputFormatArgumentParser(ArgumentParser):
+    """Adds the ability to choose the format of the printed lines.
+
+    New flags:
+        --format:
+            print a line per packet as text, JSON Lines, CSV or TSV.
+    """
+
+    @override
+    def __init__(self, *args, **kwargs):
+        kwargs['add_help'] = False
+        super().__init__(*args, **kwargs)
+
+        self.add_argument(
+            '--format',
+            action='store',
+            choices=OUTPUT_FORMATS,
+            default='text',
+            dest='output_format',
+            help='format of the printed lines (default: text)',
+            required=False,
+        )
+
+
+class StatisticsArgumentParser(ArgumentParser):
+    """Adds the ability to choose the statistics printed at exit.
+
+    New flags:
+        --histogram:
+            print the distribution of the round-trip times at exit.
+        --stats:
+            show the statistics in a live status line.
+    """
+
+    @override
+    def __init__(self, *args, **kwargs):
+        kwargs['add_help'] = False
+        super().__init__(*args, **kwargs)
+
+        self.add_argument(
+            '--histogram',
+            action='store_true',
+            default=False,
+            dest='rtt_histogram',
+            help='print a histogram of the round-trip times at exit (text format only)',
+            required=False,
+        )
+
+        self.add_argument(
+            '--stats',
+            action='store_true',
+            default=False,
+            dest='live_statistics',
+            help='show a live statistics line on the terminal (text format only)',
+            required=False,
+        )
@@ -17,9 +17,13 @@
 
 
 from argparse import ArgumentTypeError
+from collections.abc import Callable, Iterable
+from datetime import datetime
 from ipaddress import ip_address, IPv6Address
 from random import randint
 import re
+import sys
+from typing import Any, Optional
 
 from ..modules.utils import LazyDict
 from ..network import (
@@ -79,6 +83,45 @@ def ipv4_cidr_type(argument: str) -> str:
     return ipv4_address_type(argument)
 
 
+def ipv4_range_type(argument: str) -> str:
+    """Parser type matching an IPv4 address, or an IPv4 network of any size
+    in CIDR notation.
+
+    Raises:
+        ValueError:
+            the argument is not a valid IPv4 address or network.
+    """
+
+    if '/' in argument:
+        ip, prefix = argument.split('/', 1)
+        ip = ipv4_address_type(ip)
+
+        if not 0 < (prefix := int(prefix)) <= 32:
+            raise ValueError('prefix not in range (0, 32]')
+
+        return '/'.join((ip, str(prefix)))
+
+    return ipv4_address_type(argument)
+
+
+def timestamp_type(argument: str) -> float:
+    """Parser type matching a point in time, either as an ISO 8601 date
+    or as a UNIX timestamp.
+
+    Raises:
+        ValueError:
+            the argument is not a valid date.
+    """
+
+    if argument == 'now':
+        return datetime.now().timestamp()
+
+    try:
+        return float(argument)
+    except ValueError:
+        pass
+
+    return datetime.fromisoformat(argument).timestamp()
 
 
 def mac_address_type(argument: str) -> str:
@@ -110,6 +153,40 @@ def mac_address_type(argument: str) -> str:
     return argument
 
 
+def mapping_type(argument: str) -> tuple[str, str]:
+    """Parser type matching a MAC/IP mapping: a MAC address and an IPv4 address,
+    separated by whitespace or by a comma.
+
+    Raises:
+        ValueError:
+            the argument is not a valid mapping.
+    """
+
+    if len(fields := argument.replace(',', ' ').split()) != 2:
+        raise ValueError
+
+    return mac_address_type(fields[0]), ipv4_address_type(fields[1])
+
+
+def keepalive_mapping_type(argument: str) -> tuple[str, str, Optional[float], Optional[float]]:
+    """Parser type matching a MAC/IP mapping (see mapping_type()), optionally
+    followed by its keepalive interval and jitter.
+
+    Raises:
+        ValueError:
+            the argument is not a valid mapping.
+    """
+
+    if len(fields := argument.replace(',', ' ').split()) > 4:
+        raise ValueError
+
+    return (
+        *mapping_type(' '.join(fields[:2])),
+        strictly_positive_float_type(fields[2]) if fields[2:] else None,
+        positive_float_type(fields[3]) if fields[3:] else None,
+    )
+
+
 def strictly_positive_int_type(argument: str) -> int:
     """Parser type matching a strictly positive integer.
 
@@ -129,6 +206,25 @@ def strictly_positive_int_type(argument: str) -> int:
     return argument
 
 
+def positive_int_type(argument: str) -> int:
+    """Parser type matching a positive integer.
+
+    Raises:
+        ValueError:
+            the argument is not an integer >=0.
+    """
+
+    try:
+        argument = int(argument)
+    except ValueError as err:
+        raise ValueError from err
+
+    if argument < 0:
+        raise ArgumentTypeError('must be an integer greater or equal to zero')
+
+    return argument
+
+
 def positive_float_type(argument: str) -> float:
     """Parser type matching a positive float.
 
@@ -146,3 +242,65 @@ def positive_float_type(argument: str) -> float:
         raise ArgumentTypeError('must be a float greater or equal to zero')
 
     return argument
+
+
+def strictly_positive_float_type(argument: str) -> float:
+    """Parser type matching a strictly positive float.
+
+    Raises:
+        ValueError:
+            the argument is not a float >0.
+    """
+
+    try:
+        argument = float(argument)
+    except ValueError as err:
+        raise ValueError from err
+
+    if argument <= 0:
+        raise ArgumentTypeError('must be a float greater then zero')
+
+    return argument
+
+
+def read_lines(path: str) -> list[tuple[int, str]]:
+    """Returns the lines of a file (or of the standard input, if path is '-')
+    with their number, skipping blank lines and # comments.
+
+    Raises:
+        OSError:
+            the file cannot be read.
+    """
+
+    def _strip(file: Iterable[str]) -> list[str]:
+        return [line.split('#', 1)[0].strip() for line in file]
+
+    if path == '-':
+        # the standard input is not closed: it may be read again later.
+        lines = _strip(sys.stdin)
+    else:
+        with open(path, encoding='utf-8') as file:
+            lines = _strip(file)
+
+    return [(number, line) for number, line in enumerate(lines, 1) if line]
+
+
+def read_entries(path: str, entry_type: Callable[[str], Any]) -> list:
+    """Returns the entries listed in a file, one per line, parsed by a parser type
+    (see read_lines()).
+
+    Raises:
+        OSError:
+            the file cannot be read.
+        ArgumentTypeError:
+            a line is not a valid entry (the message quotes the line and its number).
+    """
+
+    entries = []
+    for number, line in read_lines(path):
+        try:
+            entries.append(entry_type(line))
+        except (ArgumentTypeError, ValueError) as err:
+            raise ArgumentTypeError(f'{line!r} (line {number})') from err
+
+    return entries
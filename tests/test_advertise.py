@@ -0,0 +1,116 @@
+from argparse import ArgumentTypeError
+import io
+from itertools import islice
+import time
+
+import pytest
+from scapy.layers.l2 import ARP, Ether
+
+from arptools.arp.garp import Keepalive, _keepalive_exchanges
+from arptools.arp.packets.advertise import batched_rounds, mapping_frames
+from arptools.arp.packets.statistics import ExchangeStatistics
+from arptools.parsers.types import keepalive_mapping_type, mapping_type, read_entries
+
+
+def test_mapping_frames() -> None:
+    """Verifies that a frame is built for every mapping, advertising it."""
+
+    frames = mapping_frames(
+        'is-at',
+        [mapping_type('aa:aa:aa:aa:aa:01 10.0.0.1'), mapping_type('aa:aa:aa:aa:aa:02,10.0.0.2')],
+        ethernet_src='aa:aa:aa:aa:aa:00',
+        ethernet_dst='ff:ff:ff:ff:ff:ff',
+    )
+
+    assert [
+        (frame[ARP].op, frame[ARP].hwsrc, frame[ARP].psrc, frame[ARP].pdst) for frame in frames
+    ] == [
+        (2, 'aa:aa:aa:aa:aa:01', '10.0.0.1', '10.0.0.1'),
+        (2, 'aa:aa:aa:aa:aa:02', '10.0.0.2', '10.0.0.2'),
+    ]
+
+
+def test_mappings_file(tmp_path) -> None:
+    """Verifies that mappings files are read skipping blank lines and comments,
+    and that invalid lines are reported with their number."""
+
+    (path := tmp_path / 'mappings.txt').write_text(
+        '# keepalives\naa:aa:aa:aa:aa:01 10.0.0.1 30\n\naa:aa:aa:aa:aa:02,10.0.0.2  # default\n'
+    )
+
+    assert read_entries(str(path), keepalive_mapping_type) == [
+        ('aa:aa:aa:aa:aa:01', '10.0.0.1', 30.0, None),
+        ('aa:aa:aa:aa:aa:02', '10.0.0.2', None, None),
+    ]
+
+    with pytest.raises(ArgumentTypeError, match=r'\(line 2\)'):
+        read_entries(str(path), mapping_type)
+
+
+def test_mappings_from_standard_input(monkeypatch) -> None:
+    """Verifies that reading the entries of the standard input leaves it open."""
+
+    monkeypatch.setattr('sys.stdin', stdin := io.StringIO('aa:aa:aa:aa:aa:01 10.0.0.1\n'))
+
+    assert read_entries('-', mapping_type) == [('aa:aa:aa:aa:aa:01', '10.0.0.1')]
+    assert not stdin.closed
+
+
+def test_batched_rounds() -> None:
+    """Verifies that rounds are split in batches paced by the rate, with idle slots
+    filling the interval between rounds."""
+
+    frames = list(range(10))
+
+    rounds, inter = batched_rounds(frames, count=2)
+    assert (list(rounds), inter) == ([frames, frames], 0)
+
+    rounds, inter = batched_rounds(frames, count=0, interval=0.5)
+    assert (next(rounds), inter) == (frames, 0.5)
+
+    rounds, inter = batched_rounds(frames, count=1, rate=4000)
+    assert (list(rounds), inter) == ([frames[0:4], frames[4:8], frames[8:10]], 0.001)
+
+    rounds, inter = batched_rounds(frames, count=0, interval=0.005, rate=4000)
+    assert list(islice(rounds, 7)) == [
+        frames[0:4], frames[4:8], frames[8:10], [], [], frames[0:4], frames[4:8],
+    ]
+
+
+def test_keepalive_intervals() -> None:
+    """Verifies that every mapping is advertised at its own interval, draining the socket."""
+
+    class Socket:
+        def __init__(self):
+            self.sent, self.received = [], 3
+
+        def send(self, data: bytes) -> None:
+            self.sent.append(Ether(data)[ARP].psrc)
+
+        def select(self, sockets, remain=None):
+            if not self.received:
+                time.sleep(remain)
+
+            return sockets if self.received else []
+
+        def recv(self):
+            self.received -= 1
+
+    keepalives = [
+        Keepalive('aa:aa:aa:aa:aa:01', '10.0.0.1', interval=0.01),
+        Keepalive('aa:aa:aa:aa:aa:02', '10.0.0.2', interval=0.04, jitter=0.005),
+    ]
+    frames = mapping_frames(
+        'is-at', [(keepalive.mac, keepalive.ip) for keepalive in keepalives],
+        ethernet_src='aa:aa:aa:aa:aa:00',
+    )
+    socket, statistics = Socket(), ExchangeStatistics()
+
+    exchanges = list(islice(
+        _keepalive_exchanges(keepalives, frames, socket, None, statistics), 10
+    ))
+
+    assert statistics.sent == 10 and all(reply is None for _, reply, _ in exchanges)
+    assert socket.received == 0
+    assert (socket.sent.count('10.0.0.1'), socket.sent.count('10.0.0.2')) == (8, 2)
+    assert [attempt for query, _, attempt in exchanges if query[ARP].psrc == '10.0.0.2'] == [1, 2]
@@ -0,0 +1,99 @@
+import asyncio
+import socket
+
+from arptools.arp.aio import (
+    AsyncArpSocket, aiter_arp_probe, aiter_arp_request, aiter_arp_scan,
+)
+from arptools.arp.frame import ArpFrame
+
+
+class FakeArpSocket(AsyncArpSocket):
+    """Answers the ARP requests sent to the given hosts, over a socket pair."""
+
+    def __init__(self, hosts: dict[str, str]):
+        self.iface, self.hwaddr, self.ipaddr = 'fake0', 'aa:aa:aa:aa:aa:09', '10.0.0.9'
+        self._socket, self._peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._socket.fileno(), self._on_readable)
+        self._loop.add_reader(self._peer.fileno(), self._answer)
+
+        self._pending, self._users = {}, 0
+        self.hosts, self.sent = hosts, 0
+
+    def _answer(self) -> None:
+        request = ArpFrame.from_bytes(self._peer.recv(1514))
+        self.sent += 1
+
+        if (mac := self.hosts.get(request.pdst)) is not None:
+            self._peer.send(ArpFrame(2, mac, request.pdst, request.hwsrc, request.psrc).to_bytes())
+
+    def close(self) -> None:
+        self._loop.remove_reader(self._peer.fileno())
+        self._peer.close()
+        super().close()
+
+
+def test_aiter_arp_scan_concurrent() -> None:
+    """Verifies that concurrent scans over the same socket get their own replies."""
+
+    async def scan(arp_socket: AsyncArpSocket, target_range: str) -> list[tuple[str, str]]:
+        return sorted([
+            (result.target_ip, result.mac)
+            async for result in aiter_arp_scan(target_range, timeout=0.05, socket=arp_socket)
+            if result.answered
+        ])
+
+    async def main() -> tuple[int, list]:
+        async with FakeArpSocket({
+            '10.0.0.1': 'aa:aa:aa:aa:aa:01', '10.0.1.2': 'aa:aa:aa:aa:aa:02',
+        }) as arp_socket:
+            results = await asyncio.gather(
+                scan(arp_socket, '10.0.0.0/28'), scan(arp_socket, '10.0.1.0/28')
+            )
+            return arp_socket.sent, results
+
+    sent, results = asyncio.run(main())
+
+    assert sent == 32
+    assert results == [
+        [('10.0.0.1', 'aa:aa:aa:aa:aa:01')], [('10.0.1.2', 'aa:aa:aa:aa:aa:02')]
+    ]
+
+
+def test_aiter_arp_probe_quit_on_first_reply() -> None:
+    """Verifies that an endless probe stops on the first reply."""
+
+    async def main() -> list:
+        async with FakeArpSocket({'10.0.0.1': 'aa:aa:aa:aa:aa:01'}) as arp_socket:
+            return [result async for result in aiter_arp_probe(
+                '10.0.0.1', count=0, interval=0.01, quit_on_first_reply=True, socket=arp_socket
+            )]
+
+    results = asyncio.run(main())
+
+    assert len(results) == 1 and results[0].answered and results[0].rtt >= 0
+
+
+def test_aiter_arp_request_quit_on_first_reply_per_target() -> None:
+    """Verifies that every target is requested until it answers, and only until then."""
+
+    async def main() -> tuple[int, list]:
+        async with FakeArpSocket({
+            '10.0.0.1': 'aa:aa:aa:aa:aa:01', '10.0.0.2': 'aa:aa:aa:aa:aa:02',
+        }) as arp_socket:
+            results = [result async for result in aiter_arp_request(
+                '10.0.0.0/30', count=3, quit_on_first_reply=True, timeout=0.02,
+                socket=arp_socket,
+            )]
+            return arp_socket.sent, results
+
+    sent, results = asyncio.run(main())
+
+    assert sent == 8
+    assert sorted((result.target_ip, result.attempt, result.answered) for result in results) == [
+        ('10.0.0.0', 1, False), ('10.0.0.0', 2, False), ('10.0.0.0', 3, False),
+        ('10.0.0.1', 1, True), ('10.0.0.2', 1, True),
+        ('10.0.0.3', 1, False), ('10.0.0.3', 2, False), ('10.0.0.3', 3, False),
+    ]
@@ -0,0 +1,104 @@
+import logging
+
+import pytest
+from scapy.layers.inet import IP, UDP
+from scapy.layers.l2 import ARP, Dot1Q, Ether
+from scapy.utils import wrpcap
+
+from arptools import cli
+from arptools.arp.batch import (
+    _record_offsets, _walk_records, filter_range, ip_to_str, load_arp_columns, mac_to_str,
+    unique_pairs,
+)
+from arptools.parsers import Arpscan
+
+
+pytest.importorskip('numpy')
+
+
+def _write_capture(path, packets) -> None:
+    for i, packet in enumerate(packets):
+        packet.time = 1000.0 + i
+
+    wrpcap(str(path), packets)
+
+
+def test_fixed_size_capture(tmp_path) -> None:
+    """Verifies that the columns of a capture of same sized ARP frames are decoded."""
+
+    _write_capture(path := tmp_path / 'arp.pcap', [
+        Ether() / ARP(op=1, hwsrc='aa:aa:aa:aa:aa:01', psrc='10.0.0.1', pdst='10.0.0.9'),
+        Ether() / ARP(op=2, hwsrc='aa:aa:aa:aa:aa:02', psrc='10.0.1.2', pdst='10.0.0.1'),
+    ])
+
+    columns = load_arp_columns(path)
+
+    assert columns.op.tolist() == [1, 2]
+    assert [mac_to_str(mac) for mac in columns.hwsrc] == ['aa:aa:aa:aa:aa:01', 'aa:aa:aa:aa:aa:02']
+    assert [ip_to_str(ip) for ip in filter_range(columns, '10.0.0.0/24').psrc] == ['10.0.0.1']
+
+
+def test_unique_pairs_of_mixed_capture(tmp_path) -> None:
+    """Verifies that non ARP frames are skipped and pairs are de-duplicated."""
+
+    _write_capture(path := tmp_path / 'mixed.pcap', [
+        Ether() / ARP(op=1, hwsrc='aa:aa:aa:aa:aa:01', psrc='10.0.0.1', pdst='10.0.0.9'),
+        Ether() / IP() / UDP() / (b'x' * 100),
+        Ether() / ARP(op=1, hwsrc='aa:aa:aa:aa:aa:01', psrc='10.0.0.1', pdst='10.0.0.8'),
+        Ether() / ARP(op=2, hwsrc='aa:aa:aa:aa:aa:02', psrc='10.0.0.2', pdst='10.0.0.1'),
+    ])
+
+    pairs = unique_pairs(load_arp_columns(path))
+
+    assert [ip_to_str(ip) for ip in pairs.psrc] == ['10.0.0.1', '10.0.0.2']
+    assert pairs.first_seen.tolist() == [1000.0, 1003.0]
+    assert pairs.last_seen.tolist() == [1002.0, 1003.0]
+    assert pairs.count.tolist() == [2, 1]
+
+
+def test_record_offsets_of_large_capture(tmp_path) -> None:
+    """Verifies that the records of a capture spanning many segments are found with NumPy."""
+
+    np = pytest.importorskip('numpy')
+    # sent frames are 42 bytes long, received ones are padded to 60 bytes.
+    _write_capture(path := tmp_path / 'large.pcap', [
+        Ether() / ARP(op=1, psrc='10.0.0.1', pdst=f'10.0.{i // 256}.{i % 256}')
+        / (b'\x00' * 18 * (i % 3 == 0))
+        for i in range(4000)
+    ])
+
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=24)
+    offsets, end = _record_offsets(data, '<', 65535, 10 ** 6, segment=4096, overlap=1024)
+    walked = _walk_records(data, '<')
+
+    assert len(offsets) > len(walked) // 2
+    assert np.array_equal(np.concatenate((offsets, _walk_records(data, '<', end))), walked)
+    assert len(load_arp_columns(path)) == 4000
+
+
+def test_vlan_tagged_frames_are_counted(tmp_path, caplog) -> None:
+    """Verifies that VLAN tagged ARP frames are skipped with a warning."""
+
+    _write_capture(path := tmp_path / 'vlan.pcap', [
+        Ether() / ARP(op=1, psrc='10.0.0.1', pdst='10.0.0.9'),
+        Ether() / Dot1Q(vlan=10) / ARP(op=1, psrc='10.0.0.2', pdst='10.0.0.9'),
+    ])
+
+    with caplog.at_level(logging.WARNING):
+        columns = load_arp_columns(path)
+
+    assert [ip_to_str(ip) for ip in columns.psrc] == ['10.0.0.1']
+    assert 'skipped 1 VLAN tagged ARP packets' in caplog.text
+
+
+def test_invalid_capture_file(tmp_path, caplog) -> None:
+    """Verifies that a file that is not a pcap file is reported, with an error code."""
+
+    (path := tmp_path / 'garbage.pcap').write_bytes(b'not a capture file at all')
+    namespace = Arpscan().parse_args(['10.0.0.0/24', '-P', '-b', '-r', str(path)])
+
+    with caplog.at_level(logging.ERROR), pytest.raises(SystemExit) as exit_info:
+        cli.arpscan(namespace)
+
+    assert exit_info.value.code == 1
+    assert 'pcap file' in caplog.text
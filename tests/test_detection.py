@@ -0,0 +1,49 @@
+from arptools.arp.detection import SpoofDetector
+
+
+def test_mac_change_alert() -> None:
+    """Verifies that an IP moving to a new MAC raises a mac-change alert."""
+
+    detector = SpoofDetector(ttl=10)
+
+    assert detector.observe('aa:aa:aa:aa:aa:aa', '10.0.0.1', 0.0) is None
+    alert = detector.observe('bb:bb:bb:bb:bb:bb', '10.0.0.1', 20.0)
+
+    assert alert.kind == 'mac-change'
+    assert alert.previous == ('aa:aa:aa:aa:aa:aa',)
+
+
+def test_mac_change_within_ttl() -> None:
+    """Verifies that a move is a mac-change as long as the old MAC does not claim the IP again."""
+
+    detector = SpoofDetector(ttl=10)
+    detector.observe('aa:aa:aa:aa:aa:aa', '10.0.0.1', 0.0)
+
+    alert = detector.observe('bb:bb:bb:bb:bb:bb', '10.0.0.1', 1.0)
+
+    assert (alert.kind, alert.previous) == ('mac-change', ('aa:aa:aa:aa:aa:aa',))
+    assert detector.observe('bb:bb:bb:bb:bb:bb', '10.0.0.1', 2.0) is None
+
+    alert = detector.observe('aa:aa:aa:aa:aa:aa', '10.0.0.1', 3.0)
+
+    assert (alert.kind, alert.previous) == ('ip-conflict', ('bb:bb:bb:bb:bb:bb',))
+
+
+def test_ip_conflict_alerts_are_rate_limited() -> None:
+    """Verifies that repeated conflicts raise a single alert per cooldown period."""
+
+    detector = SpoofDetector(ttl=10, cooldown=5)
+    alerts = []
+    detector.add_listener(alerts.append)
+
+    for timestamp in range(8):
+        detector.observe('aa:aa:aa:aa:aa:aa', '10.0.0.1', float(timestamp))
+        detector.observe('bb:bb:bb:bb:bb:bb', '10.0.0.1', timestamp + 0.5)
+
+    assert [(alert.kind, alert.mac, alert.timestamp) for alert in alerts] == [
+        ('mac-change', 'bb:bb:bb:bb:bb:bb', 0.5),
+        ('ip-conflict', 'aa:aa:aa:aa:aa:aa', 1.0),
+        ('ip-conflict', 'bb:bb:bb:bb:bb:bb', 1.5),
+        ('ip-conflict', 'aa:aa:aa:aa:aa:aa', 6.0),
+        ('ip-conflict', 'bb:bb:bb:bb:bb:bb', 6.5),
+    ]
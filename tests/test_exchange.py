@@ -0,0 +1,154 @@
+import io
+from ipaddress import ip_network
+import time
+
+from scapy.layers.l2 import ARP, Ether
+
+from arptools.arp.garp import iter_garp_reply
+from arptools.arp.packets import exchange as exchange_module
+from arptools.arp.packets.exchange import exchange, repeated
+from arptools.arp.packets.statistics import ExchangeStatistics, StatusLine
+from arptools.arp.packets.sweep import SweepState, sweep
+from arptools.arp.probe import iter_arp_probe
+from arptools.arp.result import ArpResult
+
+
+class FakeSocket:
+    """Answers the ARP requests sent to the given hosts."""
+
+    def __init__(self, hosts: dict[str, str], copies: int = 1):
+        self.hosts, self.copies, self.replies, self.sent = hosts, copies, [], 0
+
+    def send(self, data: bytes) -> None:
+        self.sent += 1
+        request = Ether(data)[ARP]
+
+        if (mac := self.hosts.get(request.pdst)) is not None:
+            reply = Ether(bytes(Ether() / ARP(
+                op=2, hwsrc=mac, psrc=request.pdst, hwdst=request.hwsrc, pdst=request.psrc
+            )))
+            reply.time = time.time()
+            self.replies.extend(reply.copy() for _ in range(self.copies))
+
+    def recv(self):
+        return self.replies.pop(0) if self.replies else None
+
+    def select(self, sockets, remain=None):
+        if not self.replies and remain:
+            time.sleep(min(remain, 0.01))
+
+        return sockets if self.replies else []
+
+    def close(self) -> None:
+        pass
+
+
+def test_exchange_results() -> None:
+    """Verifies that replies are matched to their request and unanswered requests expire."""
+
+    socket = FakeSocket({'10.0.0.1': 'aa:aa:aa:aa:aa:01', '10.0.0.3': 'aa:aa:aa:aa:aa:03'})
+    pkt = Ether() / ARP(psrc='10.0.0.9', pdst='10.0.0.0/30')
+
+    results = sorted(
+        (ArpResult.from_exchange(completed) for completed in exchange(
+            repeated(pkt, 2), timeout=0.05, socket=socket
+        )),
+        key=lambda result: (result.target_ip, result.attempt),
+    )
+
+    assert socket.sent == 8
+    assert [
+        (result.target_ip, result.mac, result.attempt) for result in results
+    ] == [
+        ('10.0.0.0', None, 1), ('10.0.0.0', None, 2),
+        ('10.0.0.1', 'aa:aa:aa:aa:aa:01', 1), ('10.0.0.1', 'aa:aa:aa:aa:aa:01', 2),
+        ('10.0.0.2', None, 1), ('10.0.0.2', None, 2),
+        ('10.0.0.3', 'aa:aa:aa:aa:aa:03', 1), ('10.0.0.3', 'aa:aa:aa:aa:aa:03', 2),
+    ]
+    assert all(result.rtt >= 0 for result in results if result.answered)
+
+
+def test_request_rounds_until_answered(monkeypatch) -> None:
+    """Verifies that every target is probed until it answers, and only until then."""
+
+    socket = FakeSocket({'10.0.0.1': 'aa:aa:aa:aa:aa:01', '10.0.0.2': 'aa:aa:aa:aa:aa:02'})
+    monkeypatch.setattr(exchange_module, 'open_socket', lambda: socket)
+
+    results = list(iter_arp_probe(
+        ['10.0.0.1', '10.0.0.2', '10.0.0.3'], count=3, quit_on_first_reply=True, timeout=0.02
+    ))
+
+    assert socket.sent == 5
+    assert sorted((result.target_ip, result.attempt, result.answered) for result in results) == [
+        ('10.0.0.1', 1, True), ('10.0.0.2', 1, True),
+        ('10.0.0.3', 1, False), ('10.0.0.3', 2, False), ('10.0.0.3', 3, False),
+    ]
+
+
+
+def test_garp_results(monkeypatch) -> None:
+    """Verifies that a result is yielded for every gratuitous reply sent."""
+
+    socket = FakeSocket({})
+    monkeypatch.setattr(exchange_module, 'open_socket', lambda: socket)
+
+    results = list(iter_garp_reply(
+        [('aa:aa:aa:aa:aa:01', '10.0.0.1'), ('aa:aa:aa:aa:aa:02', '10.0.0.2')],
+        ethernet_src='aa:aa:aa:aa:aa:00',
+        count=2,
+    ))
+
+    assert socket.sent == 4
+    assert [(result.target_ip, result.attempt, result.answered) for result in results] == [
+        ('10.0.0.1', 1, False), ('10.0.0.2', 1, False),
+        ('10.0.0.1', 2, False), ('10.0.0.2', 2, False),
+    ]
+
+def test_exchange_statistics() -> None:
+    """Verifies that sent packets, replies, duplicates and round-trip times are counted."""
+
+    socket = FakeSocket({'10.0.0.1': 'aa:aa:aa:aa:aa:01'}, copies=2)
+    pkt = Ether() / ARP(psrc='10.0.0.9', pdst='10.0.0.0/31')
+    statistics = ExchangeStatistics()
+
+    list(exchange(repeated(pkt, 3), timeout=0.05, socket=socket, statistics=statistics))
+
+    assert (statistics.sent, statistics.received, statistics.duplicates) == (6, 3, 3)
+    assert statistics.loss == 50.0 and statistics.rtts.count == 3
+    assert statistics.summary().startswith(
+        'Sent 6 packets, received 3 packets, 3 duplicates. 50.0% hits, 50.0% loss.\nrtt '
+    )
+
+    stream = io.StringIO()
+    status = StatusLine(statistics, stream=stream, interval=60)
+    status.update()
+    status.update()
+    status.clear()
+
+    assert stream.getvalue() == f'\r\x1b[K{statistics.line()}\r\x1b[K'
+    assert statistics.line().startswith('sent 6, received 3, 50.0% loss, 3 duplicates, rtt ')
+
+
+def test_sweep_results() -> None:
+    """Verifies that a sweep retries the silent targets only, and counts the duplicates."""
+
+    socket = FakeSocket({'10.0.0.1': 'aa:aa:aa:aa:aa:01', '10.0.0.9': 'aa:aa:aa:aa:aa:09'}, 2)
+    frame = bytes(Ether() / ARP(psrc='10.0.0.200', pdst='10.0.0.0'))
+    statistics = ExchangeStatistics()
+
+    results = sorted(
+        (ArpResult.from_exchange(completed) for completed in sweep(
+            ip_network('10.0.0.0/28'), frame, order=[5, 9, 1, 0] + list(range(10, 16)) +
+            [2, 3, 4, 6, 7, 8], timeout=0.05, retries=1, socket=socket, statistics=statistics,
+        )),
+        key=lambda result: int(result.target_ip.split('.')[-1]),
+    )
+
+    assert socket.sent == 16 + 14
+    assert [result.target_ip for result in results] == [f'10.0.0.{i}' for i in range(16)]
+    assert [(result.mac, result.attempt) for result in results if result.answered] == [
+        ('aa:aa:aa:aa:aa:01', 1), ('aa:aa:aa:aa:aa:09', 1)
+    ]
+    assert all(result.attempt == 2 for result in results if not result.answered)
+    assert (statistics.sent, statistics.received, statistics.duplicates) == (30, 2, 2)
+    assert SweepState(65536).nbytes < 400_000
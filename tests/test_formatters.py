@@ -0,0 +1,61 @@
+import csv
+import json
+
+from scapy.layers.l2 import ARP, Ether
+from scapy.packet import Padding
+from scapy.plist import QueryAnswer
+
+from arptools.arp.packets.formatters import describe_rtts, Formatter
+from arptools.modules.histogram import HdrHistogram
+
+
+def _answer() -> QueryAnswer:
+    query = Ether() / ARP(hwsrc='aa:aa:aa:aa:aa:01', psrc='10.0.0.2', pdst='10.0.0.1')
+    reply = Ether() / ARP(
+        op=2, hwsrc='aa:aa:aa:aa:aa:02', psrc='10.0.0.1', pdst='10.0.0.2'
+    ) / Padding(b'\x00' * 18)
+    query.sent_time, reply.time = 1000.0, 1000.25
+
+    return QueryAnswer(query, reply)
+
+
+def test_text_format() -> None:
+    """Verifies that the text lines match the scapy packet summaries."""
+
+    answer = _answer()
+
+    assert Formatter('text').answered(answer) == (
+        'ARP who has 10.0.0.1 says 10.0.0.2 ==> ARP is at aa:aa:aa:aa:aa:02 says 10.0.0.1'
+    )
+    assert Formatter('text').unanswered(answer.query) == 'ARP who has 10.0.0.1 says 10.0.0.2'
+
+
+def test_structured_formats() -> None:
+    """Verifies that the JSON Lines and CSV lines carry the same fields."""
+
+    answer = _answer()
+    record = json.loads(Formatter('jsonl').answered(answer))
+
+    assert record['status'] == 'answered'
+    assert record['kind'] == 'request'
+    assert record['reply_hwsrc'] == 'aa:aa:aa:aa:aa:02'
+    assert record['rtt'] == 0.25
+
+    formatter = Formatter('csv')
+    rows = list(csv.DictReader([formatter.header, formatter.answered(answer)]))
+
+    assert rows == [{key: '' if value is None else str(value) for key, value in record.items()}]
+
+
+def test_describe_rtts() -> None:
+    """Verifies the summary of the round-trip times and its histogram."""
+
+    rtts = HdrHistogram()
+    for rtt in (100_000, 200_000, 300_000, 4_000_000):
+        rtts.record(rtt)
+
+    summary, *histogram = describe_rtts(rtts, histogram=True).splitlines()
+
+    assert summary == 'rtt min/avg/max/p50/p99 = 0.100/1.150/4.000/0.201/4.000 ms'
+    assert len(histogram) == 6 and histogram[0].endswith(' 1') and histogram[3].endswith(' 0')
+    assert describe_rtts(rtts) == summary
@@ -0,0 +1,40 @@
+import random
+
+from arptools.modules.histogram import HdrHistogram
+
+
+def test_hdr_histogram_relative_error() -> None:
+    """Verifies that percentiles are within the relative error of the exact values."""
+
+    rng = random.Random(0)
+    values = sorted(rng.randint(0, 10**9) for _ in range(10000))
+
+    histogram = HdrHistogram(precision=7)
+    for value in values:
+        histogram.record(value)
+
+    assert (histogram.count, histogram.min, histogram.max) == (10000, values[0], values[-1])
+    assert histogram.mean == sum(values) / len(values)
+
+    for percentile in (1, 50, 90, 99, 100):
+        exact = values[len(values) * percentile // 100 - 1]
+        assert abs(histogram.percentile(percentile) - exact) <= exact * 2 ** -6
+
+
+def test_hdr_histogram_buckets_and_merge() -> None:
+    """Verifies that buckets cover every value once and that merging adds the counts."""
+
+    first, second = HdrHistogram(precision=3), HdrHistogram(precision=3)
+    for value in range(100):
+        first.record(value)
+    second.record(1000, count=5)
+
+    first.merge(second)
+
+    buckets = list(first.buckets())
+    assert all(
+        low <= high < next_low for (low, high, _), (next_low, _, _) in zip(buckets, buckets[1:])
+    )
+    assert sum(count for _, _, count in buckets) == first.count == 105
+    assert first.max == 1000 and first.percentile(100) == 1000
+    assert list(first.octaves())[-1] == (512, 1023, 5)
@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+from arptools.arp.history import MappingHistory, lookup_history
+
+
+def _rows(path) -> list[tuple]:
+    with sqlite3.connect(path) as connection:
+        return connection.execute(
+            'SELECT mac, ip, first_seen, last_seen, hits FROM observations ORDER BY id'
+        ).fetchall()
+
+
+def test_sightings_are_merged_into_observations(tmp_path) -> None:
+    """Verifies that close sightings of a pair extend the same observation."""
+
+    with MappingHistory(path := tmp_path / 'arp.db', gap=10) as history:
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0)
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 105.0)
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 200.0)
+
+    assert _rows(path) == [
+        ('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0, 105.0, 2),
+        ('aa:aa:aa:aa:aa:aa', '10.0.0.1', 200.0, 200.0, 1),
+    ]
+
+
+def test_observations_are_resumed_across_sessions(tmp_path) -> None:
+    """Verifies that a reopened history continues the latest observation of a pair."""
+
+    with MappingHistory(path := tmp_path / 'arp.db', gap=10) as history:
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0)
+
+    with MappingHistory(path, gap=10) as history:
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 104.0)
+
+    assert _rows(path) == [('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0, 104.0, 2)]
+
+
+def test_lookup_at_point_in_time(tmp_path) -> None:
+    """Verifies that lookups return the observations overlapping the requested time."""
+
+    with MappingHistory(tmp_path / 'arp.db', gap=10) as history:
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0)
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 110.0)
+        history.record('bb:bb:bb:bb:bb:bb', '10.0.0.1', 120.0)
+        history.record('bb:bb:bb:bb:bb:bb', '10.0.0.2', 125.0)
+        history.flush()
+
+        assert [o.mac for o in history.lookup(ip='10.0.0.1', start=105.0, end=105.0)] == [
+            'aa:aa:aa:aa:aa:aa',
+        ]
+        assert [o.ip for o in history.lookup(mac='BB:BB:BB:BB:BB:BB', start=115.0)] == [
+            '10.0.0.1',
+            '10.0.0.2',
+        ]
+        assert not history.lookup(ip='10.0.0.1', start=111.0, end=119.0)
+
+
+def test_recording_does_not_wait_for_the_database(tmp_path) -> None:
+    """Verifies that sightings are recorded while the database is being written."""
+
+    with MappingHistory(path := tmp_path / 'arp.db', gap=10) as history:
+        with history._connection_lock:
+            history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0)
+
+    assert _rows(path) == [('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0, 100.0, 1)]
+
+
+def test_lookup_history_is_read_only(tmp_path) -> None:
+    """Verifies that history lookups read the database without creating or changing it."""
+
+    with MappingHistory(path := tmp_path / 'arp.db', gap=10) as history:
+        history.record('aa:aa:aa:aa:aa:aa', '10.0.0.1', 100.0)
+        history.flush()
+
+        assert [o.mac for o in lookup_history(path, ip='10.0.0.1')] == ['aa:aa:aa:aa:aa:aa']
+
+    with pytest.raises(sqlite3.OperationalError):
+        lookup_history(missing := tmp_path / 'missing.db', ip='10.0.0.1')
+
+    assert not missing.exists()
@@ -0,0 +1,58 @@
+import random
+
+from arptools.arp.frame import ArpFrame
+from arptools.arp.load import MAX_POOL, _AddressPool, load_frames, random_macs
+
+
+def test_load_frames_in_turn() -> None:
+    """Verifies that frames cycle through every combination of the pools."""
+
+    frames = load_frames(
+        'request', ['10.0.0.1', '10.0.0.2'], ['10.0.1.1', '10.0.1.2', '10.0.1.3'],
+        ['aa:aa:aa:aa:aa:01'],
+    )
+
+    assert len(frames) == 6
+    assert len({(f.psrc, f.pdst) for f in map(ArpFrame.from_bytes, frames)}) == 6
+    assert all(frame[6:12] == bytes.fromhex('aaaaaaaaaa01') for frame in frames)
+
+
+def test_load_frames_in_turn_with_related_pool_sizes() -> None:
+    """Verifies that every combination is built when the pool sizes share a factor."""
+
+    frames = load_frames(
+        'request', ['10.0.0.1', '10.0.0.2'], [f'10.0.1.{i}' for i in range(1, 5)],
+        ['aa:aa:aa:aa:aa:01', 'aa:aa:aa:aa:aa:02'],
+    )
+
+    assert len(frames) == 16
+    assert len({(f.hwsrc, f.psrc, f.pdst) for f in map(ArpFrame.from_bytes, frames)}) == 16
+
+
+def test_load_frames_at_random() -> None:
+    """Verifies that random loads are repeatable, and that announcements advertise their IP."""
+
+    macs = random_macs(4, random.Random(0))
+    assert len(set(macs)) == 4
+    assert all(int(mac[:2], 16) & 0b11 == 0b10 for mac in macs)
+
+    first, second = (
+        load_frames('announcement', ['10.0.0.1', '10.0.0.2'], [], macs, rng=random.Random(1))
+        for _ in range(2)
+    )
+
+    assert first == second and len(first) == 8
+    assert all(
+        (frame.op, frame.psrc) == (1, frame.pdst) for frame in map(ArpFrame.from_bytes, first)
+    )
+
+
+def test_large_ranges_are_not_expanded() -> None:
+    """Verifies that the frames of a /8 are built without listing all of its addresses."""
+
+    frames = load_frames(
+        'request', _AddressPool('10.0.0.0/8'), ['10.0.0.1'], ['aa:aa:aa:aa:aa:01'],
+    )
+
+    assert len(frames) == MAX_POOL
+    assert ArpFrame.from_bytes(frames[-1]).pdst == '10.0.255.255'
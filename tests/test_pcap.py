@@ -0,0 +1,65 @@
+import os
+import struct
+
+import pytest
+from scapy.layers.l2 import ARP, Ether
+
+from arptools.modules.pcap import CaptureFormatError, read_capture, RotatingPcapWriter
+
+
+def test_writer_round_trip(tmp_path) -> None:
+    """Verifies that written frames are read back with nanosecond timestamps."""
+
+    frame = bytes(Ether() / ARP(psrc='10.0.0.1', pdst='10.0.0.2'))
+
+    with RotatingPcapWriter(path := tmp_path / 'arp.pcap') as writer:
+        writer.write(frame, 1000.123456789)
+
+    records = list(read_capture(path))
+
+    assert [record.data for record in records] == [frame]
+    assert abs(records[0].timestamp - 1000.123456789) < 1e-9
+
+
+def test_writer_rotation(tmp_path) -> None:
+    """Verifies that a new capture file is started once the size limit is reached."""
+
+    frame = bytes(Ether() / ARP())
+
+    with RotatingPcapWriter(path := tmp_path / 'arp.pcap', max_bytes=200) as writer:
+        for i in range(10):
+            writer.write(frame, 1000.0 + i)
+
+    assert writer.paths[:2] == (str(path), f'{path}.1')
+    assert [
+        record.timestamp for file in writer.paths for record in read_capture(file)
+    ] == [1000.0 + i for i in range(10)]
+
+
+def test_writer_keeps_the_last_files(tmp_path) -> None:
+    """Verifies that the oldest capture files are deleted past the file count."""
+
+    frame = bytes(Ether() / ARP())
+
+    with RotatingPcapWriter(tmp_path / 'arp.pcap', max_bytes=200, max_files=2) as writer:
+        for i in range(10):
+            writer.write(frame, 1000.0 + i)
+
+    assert len(writer.paths) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(file) for file in writer.paths)
+    assert [record.timestamp for record in read_capture(writer.paths[-1])][-1] == 1009.0
+
+
+def test_pcapng_undescribed_interface(tmp_path) -> None:
+    """Verifies that a packet of an interface without description is a format error."""
+
+    frame = bytes(Ether() / ARP())
+    shb = struct.pack('<IIIHHqI', 0x0A0D0D0A, 28, 0x1A2B3C4D, 1, 0, -1, 28)
+    idb = struct.pack('<IIHHII', 1, 20, 1, 0, 0, 20)
+    epb = struct.pack('<IIIIIII', 6, 32 + len(frame), 1, 0, 0, len(frame), len(frame))
+    (path := tmp_path / 'arp.pcapng').write_bytes(
+        shb + idb + epb + frame + struct.pack('<I', 32 + len(frame))
+    )
+
+    with pytest.raises(CaptureFormatError, match='undescribed interface'):
+        list(read_capture(path))
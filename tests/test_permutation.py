@@ -0,0 +1,18 @@
+from arptools.modules.permutation import CyclicPermutation
+
+
+def test_cyclic_permutation_covers_the_range() -> None:
+    """Verifies that every index is visited exactly once, for any size."""
+
+    for size in (0, 1, 2, 3, 255, 256, 1000):
+        assert sorted(CyclicPermutation(size, seed=7)) == list(range(size))
+
+
+def test_cyclic_permutation_is_seeded() -> None:
+    """Verifies that a seed always gives the same order, and different seeds different ones."""
+
+    first, second = list(CyclicPermutation(4096, seed=1)), list(CyclicPermutation(4096, seed=1))
+
+    assert first == second
+    assert first != list(CyclicPermutation(4096, seed=2))
+    assert first != list(range(4096))
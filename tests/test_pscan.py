@@ -0,0 +1,189 @@
+import io
+import json
+import logging
+import time
+
+import pytest
+from scapy.layers.l2 import ARP, Ether
+from scapy.utils import wrpcap
+
+from arptools import cli
+from arptools.arp import pscan
+from arptools.arp.frame import ARP_KINDS, ArpFrame
+from arptools.arp.pscan import LEARNABLE_KINDS, MappingModel, PassiveScanStream
+from arptools.parsers import Arpscan
+
+
+_FRAMES = (
+    ArpFrame(1, 'aa:aa:aa:aa:aa:aa', '10.0.0.1', '00:00:00:00:00:00', '10.0.0.2'),
+    ArpFrame(2, 'bb:bb:bb:bb:bb:bb', '10.0.0.2', 'aa:aa:aa:aa:aa:aa', '10.0.0.1'),
+    ArpFrame(2, 'cc:cc:cc:cc:cc:cc', '10.0.0.3', 'ff:ff:ff:ff:ff:ff', '10.0.0.3'),
+    ArpFrame(1, 'dd:dd:dd:dd:dd:dd', '0.0.0.0', '00:00:00:00:00:00', '10.0.0.4'),
+    ArpFrame(1, 'aa:aa:aa:aa:aa:aa', '10.0.0.1', '00:00:00:00:00:00', '10.0.0.1'),
+)
+
+
+def _feed(model: MappingModel) -> None:
+    for frame in _FRAMES:
+        model.feed(frame, time.time())
+
+
+def test_requests_only_by_default() -> None:
+    """Verifies that replies and gratuitous ARP are counted but not learned by default."""
+
+    _feed(model := MappingModel('10.0.0.0/24', ttl=60))
+
+    assert [(mac, ip) for mac, ip, _ in model.mappings()] == [('aa:aa:aa:aa:aa:aa', '10.0.0.1')]
+    assert model.requests == 1
+    assert model.op_counters == {
+        'request': 1, 'reply': 1, 'garp': 1, 'probe': 1, 'announcement': 1,
+    }
+    assert model.source_counters['aa:aa:aa:aa:aa:aa'] == {'request': 1, 'announcement': 1}
+
+
+def test_learn_from_every_kind() -> None:
+    """Verifies that replies, gratuitous ARP and announcements can be learned from."""
+
+    _feed(model := MappingModel('10.0.0.0/24', ttl=60, learn_from=LEARNABLE_KINDS))
+
+    assert [(mac, ip) for mac, ip, _ in model.mappings()] == [
+        ('aa:aa:aa:aa:aa:aa', '10.0.0.1'),
+        ('bb:bb:bb:bb:bb:bb', '10.0.0.2'),
+        ('cc:cc:cc:cc:cc:cc', '10.0.0.3'),
+    ]
+    assert model.requests == 4
+
+
+def test_replies_reach_the_detector() -> None:
+    """Verifies that takeovers by gratuitous replies are detected, even when not learned from."""
+
+    model = MappingModel('10.0.0.0/24', ttl=60)
+    now = time.time()
+
+    model.feed(ArpFrame(1, 'aa:aa:aa:aa:aa:aa', '10.0.0.7', '00:00:00:00:00:00', '10.0.0.1'), now)
+    model.feed(ArpFrame(2, 'bb:bb:bb:bb:bb:bb', '10.0.0.7', 'ff:ff:ff:ff:ff:ff', '10.0.0.7'), now)
+
+    assert [(mac, ip) for mac, ip, _ in model.mappings()] == [('aa:aa:aa:aa:aa:aa', '10.0.0.7')]
+    assert [(alert.mac, alert.ip) for alert in model.alerts] == [('bb:bb:bb:bb:bb:bb', '10.0.0.7')]
+
+
+def test_source_counters_are_bounded(monkeypatch) -> None:
+    """Verifies that only in-range senders are counted, and at most MAX_SOURCES of them."""
+
+    monkeypatch.setattr(pscan, 'MAX_SOURCES', 2)
+    model = MappingModel('10.0.0.0/24', ttl=60)
+
+    for i in range(5):
+        model.feed(
+            ArpFrame(1, f'aa:aa:aa:aa:aa:0{i}', '10.0.0.1', '00:00:00:00:00:00', '10.0.0.2'),
+            time.time(),
+        )
+    model.feed(
+        ArpFrame(1, 'ee:ee:ee:ee:ee:ee', '192.168.0.1', '00:00:00:00:00:00', '10.0.0.2'),
+        time.time(),
+    )
+
+    assert sorted(model.source_counters) == ['aa:aa:aa:aa:aa:00', 'aa:aa:aa:aa:aa:01']
+    assert model.untracked_packets == 3
+    assert model.op_counters['request'] == 6
+
+
+def test_storms_raise_alerts() -> None:
+    """Verifies that hosts exceeding the request rate threshold are reported."""
+
+    model = MappingModel('10.0.0.0/24', ttl=60, storm_threshold=5)
+    now = time.time()
+
+    for i in range(60):
+        model.feed(
+            ArpFrame(1, 'ee:ee:ee:ee:ee:ee', '10.0.0.5', '00:00:00:00:00:00', f'10.0.0.{i}'),
+            now,
+        )
+
+    assert [alert.kind for alert in model.alerts] == ['arp-storm']
+    assert model.top_talkers(window=60)[0] == ('ee:ee:ee:ee:ee:ee', 1.0)
+
+
+def test_capture_timestamps_are_the_clock(tmp_path) -> None:
+    """Verifies that mappings read from a capture file expire according to capture time."""
+
+    packets = [
+        Ether() / ARP(op=1, hwsrc='aa:aa:aa:aa:aa:aa', psrc='10.0.0.1', pdst='10.0.0.9'),
+        Ether() / ARP(op=1, hwsrc='bb:bb:bb:bb:bb:bb', psrc='10.0.0.2', pdst='10.0.0.9'),
+    ]
+    packets[0].time, packets[1].time = 1000.0, 1100.0
+    wrpcap(str(path := tmp_path / 'arp.pcap'), packets)
+
+    events = []
+    model = MappingModel('10.0.0.0/24', ttl=60)
+    model.add_listener(events.append)
+
+    assert model.read_capture(str(path)) == 2
+    assert [(mac, ip) for mac, ip, _ in model.mappings()] == [('bb:bb:bb:bb:bb:bb', '10.0.0.2')]
+    assert [(event.kind, event.timestamp) for event in events] == [
+        ('add', 1000.0), ('expire', 1100.0), ('add', 1100.0),
+    ]
+
+
+def test_invalid_capture_file(tmp_path, caplog) -> None:
+    """Verifies that a file that is not a capture is reported, with an error code."""
+
+    (path := tmp_path / 'garbage.pcap').write_bytes(b'not a capture file at all')
+    namespace = Arpscan().parse_args(['10.0.0.0/24', '-P', '-r', str(path)])
+
+    with caplog.at_level(logging.ERROR), pytest.raises(SystemExit) as exit_info:
+        cli.arpscan(namespace)
+
+    assert exit_info.value.code == 1
+    assert 'unknown capture format' in caplog.text
+
+
+def test_passive_arguments() -> None:
+    """Verifies that -P is a flag that leaves the range to the positional argument."""
+
+    namespace = Arpscan().parse_args(['-P', '10.0.0.0/24'])
+    assert (namespace.passive, namespace.destination_range, namespace.ttl) == (
+        True, '10.0.0.0/24', 300,
+    )
+
+    assert Arpscan().parse_args(['10.0.0.0/24', '-P', '--ttl', '60']).ttl == 60
+
+    with pytest.raises(SystemExit):
+        Arpscan().parse_args(['10.0.0.0/24', '--ttl', '60'])
+
+
+def test_stream_records() -> None:
+    """Verifies that the events and alerts of the model are streamed as JSON Lines,
+    followed by the statistics on exit."""
+
+    model = MappingModel('10.0.0.0/24', ttl=60)
+
+    request = ArpFrame(1, 'aa:aa:aa:aa:aa:aa', '10.0.0.1', '00:00:00:00:00:00', '10.0.0.2')
+    garp = ArpFrame(2, 'bb:bb:bb:bb:bb:bb', '10.0.0.1', 'ff:ff:ff:ff:ff:ff', '10.0.0.1')
+
+    with PassiveScanStream(model, output := io.StringIO()):
+        model.feed(request, 1000)
+        model.feed(garp, 1001)
+        # the wall clock is long past the time to live of the mapping.
+        model.prune()
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [record['event'] for record in records] == ['add', 'alert', 'expire', 'stats']
+    assert records[0] == {
+        'event': 'add', 'time': 1000, 'mac': 'aa:aa:aa:aa:aa:aa', 'ip': '10.0.0.1', 'ttl': 60,
+    }
+    assert (records[1]['mac'], records[1]['ip'], records[1]['previous']) == (
+        'bb:bb:bb:bb:bb:bb', '10.0.0.1', ['aa:aa:aa:aa:aa:aa'],
+    )
+    assert (records[2]['mac'], records[2]['ip']) == ('aa:aa:aa:aa:aa:aa', '10.0.0.1')
+    assert records[3]['ops'] == {kind: int(kind in ('request', 'garp')) for kind in ARP_KINDS}
+
+
+def test_output_requires_passive_mode() -> None:
+    """Verifies that -o/--output is only accepted in passive mode."""
+
+    with pytest.raises(SystemExit):
+        Arpscan().parse_args(['10.0.0.0/24', '-o', '-'])
+
+    assert Arpscan().parse_args(['10.0.0.0/24', '-P', '-o', '-']).output == '-'
@@ -0,0 +1,58 @@
+import logging
+
+import pytest
+
+from arptools import cli
+from arptools.arp.frame import ArpFrame
+from arptools.arp.replay import BATCH_WINDOW, ReplayReport, _batches, _replayable
+from arptools.modules.pcap import CaptureRecord, LINKTYPE_ETHERNET
+from arptools.parsers import Arpreplay
+
+
+ARP = ArpFrame(1, 'aa:aa:aa:aa:aa:01', '10.0.0.1', '00:00:00:00:00:00', '10.0.0.2').to_bytes()
+
+
+def test_replayable_skips_other_frames() -> None:
+    """Verifies that non-ARP and non-Ethernet frames are skipped, unless asked otherwise."""
+
+    records = [
+        CaptureRecord(10.0, LINKTYPE_ETHERNET, ARP),
+        CaptureRecord(10.5, LINKTYPE_ETHERNET, bytes(12) + b'\x08\x00' + bytes(46)),
+        CaptureRecord(11.0, 113, ARP),
+        CaptureRecord(12.0, LINKTYPE_ETHERNET, ARP),
+    ]
+
+    report = ReplayReport()
+    assert len(list(_replayable(records, report, arp_only=True))) == 2
+    assert (report.skipped, report.capture_duration) == (2, 2.0)
+
+    report = ReplayReport()
+    assert len(list(_replayable(records, report, arp_only=False))) == 3
+    assert report.skipped == 1
+
+
+def test_batches_scale_the_timing() -> None:
+    """Verifies that frames close in time share a batch, and that speed scales the times."""
+
+    timestamps = [100.0, 100.0 + BATCH_WINDOW / 2, 100.1, 100.3]
+    records = [CaptureRecord(t, LINKTYPE_ETHERNET, ARP) for t in timestamps]
+
+    batches = list(_batches(iter(records), speed=2.0))
+    assert [len(batch) for _, batch in batches] == [2, 1, 1]
+    assert [round(due, 6) for due, _ in batches] == [0.0, 0.05, 0.15]
+
+    batches = list(_batches(iter(records), speed=None))
+    assert [(due, len(batch)) for due, batch in batches] == [(0.0, 4)]
+
+
+def test_invalid_capture_file(tmp_path, caplog) -> None:
+    """Verifies that a file that is not a capture is reported, with an error code."""
+
+    (path := tmp_path / 'garbage.pcap').write_bytes(b'not a capture file at all')
+    namespace = Arpreplay().parse_args([str(path)])
+
+    with caplog.at_level(logging.ERROR), pytest.raises(SystemExit) as exit_info:
+        cli.arpreplay(namespace)
+
+    assert exit_info.value.code == 1
+    assert 'unknown capture format' in caplog.text
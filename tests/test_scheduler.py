@@ -0,0 +1,36 @@
+import time
+
+from arptools.modules import scheduler as scheduler_module
+from arptools.modules.scheduler import DeadlineScheduler
+
+
+def test_deadline_scheduler_grid(monkeypatch) -> None:
+    """Verifies that deadlines stay on the grid, and that late events skip the missed ones."""
+
+    clock = [1_000_000_000]
+    monkeypatch.setattr(scheduler_module.time, 'monotonic_ns', lambda: clock[0])
+
+    scheduler = DeadlineScheduler(0.01, start=1.0)
+
+    for now in (1_000_000_000, 1_010_003_000, 1_020_001_000, 1_055_000_000):
+        clock[0] = now
+        scheduler.advance()
+
+    assert scheduler.deadline == 1.06
+    assert scheduler.missed == 2
+    assert (scheduler.lateness.count, scheduler.lateness.min) == (4, 0)
+    assert scheduler.describe().startswith('interval 10.000 ms, jitter p50/p99/max = ')
+    assert scheduler.describe().endswith('/25.000 ms, 2 missed')
+
+
+def test_deadline_scheduler_wait() -> None:
+    """Verifies that waits end at the deadline, not before."""
+
+    scheduler = DeadlineScheduler(0.005)
+
+    for _ in range(5):
+        scheduler.wait()
+        assert time.monotonic() >= scheduler.deadline
+        scheduler.advance()
+
+    assert scheduler.lateness.count == 5
@@ -0,0 +1,39 @@
+from scapy.layers.l2 import ARP, Ether
+
+from arptools.arp.frame import ArpFrame
+from arptools.arp.packets.session import FrameTemplate, PermutedFrames
+
+
+def test_frame_template_copies() -> None:
+    """Verifies that a frame template yields fresh, identical copies of its frames."""
+
+    pkt = Ether(src='aa:aa:aa:aa:aa:09') / ARP(
+        hwsrc='aa:aa:aa:aa:aa:09', psrc='10.0.0.9', pdst='10.0.0.0/30'
+    )
+    template = FrameTemplate(pkt)
+
+    first, second = list(template), list(template)
+
+    assert len(template) == 4
+    assert [bytes(frame) for frame in first] == [bytes(frame) for frame in pkt]
+    assert [bytes(frame) for frame in first] == [bytes(frame) for frame in second]
+    assert all(a is not b for a, b in zip(first, second))
+    assert [ArpFrame.from_packet(frame).pdst for frame in first] == [
+        '10.0.0.0', '10.0.0.1', '10.0.0.2', '10.0.0.3'
+    ]
+
+
+def test_permuted_frames_order() -> None:
+    """Verifies that permuted frames cover every target once, in a repeatable order."""
+
+    pkt = Ether(src='aa:aa:aa:aa:aa:09') / ARP(
+        hwsrc='aa:aa:aa:aa:aa:09', psrc='10.0.0.9', pdst='10.0.0.0/28'
+    )
+    frames = PermutedFrames(pkt, ['10.0.0.0/28', '10.0.1.1'], seed=3)
+
+    targets = [ArpFrame.from_packet(frame).pdst for frame in frames]
+
+    assert len(frames) == 17
+    assert sorted(targets) == sorted([f'10.0.0.{i}' for i in range(16)] + ['10.0.1.1'])
+    assert targets == [ArpFrame.from_packet(frame).pdst for frame in frames]
+    assert all(ArpFrame.from_packet(frame).psrc == '10.0.0.9' for frame in frames)
@@ -0,0 +1,49 @@
+from arptools.modules.sketch import CountMinSketch, HyperLogLog, SlidingCounter
+
+
+def test_count_min_sketch_never_undercounts() -> None:
+    """Verifies that estimates are upper bounds of the exact counts."""
+
+    sketch = CountMinSketch(width=64, depth=4)
+    exact = {f'10.0.0.{i}': i for i in range(1, 200)}
+
+    for key, count in exact.items():
+        sketch.add(key, count)
+
+    assert all(sketch.estimate(key) >= count for key, count in exact.items())
+    assert sketch.total == sum(exact.values())
+
+
+def test_sliding_counter_windows() -> None:
+    """Verifies that counts slide out of their windows and the top keys are tracked."""
+
+    counter = SlidingCounter(windows=(1, 10), k=2)
+
+    for i in range(100):
+        counter.add('aa:aa:aa:aa:aa:aa', 100.0 + i / 10)
+    counter.add('bb:bb:bb:bb:bb:bb', 109.5)
+    counter.add('cc:cc:cc:cc:cc:cc', 109.6, count=2)
+
+    assert counter.count('aa:aa:aa:aa:aa:aa', 10, 109.9) == 100
+    assert counter.count('aa:aa:aa:aa:aa:aa', 1, 109.9) == 10
+    assert counter.top(10, 109.9) == [('aa:aa:aa:aa:aa:aa', 100), ('cc:cc:cc:cc:cc:cc', 2)]
+
+    assert counter.count('aa:aa:aa:aa:aa:aa', 10, 115.0) == 40
+    assert counter.count('aa:aa:aa:aa:aa:aa', 10, 200.0) == 0
+    assert counter.top(10, 200.0) == []
+
+
+def test_hyperloglog_merge_and_serialization() -> None:
+    """Verifies that merged and deserialized sketches estimate the union of their keys."""
+
+    first, second = HyperLogLog(precision=10), HyperLogLog(precision=10)
+    for i in range(3000):
+        first.add(f'10.0.{i // 256}.{i % 256}')
+    for i in range(2000, 5000):
+        second.add(f'10.0.{i // 256}.{i % 256}')
+
+    merged = HyperLogLog.from_bytes(first.to_bytes())
+    merged.merge(second)
+
+    assert abs(merged.estimate() - 5000) < 5000 * 0.1
+    assert merged.estimate() >= max(first.estimate(), second.estimate())
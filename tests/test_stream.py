@@ -0,0 +1,59 @@
+import io
+import time
+
+from arptools.modules.stream import BatchedLineWriter
+
+
+class _Stream(io.StringIO):
+    """Counts the write calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+
+        return super().write(s)
+
+
+def test_batches_are_written_when_full() -> None:
+    """Verifies that lines are written in a single call once a batch is full."""
+
+    writer = BatchedLineWriter(stream := _Stream(), batch_size=3, flush_interval=60)
+
+    writer.write_line('a')
+    writer.write_line('b')
+    assert stream.getvalue() == ''
+
+    writer.write_line('c')
+    assert (stream.getvalue(), stream.writes) == ('a\nb\nc\n', 1)
+
+
+def test_batches_are_written_after_the_interval() -> None:
+    """Verifies that lazy flushes wait for the flush interval."""
+
+    writer = BatchedLineWriter(stream := _Stream(), flush_interval=0.05)
+
+    writer.write_record({'event': 'add', 'ip': '10.0.0.1'})
+    writer.flush(force=False)
+    assert stream.getvalue() == ''
+
+    time.sleep(0.06)
+    writer.flush(force=False)
+    assert stream.getvalue() == '{"event":"add","ip":"10.0.0.1"}\n'
+
+
+def test_close_writes_the_last_batch() -> None:
+    """Verifies that closing the writer writes the pending lines, and closes the stream
+    only when asked to."""
+
+    with BatchedLineWriter(stream := _Stream(), flush_interval=60) as writer:
+        writer.write_line('a')
+
+    assert stream.getvalue() == 'a\n' and not stream.closed
+
+    with BatchedLineWriter(stream := _Stream(), close_stream=True) as writer:
+        writer.write_line('a')
+
+    assert stream.closed
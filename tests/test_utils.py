@@ -0,0 +1,31 @@
+from arptools.modules.utils import ExpirableBiIndex
+
+
+def test_bi_index_is_many_to_many() -> None:
+    """Verifies that pairs can be looked up from both sides."""
+
+    index = ExpirableBiIndex(delta=10)
+
+    assert index.add('aa:aa:aa:aa:aa:aa', '10.0.0.1', now=0.0)
+    assert index.add('aa:aa:aa:aa:aa:aa', '10.0.0.2', now=0.0)
+    assert index.add('bb:bb:bb:bb:bb:bb', '10.0.0.2', now=0.0)
+    assert not index.add('aa:aa:aa:aa:aa:aa', '10.0.0.1', now=1.0)
+
+    assert set(index.rights('aa:aa:aa:aa:aa:aa')) == {'10.0.0.1', '10.0.0.2'}
+    assert set(index.lefts('10.0.0.2')) == {'aa:aa:aa:aa:aa:aa', 'bb:bb:bb:bb:bb:bb'}
+    assert len(index) == 3
+
+
+def test_bi_index_pairs_expire_independently() -> None:
+    """Verifies that every pair has its own time to live."""
+
+    expired = []
+    index = ExpirableBiIndex(delta=10, on_expire=lambda *pair: expired.append(pair))
+
+    index.add('aa:aa:aa:aa:aa:aa', '10.0.0.1', now=0.0)
+    index.add('aa:aa:aa:aa:aa:aa', '10.0.0.2', now=5.0)
+    index.prune(now=12.0)
+
+    assert expired == [('aa:aa:aa:aa:aa:aa', '10.0.0.1')]
+    assert list(index.rights('aa:aa:aa:aa:aa:aa')) == ['10.0.0.2']
+    assert not list(index.lefts('10.0.0.1'))